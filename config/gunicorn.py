@@ -0,0 +1,22 @@
+import os
+import shutil
+
+from prometheus_client import multiprocess
+
+
+bind = '0.0.0.0:8000'
+# Gateway calls give up after ZARINPAL['DEADLINE'] (15 s), before this.
+timeout = 30
+
+
+def on_starting(server):
+    # Samples left by a previous run would be merged into the new ones.
+    directory = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(worker.pid)
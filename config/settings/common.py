@@ -11,8 +11,8 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
 from pathlib import Path
-import mimetypes
 from datetime import timedelta
+from decimal import Decimal
 import os
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -40,7 +40,6 @@ INSTALLED_APPS = [
 
     # third party
     'rest_framework',
-    'debug_toolbar',
     'django_filters',
     'djoser',
     'drf_spectacular',
@@ -51,7 +50,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
+    'store.instrumentation.PerformanceMiddleware',
+    'store.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -61,10 +61,6 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-INTERNAL_IPS = [
-    '127.0.0.1',
-]
-
 ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
@@ -131,6 +127,152 @@ STATIC_ROOT = str(BASE_DIR.joinpath('static'))
 MEDIA_URL = '/media/'
 MEDIA_ROOT = str(BASE_DIR.joinpath('media'))
 
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+    # Parts of chunked image uploads, kept out of MEDIA_ROOT so unfinished
+    # uploads are never served.
+    'image_uploads': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+        'OPTIONS': {'location': str(BASE_DIR.joinpath('uploads'))},
+    },
+}
+
+# Cache settings
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Store catalog cache settings
+STORE_CATALOG_CACHE = {
+    'ENABLED': True,
+    'ALIAS': 'default',
+    'TIMEOUT': 60 * 15,
+}
+
+# Zarinpal settings
+ZARINPAL = {
+    'MERCHANT_ID': os.environ.get('ZARINPAL_MERCHANT_ID', 'aaabbbaaabbbaaabbbaaabbbaaabbbaaabbb'),
+    'API_URL': os.environ.get(
+        'ZARINPAL_API_URL', 'https://sandbox.zarinpal.com/pg/rest/WebGate/'
+    ),
+    'START_PAY_URL': os.environ.get(
+        'ZARINPAL_START_PAY_URL', 'https://sandbox.zarinpal.com/pg/StartPay/'
+    ),
+    'CONNECT_TIMEOUT': 3.05,
+    'READ_TIMEOUT': 5,
+    'VERIFY_RETRIES': 3,
+    'BACKOFF_FACTOR': 0.5,
+    # Seconds a gateway call may take with its retries, kept well under the
+    # gunicorn worker timeout (config/gunicorn.py).
+    'DEADLINE': 15,
+    'POOL_MAXSIZE': 10,
+}
+
+# Store cart settings
+STORE_CART_STORE = {
+    'BACKEND': 'store.carts.DatabaseCartStore',
+}
+
+# Abandoned database carts are deleted by the store.tasks.delete_expired_carts
+# beat task once they have been idle for TTL seconds.
+STORE_CART_EXPIRY = {
+    'TTL': 60 * 60 * 24 * 7,
+    'BATCH_SIZE': 1000,
+    'MAX_BATCHES': 100,
+}
+
+# Celery beat settings
+CELERY_BEAT_SCHEDULE = {
+    'delete-expired-carts': {
+        'task': 'store.tasks.delete_expired_carts',
+        'schedule': 60 * 60,
+    },
+    'update-sales-rollup': {
+        'task': 'store.tasks.update_sales_rollup',
+        'schedule': 60 * 5,
+    },
+    'delete-expired-image-uploads': {
+        'task': 'store.tasks.delete_expired_image_uploads',
+        'schedule': 60 * 60,
+    },
+}
+
+# Store request instrumentation settings. A SAMPLE_RATE share of requests
+# is timed; 0 turns the middleware into a pass-through.
+STORE_PERFORMANCE = {
+    'SAMPLE_RATE': float(os.environ.get('STORE_PERFORMANCE_SAMPLE_RATE', 0.01)),
+    'LOG': True,
+    'BUCKETS': {
+        'ms': [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000],
+        'queries': [1, 2, 5, 10, 20, 50, 100],
+    },
+}
+
+# Prometheus metrics settings. Run every process with PROMETHEUS_MULTIPROC_DIR
+# set so /metrics merges the samples of all gunicorn workers. The Celery
+# worker serves its own metrics on CELERY_PORT when it is set.
+STORE_METRICS = {
+    'CELERY_QUEUES': [],
+    'CELERY_PORT': int(os.environ.get('STORE_METRICS_CELERY_PORT', 0)),
+}
+
+# Serve the product list and detail, category list and comment list reads
+# from async views. Only worth it under ASGI, config/asgi.py turns it on.
+STORE_ASYNC_CATALOG = {
+    'ENABLED': os.environ.get('STORE_ASYNC_CATALOG', '0') == '1',
+}
+
+# Store pricing settings. Changing TAX_RATE needs a
+# ``python manage.py refresh_effective_prices`` to reprice the catalog.
+STORE_PRICING = {
+    'TAX_RATE': Decimal(os.environ.get('STORE_TAX_RATE', '0.09')),
+}
+
+# Product image renditions, made by a Celery task after every upload.
+# SIZES are bounding boxes, the aspect ratio is kept.
+STORE_IMAGE_RENDITIONS = {
+    'SIZES': {
+        'thumb': (150, 150),
+        'card': (480, 480),
+        'full': (1600, 1600),
+    },
+    'FORMATS': ['webp', 'jpeg'],
+    'QUALITY': 80,
+}
+
+# Chunked product image uploads. Clients send PART_SIZE parts, nginx must
+# accept request bodies of that size on the parts URLs. Uploads that are
+# not completed within TTL seconds are deleted by a beat task.
+STORE_IMAGE_UPLOADS = {
+    'STORAGE': 'image_uploads',
+    'CONTENT_TYPES': ['image/jpeg', 'image/png', 'image/webp'],
+    'MAX_SIZE': 20 * 1024 * 1024,
+    'PART_SIZE': 5 * 1024 * 1024,
+    'TTL': 60 * 60 * 24,
+}
+
+# Media files are authorized by store.media.serve_media and sent by nginx
+# from its internal ACCEL_REDIRECT location. Content hashed file names are
+# cached for a year, the others for MAX_AGE seconds.
+STORE_MEDIA = {
+    'ACCEL_REDIRECT': '/protected-media/',
+    'PUBLIC_DIRECTORIES': ['store/product/images/'],
+    'MAX_AGE': 60 * 60,
+}
+
+# Store search settings
+STORE_SEARCH = {
+    'FULL_TEXT': True,
+    'CONFIG': 'simple',
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -139,13 +281,6 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Auth model
 AUTH_USER_MODEL = 'core.CustomUser'
 
-# Debug toolbar settings
-mimetypes.add_type("application/javascript", ".js", True)
-
-DEBUG_TOOLBAR_CONFIG = {
-    "INTERCEPT_REDIRECTS": False,
-}
-
 # Rest framework settings
 REST_FRAMEWORK = {
     'COERCE_DECIMAL_TO_STRING': False,
@@ -1,3 +1,5 @@
+import mimetypes
+
 from .common import *
 
 SECRET_KEY = '32ul8v600bl5)i)+^=yz6z9e1&glc=1bl!ocn%3l!n0lio8xy)'
@@ -6,6 +8,12 @@ ALLOWED_HOSTS = ['127.0.0.1']
 
 DEBUG = True
 
+# runserver has no nginx in front of it to send the files.
+STORE_MEDIA = {
+    **STORE_MEDIA,
+    'ACCEL_REDIRECT': None,
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -14,4 +22,19 @@ DATABASES = {
         'PASSWORD': '1381amir',
         'PORT': '5432',
     }
-}
\ No newline at end of file
+}
+
+INSTALLED_APPS += ['debug_toolbar']
+
+MIDDLEWARE = ['debug_toolbar.middleware.DebugToolbarMiddleware'] + MIDDLEWARE
+
+INTERNAL_IPS = [
+    '127.0.0.1',
+]
+
+# Debug toolbar settings
+mimetypes.add_type("application/javascript", ".js", True)
+
+DEBUG_TOOLBAR_CONFIG = {
+    "INTERCEPT_REDIRECTS": False,
+}
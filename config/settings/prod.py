@@ -22,3 +22,31 @@ REDIS_URL = os.environ.get('DJANGO_REDIS_URL')
 
 # Redis settings
 CELERY_BROKER_URL = REDIS_URL
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+        'KEY_PREFIX': 'ecommerce',
+    }
+}
+
+
+STORE_METRICS = {
+    **STORE_METRICS,
+    'CELERY_QUEUES': ['celery'],
+}
+
+STORE_CART_EXPIRY = {
+    **STORE_CART_EXPIRY,
+    'TTL': int(os.environ.get('DJANGO_CART_TTL', STORE_CART_EXPIRY['TTL'])),
+}
+
+if os.environ.get('DJANGO_CART_STORE') == 'redis':
+    STORE_CART_STORE = {
+        'BACKEND': 'store.carts.RedisCartStore',
+        'OPTIONS': {
+            'url': REDIS_URL,
+            'ttl': STORE_CART_EXPIRY['TTL'],
+        },
+    }
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Cart, CartItem, Order, OrderItem, Product, Comment, Category, Customer, ProductImage
+from .models import Cart, CartItem, DailySales, Order, OrderItem, Product, Comment, Category, Customer, ProductImage
 
 
 @admin.register(Product)
@@ -46,3 +46,9 @@ class OrderAdmin(admin.ModelAdmin):
 @admin.register(OrderItem)
 class OrderItemAdmin(admin.ModelAdmin):
     pass
+
+
+@admin.register(DailySales)
+class DailySalesAdmin(admin.ModelAdmin):
+    list_display = ['day', 'product', 'status', 'orders', 'quantity', 'revenue']
+    list_filter = ['status']
@@ -0,0 +1,147 @@
+from datetime import datetime, time as dt_time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailySales, Order, OrderItem, RollupWatermark
+
+
+WATERMARK = 'daily_sales'
+
+# Orders whose transaction committed after a run started may carry a
+# datetime_updated slightly older than that run's watermark, so every run
+# looks this far back again. Rebuilding a day twice is harmless.
+OVERLAP = timedelta(minutes=5)
+
+
+def _day_bounds(first_day, last_day):
+    tz = timezone.get_current_timezone()
+    return (
+        timezone.make_aware(datetime.combine(first_day, dt_time.min), tz),
+        timezone.make_aware(datetime.combine(last_day + timedelta(days=1), dt_time.min), tz),
+    )
+
+
+def rebuild_daily_sales(days):
+    """
+    Recompute the DailySales rows of the given days from their orders.
+    Returns the number of rollup rows written.
+    """
+    days = sorted(set(days))
+    if not days:
+        return 0
+
+    start, end = _day_bounds(days[0], days[-1])
+    rows = OrderItem.objects\
+        .filter(order__datetime_created__gte=start, order__datetime_created__lt=end)\
+        .annotate(day=TruncDate('order__datetime_created'))\
+        .filter(day__in=days)\
+        .values('day', 'product_id', 'product__category_id', 'order__status')\
+        .annotate(
+            orders=Count('order_id', distinct=True),
+            total_quantity=Sum('quantity'),
+            revenue=Sum(
+                F('unit_price') * F('quantity'),
+                output_field=DecimalField(max_digits=12, decimal_places=2)
+            ),
+        )\
+        .order_by()
+
+    with transaction.atomic():
+        DailySales.objects.filter(day__in=days).delete()
+        created = DailySales.objects.bulk_create(
+            [
+                DailySales(
+                    day=row['day'],
+                    product_id=row['product_id'],
+                    category_id=row['product__category_id'],
+                    status=row['order__status'],
+                    orders=row['orders'],
+                    quantity=row['total_quantity'],
+                    revenue=row['revenue'],
+                )
+                for row in rows.iterator(chunk_size=2000)
+            ],
+            batch_size=1000
+        )
+    return len(created)
+
+
+def update_daily_sales():
+    """
+    Rebuild the days of every order created or changed since the previous
+    run. Returns the number of days rebuilt.
+    """
+    started = timezone.now()
+    watermark = RollupWatermark.objects.filter(name=WATERMARK)\
+        .values_list('value', flat=True).first()
+
+    if watermark is None:
+        # First run, rebuild the whole history in bounded batches.
+        date_range = order_date_range()
+        batches = backfill_daily_sales(*date_range) if date_range else []
+        rebuilt = sum((last_day - first_day).days + 1 for first_day, last_day, _ in batches)
+    else:
+        days = list(
+            Order.objects.filter(datetime_updated__gte=watermark - OVERLAP)
+            .annotate(day=TruncDate('datetime_created'))
+            .order_by('day').values_list('day', flat=True).distinct()
+        )
+        rebuild_daily_sales(days)
+        rebuilt = len(days)
+
+    RollupWatermark.objects.update_or_create(name=WATERMARK, defaults={'value': started})
+    return rebuilt
+
+
+def backfill_daily_sales(first_day, last_day, batch_days=31):
+    """Rebuild every day between ``first_day`` and ``last_day``, ``batch_days`` at a time."""
+    day = first_day
+    while day <= last_day:
+        batch = [day + timedelta(days=offset) for offset in range(batch_days)]
+        batch = [batch_day for batch_day in batch if batch_day <= last_day]
+        yield batch[0], batch[-1], rebuild_daily_sales(batch)
+        day = batch[-1] + timedelta(days=1)
+
+
+def order_date_range():
+    dates = Order.objects.order_by('datetime_created')\
+        .values_list('datetime_created', flat=True)
+    first, last = dates.first(), dates.last()
+    if first is None:
+        return None
+    return timezone.localdate(first), timezone.localdate(last)
+
+
+def sales_between(date_from=None, date_to=None, status=Order.ORDER_STATUS_PAID):
+    queryset = DailySales.objects.filter(status=status)
+    if date_from is not None:
+        queryset = queryset.filter(day__gte=date_from)
+    if date_to is not None:
+        queryset = queryset.filter(day__lte=date_to)
+    return queryset
+
+
+def _totals(queryset):
+    return queryset.annotate(
+        quantity_sold=Sum('quantity'),
+        total_revenue=Sum('revenue'),
+    ).order_by()
+
+
+def sales_by_day(queryset):
+    return _totals(queryset.values('day')).order_by('day')
+
+
+def sales_by_category(queryset):
+    return _totals(
+        queryset.values('category_id', category_title=F('category__title'))
+    ).order_by('-total_revenue', 'category_id')
+
+
+def sales_by_product(queryset):
+    return _totals(
+        queryset.values('product_id', product_title=F('product__title'))
+    ).order_by('-total_revenue', 'product_id')
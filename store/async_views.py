@@ -0,0 +1,146 @@
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.views import View
+
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from .cache import aget_cached_data, product_detail_key, product_list_key
+from .conditional import aget_validators, get_object_queryset, not_modified_response, set_validators
+from .paginations import AsyncPageNumberPagination, CustomCursorPagination, SelectablePagination
+from .views import CategoryViewSet, CommentViewSet, ProductViewSet
+
+
+class AsyncCatalogView(View):
+    """
+    Async, JSON only read path of a catalog endpoint for ASGI deployments.
+    The viewset still builds the queryset and serializes, the queries run
+    through the async ORM. Writes, browsable API requests and anything the
+    async path does not cover are handed to the viewset's own view.
+    """
+    viewset_class = None
+    action = None
+    fallback = None
+    renderer = JSONRenderer()
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        view.actions = {'get': cls.action}
+        # Like every DRF view, the fallback views enforce CSRF themselves.
+        view.csrf_exempt = True
+        return view
+
+    def use_fallback(self, request):
+        return request.method != 'GET' \
+            or 'format' in request.GET \
+            or 'text/html' in request.headers.get('Accept', '') \
+            or request.GET.get(SelectablePagination.mode_query_param) == SelectablePagination.cursor_mode \
+            or CustomCursorPagination.cursor_query_param in request.GET
+
+    def get_viewset(self, request, *args, **kwargs):
+        return self.viewset_class(
+            request=Request(request), args=args, kwargs=kwargs, format_kwarg=None, action=self.action
+        )
+
+    async def dispatch(self, request, *args, **kwargs):
+        if self.use_fallback(request):
+            return await sync_to_async(self.fallback)(request, *args, **kwargs)
+        return await super().dispatch(request, *args, **kwargs)
+
+    async def get(self, request, *args, **kwargs):
+        viewset = self.get_viewset(request, *args, **kwargs)
+        try:
+            (data, etag, last_modified), cache_status = await self.get_entry(viewset)
+            response = not_modified_response(request, etag, last_modified)
+            if response is None:
+                response = HttpResponse(self.renderer.render(data), content_type=self.renderer.media_type)
+                set_validators(response, etag, last_modified)
+        except APIException as exc:
+            data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+            response = HttpResponse(
+                self.renderer.render(data), status=exc.status_code, content_type=self.renderer.media_type
+            )
+            cache_status = None
+
+        patch_vary_headers(response, ['Accept'])
+        if cache_status is not None:
+            response['X-Cache'] = cache_status
+        return response
+
+    async def get_entry(self, viewset):
+        """Return the response body, ETag and Last-Modified, and the X-Cache header value."""
+        return await self.build_entry(viewset), None
+
+    async def build_entry(self, viewset):
+        # Nothing is fetched when the client's copy is still fresh.
+        queryset = self.get_conditional_queryset(viewset)
+        if queryset is None:
+            etag, last_modified = None, None
+        else:
+            etag, last_modified = await aget_validators(viewset.request, queryset, self.action != 'list')
+        if not_modified_response(viewset.request, etag, last_modified) is not None:
+            return None, etag, last_modified
+        return await self.get_data(viewset), etag, last_modified
+
+    def get_conditional_queryset(self, viewset):
+        return viewset.filter_queryset(viewset.get_queryset())
+
+    async def get_data(self, viewset):
+        raise NotImplementedError
+
+
+class AsyncListView(AsyncCatalogView):
+    action = 'list'
+
+    async def get_data(self, viewset):
+        queryset = viewset.filter_queryset(viewset.get_queryset())
+        return viewset.get_serializer([obj async for obj in queryset], many=True).data
+
+
+class AsyncProductList(AsyncCatalogView):
+    viewset_class = ProductViewSet
+    action = 'list'
+
+    async def get_entry(self, viewset):
+        return await aget_cached_data(viewset.request, product_list_key, lambda: self.build_entry(viewset))
+
+    async def get_data(self, viewset):
+        queryset = viewset.filter_queryset(viewset.get_queryset())
+        paginator = AsyncPageNumberPagination()
+        page = await paginator.apaginate_queryset(queryset, viewset.request)
+        return paginator.get_paginated_response(viewset.get_serializer(page, many=True).data).data
+
+
+class AsyncProductDetail(AsyncCatalogView):
+    viewset_class = ProductViewSet
+    action = 'retrieve'
+
+    def get_conditional_queryset(self, viewset):
+        return get_object_queryset(viewset, super().get_conditional_queryset(viewset))
+
+    async def get_entry(self, viewset):
+        return await aget_cached_data(
+            viewset.request,
+            lambda request: product_detail_key(request, viewset.kwargs['pk']),
+            lambda: self.build_entry(viewset),
+        )
+
+    async def get_data(self, viewset):
+        queryset = self.get_conditional_queryset(viewset)
+        if queryset is None:
+            raise NotFound()
+        product = await queryset.afirst()
+        if product is None:
+            raise NotFound(f'No {queryset.model._meta.object_name} matches the given query.')
+        return viewset.get_serializer(product).data
+
+
+class AsyncCategoryList(AsyncListView):
+    viewset_class = CategoryViewSet
+
+
+class AsyncCommentList(AsyncListView):
+    viewset_class = CommentViewSet
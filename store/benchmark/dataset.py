@@ -0,0 +1,210 @@
+from dataclasses import dataclass
+from datetime import timedelta
+from decimal import Decimal
+from itertools import islice
+from uuid import UUID
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import DurationField, ExpressionWrapper, F, Value
+from django.db.models.functions import Now
+from django.utils.text import slugify
+
+from store.analytics import backfill_daily_sales, order_date_range
+from store.cache import invalidate_products
+from store.models import Cart, CartItem, Category, Comment, Customer, Order, OrderItem, Product, ProductImage
+from store.pricing import effective_price
+from store.search import refresh_product_search_vectors
+
+
+USERNAME_PREFIX = 'bench'
+PASSWORD = 'benchmark'
+IMAGE = 'store/product/images/benchmark.jpg'
+
+WORDS = [
+    'smart', 'wireless', 'gaming', 'office', 'portable', 'classic', 'compact',
+    'premium', 'leather', 'steel', 'wooden', 'digital', 'outdoor', 'kitchen',
+    'laptop', 'phone', 'chair', 'desk', 'lamp', 'watch', 'camera', 'speaker',
+    'keyboard', 'monitor', 'backpack', 'bottle', 'jacket', 'shoes', 'kettle',
+]
+
+
+@dataclass(frozen=True)
+class DatasetSize:
+    categories: int
+    products: int
+    images_per_product: int
+    comments_per_product: int
+    customers: int
+    carts: int
+    items_per_cart: int
+    orders: int
+    items_per_order: int
+
+
+SIZES = {
+    'small': DatasetSize(10, 1_000, 1, 2, 100, 100, 3, 1_000, 3),
+    'medium': DatasetSize(50, 50_000, 2, 5, 5_000, 5_000, 3, 50_000, 3),
+    'large': DatasetSize(200, 500_000, 2, 5, 50_000, 50_000, 3, 500_000, 4),
+}
+
+
+def _batches(iterable, batch_size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
+
+
+def _title(rng):
+    return ' '.join(rng.sample(WORDS, 3)).capitalize()
+
+
+class DatasetGenerator:
+    """
+    Fill the database with a deterministic dataset: the same ``size`` and
+    ``seed`` always produce the same rows. Everything is written with
+    bulk_create, and the denormalized data that signals would have kept up
+    to date (category counts, search vectors, sales rollup) is rebuilt at
+    the end.
+    """
+
+    def __init__(self, size, seed=0, batch_size=5000, log=print):
+        self.size = size
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.log = log
+
+    def _bulk_create(self, model, objects):
+        """Insert ``objects`` batch by batch and return their primary keys."""
+        pks = []
+        for batch in _batches(objects, self.batch_size):
+            with transaction.atomic():
+                pks += [obj.pk for obj in model.objects.bulk_create(batch)]
+        return pks
+
+    def _step(self, name, function):
+        start = time.perf_counter()
+        count = function()
+        seconds = time.perf_counter() - start
+        self.log(f'{name}: {count} rows in {seconds:.1f}s ({count / seconds if seconds else 0:.0f} rows/sec)')
+
+    def generate(self):
+        self._step('users and customers', self.create_customers)
+        self._step('categories', self.create_categories)
+        self._step('products', self.create_products)
+        self._step('images', self.create_images)
+        self._step('comments', self.create_comments)
+        self._step('carts', self.create_carts)
+        self._step('orders', self.create_orders)
+        self._step('sales rollup and derived data', self.refresh_derived_data)
+
+    def create_customers(self):
+        User = get_user_model()
+        password = make_password(PASSWORD)
+        self.user_ids = self._bulk_create(User, (
+            User(
+                username=f'{USERNAME_PREFIX}{index:06}',
+                email=f'{USERNAME_PREFIX}{index:06}@example.com',
+                first_name=self.rng.choice(WORDS).capitalize(),
+                last_name=self.rng.choice(WORDS).capitalize(),
+                password=password,
+            )
+            for index in range(self.size.customers)
+        ))
+        self.customer_ids = self._bulk_create(Customer, (Customer(user_id=user_id) for user_id in self.user_ids))
+        return len(self.customer_ids)
+
+    def create_categories(self):
+        self.category_ids = self._bulk_create(Category, (
+            Category(title=f'{self.rng.choice(WORDS).capitalize()} {index}', description='Benchmark')
+            for index in range(self.size.categories)
+        ))
+        return len(self.category_ids)
+
+    def create_products(self):
+        def products():
+            for _ in range(self.size.products):
+                title = _title(self.rng)
+                unit_price = Decimal(self.rng.randint(100, 99_999)) / 100
+                yield Product(
+                    title=title,
+                    slug=slugify(title),
+                    description=' '.join(self.rng.choices(WORDS, k=20)),
+                    unit_price=unit_price,
+                    effective_price=effective_price(unit_price),
+                    inventory=self.rng.randint(1_000, 100_000),
+                    category_id=self.rng.choice(self.category_ids),
+                )
+        self.product_ids = self._bulk_create(Product, products())
+        return len(self.product_ids)
+
+    def create_images(self):
+        return len(self._bulk_create(ProductImage, (
+            ProductImage(product_id=product_id, image=IMAGE)
+            for product_id in self.product_ids
+            for _ in range(self.size.images_per_product)
+        )))
+
+    def create_comments(self):
+        return len(self._bulk_create(Comment, (
+            Comment(
+                product_id=product_id,
+                author_id=self.rng.choice(self.user_ids),
+                body=' '.join(self.rng.choices(WORDS, k=12)),
+                status=self.rng.choice(Comment.COMMENT_STATUS)[0],
+            )
+            for product_id in self.product_ids
+            for _ in range(self.size.comments_per_product)
+        )))
+
+    def create_carts(self):
+        cart_ids = self._bulk_create(Cart, (
+            Cart(id=UUID(int=self.rng.getrandbits(128))) for _ in range(self.size.carts)
+        ))
+        return len(self._bulk_create(CartItem, (
+            CartItem(cart_id=cart_id, product_id=product_id, quantity=self.rng.randint(1, 3))
+            for cart_id in cart_ids
+            for product_id in self.rng.sample(self.product_ids, self.size.items_per_cart)
+        )))
+
+    def create_orders(self):
+        statuses = [Order.ORDER_STATUS_PAID] * 6 + [Order.ORDER_STATUS_UNPAID] * 3 + [Order.ORDER_STATUS_CANCELED]
+        created = 0
+        for batch in _batches(range(self.size.orders), self.batch_size):
+            orders = [
+                Order(customer_id=self.rng.choice(self.customer_ids), status=self.rng.choice(statuses))
+                for _ in batch
+            ]
+            with transaction.atomic():
+                Order.objects.bulk_create(orders)
+                OrderItem.objects.bulk_create([
+                    OrderItem(
+                        order_id=order.id,
+                        product_id=product_id,
+                        quantity=self.rng.randint(1, 5),
+                        unit_price=Decimal(self.rng.randint(100, 99_999)) / 100,
+                    )
+                    for order in orders
+                    for product_id in self.rng.sample(self.product_ids, self.size.items_per_order)
+                ])
+                # Spread the orders over the last year so the analytics have history.
+                Order.objects.filter(pk__in=[order.id for order in orders]).update(
+                    datetime_created=Now() - ExpressionWrapper(
+                        Value(timedelta(days=1)) * (F('id') % 365), output_field=DurationField()
+                    )
+                )
+            created += len(orders)
+        return created
+
+    def refresh_derived_data(self):
+        Category.objects.refresh_product_count()
+        for product_ids in _batches(self.product_ids, self.batch_size):
+            refresh_product_search_vectors(Product.objects.filter(pk__in=product_ids))
+        date_range = order_date_range()
+        batches = backfill_daily_sales(*date_range) if date_range else []
+        rollup_rows = sum(rows for _, _, rows in batches)
+        invalidate_products()
+        return rollup_rows
@@ -0,0 +1,222 @@
+from collections import defaultdict
+from dataclasses import dataclass, field
+from statistics import quantiles
+from threading import Barrier, Lock, Thread
+from urllib.parse import urljoin
+import random
+import time
+
+import requests
+
+from .dataset import PASSWORD, USERNAME_PREFIX, WORDS
+
+
+@dataclass
+class EndpointStats:
+    latencies: list = field(default_factory=list)
+    errors: int = 0
+
+    def percentile(self, percent):
+        if len(self.latencies) < 2:
+            return self.latencies[0] if self.latencies else 0
+        return quantiles(self.latencies, n=100)[percent - 1]
+
+
+class LoadScenario:
+    """
+    Every virtual user logs in as one of the seeded benchmark users and
+    repeats the checkout journey: browse products, open one, search, fill
+    a cart, place the order and pay it through the (fake) gateway.
+
+    Requests are grouped by endpoint template, so ``/store/products/12/``
+    and ``/store/products/34/`` are reported together.
+    """
+
+    login_required = True
+
+    def __init__(self, base_url, users=10, iterations=10, think_time=0, seed=0,
+                 password=PASSWORD, timeout=30):
+        self.base_url = base_url.rstrip('/') + '/'
+        self.users = users
+        self.iterations = iterations
+        self.think_time = think_time
+        self.seed = seed
+        self.password = password
+        self.timeout = timeout
+        self.stats = defaultdict(EndpointStats)
+        self.elapsed = 0
+        self._lock = Lock()
+
+    def run(self):
+        barrier = Barrier(self.users + 1)
+        threads = [
+            Thread(target=self.run_user, args=(index, barrier), daemon=True)
+            for index in range(self.users)
+        ]
+        for thread in threads:
+            thread.start()
+        # Start the clock once every user has logged in.
+        barrier.wait()
+        start = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        self.elapsed = time.perf_counter() - start
+        return self.stats
+
+    def request(self, session, name, method, path, expected=(200, ), **kwargs):
+        start = time.perf_counter()
+        try:
+            response = session.request(
+                method, urljoin(self.base_url, path.lstrip('/')),
+                timeout=self.timeout, allow_redirects=False, **kwargs
+            )
+            ok = response.status_code in expected
+        except requests.RequestException:
+            response, ok = None, False
+        latency = (time.perf_counter() - start) * 1000
+
+        with self._lock:
+            stats = self.stats[f'{method} {name}']
+            stats.latencies.append(latency)
+            if not ok:
+                stats.errors += 1
+        return response if ok else None
+
+    def login(self, session, index):
+        response = session.post(
+            urljoin(self.base_url, 'auth/jwt/create/'),
+            json={'username': f'{USERNAME_PREFIX}{index:06}', 'password': self.password},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        session.headers['Authorization'] = f'JWT {response.json()["access"]}'
+
+    def run_user(self, index, barrier):
+        rng = random.Random(self.seed * 10_000 + index)
+        session = requests.Session()
+        try:
+            if self.login_required:
+                self.login(session, index)
+        finally:
+            barrier.wait()
+
+        for _ in range(self.iterations):
+            self.journey(session, rng)
+            if self.think_time:
+                time.sleep(rng.uniform(0, self.think_time * 2))
+
+    def journey(self, session, rng):
+        self.checkout_journey(session, rng)
+
+    def checkout_journey(self, session, rng):
+        response = self.request(
+            session, '/store/products/', 'GET', '/store/products/',
+            params={'pagination': 'cursor'}
+        )
+        if response is None:
+            return
+        products = response.json()['results']
+        if not products:
+            return
+
+        product = rng.choice(products)
+        self.request(session, '/store/products/{id}/', 'GET', f'/store/products/{product["id"]}/')
+        self.request(
+            session, '/store/products/?search=', 'GET', '/store/products/',
+            params={'search': rng.choice(WORDS)}
+        )
+        self.request(
+            session, '/store/products/{id}/comments/', 'GET', f'/store/products/{product["id"]}/comments/'
+        )
+
+        response = self.request(session, '/store/carts/', 'POST', '/store/carts/', expected=(201, ))
+        if response is None:
+            return
+        cart_id = response.json()['id']
+        for product in rng.sample(products, min(3, len(products))):
+            self.request(
+                session, '/store/carts/{id}/items/', 'POST', f'/store/carts/{cart_id}/items/',
+                expected=(201, ), json={'product': product['id'], 'quantity': 1}
+            )
+
+        response = self.request(session, '/store/orders/', 'POST', '/store/orders/', json={'cart_id': cart_id})
+        if response is None:
+            return
+        order_id = response.json()['id']
+
+        response = self.request(
+            session, '/store/orders/{id}/payment/', 'POST', f'/store/orders/{order_id}/payment/',
+            expected=(302, )
+        )
+        if response is None:
+            return
+        # The gateway's payment page answers with a redirect to our callback.
+        response = self.request(
+            session, 'gateway StartPay', 'GET', response.headers['Location'], expected=(302, )
+        )
+        if response is None:
+            return
+        self.request(session, '/store/orders/callback/', 'POST', response.headers['Location'])
+
+    def summary(self):
+        """Totals over every endpoint, for comparing runs."""
+        latencies = [latency for stats in self.stats.values() for latency in stats.latencies]
+        total = EndpointStats(latencies, sum(stats.errors for stats in self.stats.values()))
+        return {
+            'requests': len(latencies),
+            'errors': total.errors,
+            'requests_per_second': len(latencies) / self.elapsed if self.elapsed else 0,
+            'p50': total.percentile(50),
+            'p95': total.percentile(95),
+            'p99': total.percentile(99),
+            'max': max(latencies, default=0),
+        }
+
+    def report(self):
+        total = sum(len(stats.latencies) for stats in self.stats.values())
+        lines = [
+            f'{"endpoint":<42}{"requests":>9}{"errors":>8}{"req/s":>8}'
+            f'{"p50 ms":>9}{"p90 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"max ms":>9}',
+        ]
+        for name, stats in sorted(self.stats.items()):
+            lines.append(
+                f'{name:<42}{len(stats.latencies):>9}{stats.errors:>8}'
+                f'{len(stats.latencies) / self.elapsed if self.elapsed else 0:>8.1f}'
+                f'{stats.percentile(50):>9.1f}{stats.percentile(90):>9.1f}'
+                f'{stats.percentile(95):>9.1f}{stats.percentile(99):>9.1f}'
+                f'{max(stats.latencies, default=0):>9.1f}'
+            )
+        lines.append(
+            f'{total} requests in {self.elapsed:.1f}s, '
+            f'{total / self.elapsed if self.elapsed else 0:.1f} requests/sec with {self.users} users.'
+        )
+        return '\n'.join(lines)
+
+
+class CatalogScenario(LoadScenario):
+    """
+    Anonymous catalog browsing only: the first product page, one of the
+    next ``max_page`` pages, a product, its comments and the categories,
+    the reads the async views serve under ASGI.
+    """
+    login_required = False
+    max_page = 20
+
+    def journey(self, session, rng):
+        response = self.request(session, '/store/products/', 'GET', '/store/products/')
+        if response is None or not response.json()['results']:
+            return
+        page = response.json()
+        pages = min(self.max_page, -(-page['count'] // len(page['results'])))
+        response = self.request(
+            session, '/store/products/', 'GET', '/store/products/', params={'page': rng.randint(1, pages)}
+        )
+        self.request(session, '/store/categories/', 'GET', '/store/categories/')
+        if response is None:
+            return
+
+        product = rng.choice(response.json()['results'])
+        self.request(session, '/store/products/{id}/', 'GET', f'/store/products/{product["id"]}/')
+        self.request(
+            session, '/store/products/{id}/comments/', 'GET', f'/store/products/{product["id"]}/comments/'
+        )
@@ -0,0 +1,177 @@
+from hashlib import md5
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.http import parse_http_date
+
+from rest_framework.response import Response
+
+from .conditional import not_modified_response, set_validators
+from .instrumentation import record_cache
+
+
+PRODUCT_LIST_VERSION_KEY = 'store:products:list:version'
+PRODUCT_VERSION_KEY = 'store:products:{pk}:version'
+HITS_KEY = 'store:catalog:hits'
+MISSES_KEY = 'store:catalog:misses'
+
+
+def get_catalog_cache():
+    return caches[settings.STORE_CATALOG_CACHE['ALIAS']]
+
+
+def is_catalog_cache_enabled():
+    return settings.STORE_CATALOG_CACHE['ENABLED']
+
+
+def _get_version(cache, key):
+    # Versions start from the current time rather than 1 so that a version
+    # key evicted by the backend can never be recreated with a value that
+    # still has cached pages stored under it.
+    cache.add(key, time.time_ns(), timeout=None)
+    return cache.get(key)
+
+
+def _bump_version(cache, key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def _increment(cache, key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def _request_hash(request):
+    return md5(request.build_absolute_uri().encode()).hexdigest()
+
+
+def product_list_key(request):
+    cache = get_catalog_cache()
+    version = _get_version(cache, PRODUCT_LIST_VERSION_KEY)
+    return f'store:products:list:{version}:{_request_hash(request)}'
+
+
+def product_detail_key(request, pk):
+    cache = get_catalog_cache()
+    version = _get_version(cache, PRODUCT_VERSION_KEY.format(pk=pk))
+    return f'store:products:{pk}:{version}:{_request_hash(request)}'
+
+
+def _invalidate(product_ids, product_list):
+    cache = get_catalog_cache()
+    if product_list:
+        _bump_version(cache, PRODUCT_LIST_VERSION_KEY)
+    for product_id in product_ids:
+        _bump_version(cache, PRODUCT_VERSION_KEY.format(pk=product_id))
+
+
+def invalidate_products(product_ids=(), product_list=True):
+    """
+    Invalidate the cached detail payloads of the given products and, unless
+    told otherwise, every cached product list page.
+
+    The versions are bumped immediately and once more when the surrounding
+    transaction commits, so a concurrent request can not re-cache the old
+    rows between the signal and the commit.
+    """
+    product_ids = list(product_ids)
+    _invalidate(product_ids, product_list)
+    transaction.on_commit(lambda: _invalidate(product_ids, product_list))
+
+
+def get_catalog_cache_stats():
+    cache = get_catalog_cache()
+    return {
+        'hits': cache.get(HITS_KEY, 0),
+        'misses': cache.get(MISSES_KEY, 0),
+    }
+
+
+async def aget_cached_data(request, get_key, get_entry):
+    """
+    Async counterpart of CatalogCacheMixin for the async catalog views,
+    sharing its keys and entries. ``get_entry`` returns the data with its
+    ETag and Last-Modified, the data is None for a 304. Returns the entry
+    and the X-Cache header value.
+    """
+    if not is_catalog_cache_enabled():
+        return await get_entry(), None
+
+    cache = get_catalog_cache()
+    key = await sync_to_async(get_key)(request)
+    entry = await cache.aget(key)
+    if entry is not None:
+        await sync_to_async(_increment)(cache, HITS_KEY)
+        record_cache(hit=True)
+        return entry, 'HIT'
+
+    await sync_to_async(_increment)(cache, MISSES_KEY)
+    record_cache(hit=False)
+    entry = await get_entry()
+    if entry[0] is not None:
+        await cache.aset(key, entry, timeout=settings.STORE_CATALOG_CACHE['TIMEOUT'])
+    return entry, 'MISS'
+
+
+class CatalogCacheMixin:
+    """
+    Serve the list and retrieve actions from the catalog cache. Pages are
+    keyed by the absolute request URL, so every filter, search, ordering and
+    page combination is cached separately. The ETag and Last-Modified of a
+    page are cached with it, so conditional requests are answered without
+    touching the database on a hit.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self._get_cached_response(
+            request, product_list_key, super().list, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._get_cached_response(
+            request,
+            lambda request: product_detail_key(request, kwargs['pk']),
+            super().retrieve,
+            *args,
+            **kwargs
+        )
+
+    def _get_cached_response(self, request, get_key, get_response, *args, **kwargs):
+        if not is_catalog_cache_enabled():
+            return get_response(request, *args, **kwargs)
+
+        cache = get_catalog_cache()
+        key = get_key(request)
+        entry = cache.get(key)
+        if entry is not None:
+            _increment(cache, HITS_KEY)
+            record_cache(hit=True)
+            data, etag, last_modified = entry
+            response = not_modified_response(request, etag, last_modified)
+            if response is None:
+                response = Response(data)
+                set_validators(response, etag, last_modified)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        _increment(cache, MISSES_KEY)
+        record_cache(hit=False)
+        response = get_response(request, *args, **kwargs)
+        if response.status_code == 200:
+            last_modified = response.get('Last-Modified')
+            cache.set(
+                key,
+                (response.data, response.get('ETag'), last_modified and parse_http_date(last_modified)),
+                timeout=settings.STORE_CATALOG_CACHE['TIMEOUT']
+            )
+        response['X-Cache'] = 'MISS'
+        return response
@@ -0,0 +1,387 @@
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from functools import lru_cache
+from threading import Lock
+from uuid import UUID, uuid4
+import time
+
+from django.conf import settings
+from django.db.models import Case, DecimalField, ExpressionWrapper, F, IntegerField, Sum, Value, When, Window
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Cart, CartItem, Product
+
+
+class CartDoesNotExist(Exception):
+    pass
+
+
+class BaseCartStore:
+    """
+    Storage for cart contents. Carts are identified by a UUID and hold a
+    mapping of product id to quantity.
+    """
+    uses_database = False
+
+    def create(self):
+        raise NotImplementedError
+
+    def exists(self, cart_id):
+        raise NotImplementedError
+
+    def get_created(self, cart_id):
+        raise NotImplementedError
+
+    def get_items(self, cart_id):
+        """Return {product_id: quantity}, or None if the cart does not exist."""
+        raise NotImplementedError
+
+    def add_item(self, cart_id, product_id, quantity):
+        """Atomically add to the quantity of a product and return the new quantity."""
+        raise NotImplementedError
+
+    def set_item(self, cart_id, product_id, quantity):
+        """Set the quantity of a product already in the cart, return False if it is not."""
+        raise NotImplementedError
+
+    def remove_item(self, cart_id, product_id):
+        raise NotImplementedError
+
+    def delete(self, cart_id):
+        raise NotImplementedError
+
+    @contextmanager
+    def checkout(self, cart_id):
+        """
+        Yield the items of the cart and remove the cart once the block
+        succeeds. A second concurrent checkout of the same cart sees it as
+        missing and raises CartDoesNotExist.
+        """
+        raise NotImplementedError
+
+
+class DatabaseCartStore(BaseCartStore):
+    uses_database = True
+
+    def create(self):
+        return Cart.objects.create().id
+
+    def exists(self, cart_id):
+        return Cart.objects.filter(id=cart_id).exists()
+
+    def get_created(self, cart_id):
+        return Cart.objects.filter(id=cart_id)\
+            .values_list('datetime_created', flat=True).first()
+
+    def get_items(self, cart_id):
+        if not self.exists(cart_id):
+            return None
+        return dict(
+            CartItem.objects.filter(cart_id=cart_id)
+            .values_list('product_id', 'quantity')
+        )
+
+    def add_item(self, cart_id, product_id, quantity):
+        return CartItem.objects.add_quantities(cart_id, {product_id: quantity})[0].quantity
+
+    def set_item(self, cart_id, product_id, quantity):
+        updated = CartItem.objects.filter(cart_id=cart_id, product_id=product_id)\
+            .update(quantity=quantity)
+        if updated:
+            Cart.objects.filter(pk=cart_id).touch()
+        return updated > 0
+
+    def remove_item(self, cart_id, product_id):
+        deleted, _ = CartItem.objects.filter(cart_id=cart_id, product_id=product_id).delete()
+        if deleted:
+            Cart.objects.filter(pk=cart_id).touch()
+        return deleted > 0
+
+    def delete(self, cart_id):
+        deleted, _ = Cart.objects.filter(id=cart_id).delete()
+        return deleted > 0
+
+    @contextmanager
+    def checkout(self, cart_id):
+        # Must run inside a transaction: the row lock makes a concurrent
+        # checkout of the same cart wait and then find it deleted.
+        cart = Cart.objects.select_for_update().filter(id=cart_id).first()
+        if cart is None:
+            raise CartDoesNotExist(cart_id)
+        yield dict(
+            CartItem.objects.filter(cart_id=cart_id)
+            .values_list('product_id', 'quantity')
+        )
+        cart.delete()
+
+
+class RedisCartStore(BaseCartStore):
+    """
+    One Redis hash per cart holding ``p:<product id>`` quantity fields and
+    its creation time. Every write refreshes the TTL, so abandoned carts
+    expire on their own and never reach PostgreSQL.
+    """
+    created_field = '_created'
+    product_field_prefix = 'p:'
+
+    # Conditional writes run as scripts so they can not resurrect a cart
+    # that expired or was deleted between a check and the write.
+    add_item_script = """
+        if redis.call('EXISTS', KEYS[1]) == 0 then return nil end
+        local quantity = redis.call('HINCRBY', KEYS[1], ARGV[1], ARGV[2])
+        redis.call('EXPIRE', KEYS[1], ARGV[3])
+        return quantity
+    """
+    set_item_script = """
+        if redis.call('HEXISTS', KEYS[1], ARGV[1]) == 0 then return 0 end
+        redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+        redis.call('EXPIRE', KEYS[1], ARGV[3])
+        return 1
+    """
+
+    def __init__(self, url=None, ttl=60 * 60 * 24 * 7, key_prefix='store:cart:', client=None):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.ttl = ttl
+        self.key_prefix = key_prefix
+        self._add_item = client.register_script(self.add_item_script)
+        self._set_item = client.register_script(self.set_item_script)
+
+    def _key(self, cart_id):
+        return f'{self.key_prefix}{cart_id}'
+
+    def _field(self, product_id):
+        return f'{self.product_field_prefix}{product_id}'
+
+    def _parse(self, values):
+        items = {}
+        created = None
+        for field, value in values.items():
+            field = field.decode() if isinstance(field, bytes) else field
+            if field == self.created_field:
+                created = float(value)
+            else:
+                items[int(field[len(self.product_field_prefix):])] = int(value)
+        return created, items
+
+    def create(self):
+        cart_id = uuid4()
+        key = self._key(cart_id)
+        pipeline = self.client.pipeline()
+        pipeline.hset(key, self.created_field, time.time())
+        pipeline.expire(key, self.ttl)
+        pipeline.execute()
+        return cart_id
+
+    def exists(self, cart_id):
+        return bool(self.client.exists(self._key(cart_id)))
+
+    def get_created(self, cart_id):
+        created = self.client.hget(self._key(cart_id), self.created_field)
+        if created is None:
+            return None
+        return datetime.fromtimestamp(float(created), tz=dt_timezone.utc)
+
+    def get_items(self, cart_id):
+        key = self._key(cart_id)
+        pipeline = self.client.pipeline()
+        pipeline.hgetall(key)
+        pipeline.expire(key, self.ttl)
+        values, _ = pipeline.execute()
+        if not values:
+            return None
+        return self._parse(values)[1]
+
+    def add_item(self, cart_id, product_id, quantity):
+        quantity = self._add_item(
+            keys=[self._key(cart_id)], args=[self._field(product_id), quantity, self.ttl]
+        )
+        if quantity is None:
+            raise CartDoesNotExist(cart_id)
+        return int(quantity)
+
+    def set_item(self, cart_id, product_id, quantity):
+        return bool(self._set_item(
+            keys=[self._key(cart_id)], args=[self._field(product_id), quantity, self.ttl]
+        ))
+
+    def remove_item(self, cart_id, product_id):
+        return bool(self.client.hdel(self._key(cart_id), self._field(product_id)))
+
+    def delete(self, cart_id):
+        return bool(self.client.delete(self._key(cart_id)))
+
+    @contextmanager
+    def checkout(self, cart_id):
+        key = self._key(cart_id)
+        pipeline = self.client.pipeline(transaction=True)
+        pipeline.hgetall(key)
+        pipeline.delete(key)
+        values, _ = pipeline.execute()
+        if not values:
+            raise CartDoesNotExist(cart_id)
+        try:
+            yield self._parse(values)[1]
+        except BaseException:
+            pipeline = self.client.pipeline(transaction=True)
+            pipeline.hset(key, mapping=values)
+            pipeline.expire(key, self.ttl)
+            pipeline.execute()
+            raise
+
+
+class InMemoryCartStore(BaseCartStore):
+    """
+    Process local cart store with the same semantics as RedisCartStore,
+    meant for tests and single process development servers.
+    """
+
+    def __init__(self, ttl=60 * 60 * 24 * 7):
+        self.ttl = ttl
+        self._carts = {}
+        self._lock = Lock()
+
+    def _key(self, cart_id):
+        return UUID(str(cart_id))
+
+    def _get(self, cart_id):
+        cart = self._carts.get(self._key(cart_id))
+        if cart is None:
+            return None
+        if cart['expires'] <= time.monotonic():
+            del self._carts[self._key(cart_id)]
+            return None
+        cart['expires'] = time.monotonic() + self.ttl
+        return cart
+
+    def create(self):
+        cart_id = uuid4()
+        with self._lock:
+            self._carts[cart_id] = {
+                'created': timezone.now(),
+                'items': {},
+                'expires': time.monotonic() + self.ttl,
+            }
+        return cart_id
+
+    def exists(self, cart_id):
+        with self._lock:
+            return self._get(cart_id) is not None
+
+    def get_created(self, cart_id):
+        with self._lock:
+            cart = self._get(cart_id)
+            return cart and cart['created']
+
+    def get_items(self, cart_id):
+        with self._lock:
+            cart = self._get(cart_id)
+            return None if cart is None else dict(cart['items'])
+
+    def add_item(self, cart_id, product_id, quantity):
+        with self._lock:
+            cart = self._get(cart_id)
+            if cart is None:
+                raise CartDoesNotExist(cart_id)
+            cart['items'][product_id] = cart['items'].get(product_id, 0) + quantity
+            return cart['items'][product_id]
+
+    def set_item(self, cart_id, product_id, quantity):
+        with self._lock:
+            cart = self._get(cart_id)
+            if cart is None or product_id not in cart['items']:
+                return False
+            cart['items'][product_id] = quantity
+            return True
+
+    def remove_item(self, cart_id, product_id):
+        with self._lock:
+            cart = self._get(cart_id)
+            return cart is not None and cart['items'].pop(product_id, None) is not None
+
+    def delete(self, cart_id):
+        with self._lock:
+            return self._get(cart_id) is not None \
+                and self._carts.pop(self._key(cart_id), None) is not None
+
+    @contextmanager
+    def checkout(self, cart_id):
+        with self._lock:
+            cart = self._get(cart_id)
+            if cart is None:
+                raise CartDoesNotExist(cart_id)
+            del self._carts[self._key(cart_id)]
+        try:
+            yield dict(cart['items'])
+        except BaseException:
+            with self._lock:
+                self._carts[self._key(cart_id)] = cart
+            raise
+
+
+@dataclass
+class StoredCartItem:
+    id: int
+    product: Product
+    quantity: int
+    item_total: Decimal
+
+
+@dataclass
+class StoredCart:
+    id: object
+    datetime_created: datetime
+    items: list
+    total_price: Decimal
+
+
+def load_stored_cart(cart_store, cart_id):
+    """
+    Build a StoredCart with its products loaded in one query, or return
+    None if the cart does not exist. Products deleted since they were added
+    are left out.
+
+    The line totals and the cart total are computed by the same query: the
+    quantities are passed in as a CASE and summed with a window.
+    """
+    quantities = cart_store.get_items(cart_id)
+    if quantities is None:
+        return None
+
+    products = {}
+    if quantities:
+        quantity = Case(
+            *[When(pk=product_id, then=Value(quantity)) for product_id, quantity in quantities.items()],
+            output_field=IntegerField()
+        )
+        item_total = ExpressionWrapper(
+            quantity * F('effective_price'), output_field=DecimalField(max_digits=12, decimal_places=2)
+        )
+        products = Product.objects.only('id', 'title', 'unit_price', 'effective_price')\
+            .annotate(item_total=item_total, cart_total=Window(Sum(item_total)))\
+            .in_bulk(quantities)
+
+    return StoredCart(
+        id=cart_id,
+        datetime_created=cart_store.get_created(cart_id),
+        items=[
+            StoredCartItem(
+                id=product_id, product=products[product_id], quantity=quantity,
+                item_total=products[product_id].item_total
+            )
+            for product_id, quantity in sorted(quantities.items())
+            if product_id in products
+        ],
+        total_price=next(iter(products.values())).cart_total if products else Decimal(0),
+    )
+
+
+@lru_cache(maxsize=None)
+def get_cart_store():
+    config = settings.STORE_CART_STORE
+    return import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
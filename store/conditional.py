@@ -0,0 +1,97 @@
+from hashlib import md5
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+
+
+def _aggregate(queryset):
+    return queryset.order_by().aggregate(last_modified=Max('datetime_updated'), count=Count('pk'))
+
+
+async def _aaggregate(queryset):
+    return await queryset.order_by().aaggregate(last_modified=Max('datetime_updated'), count=Count('pk'))
+
+
+def _validators(request, state, use_last_modified):
+    """
+    The ETag covers the URL (filters, page, ordering), the negotiated format
+    and the rows' count and latest change, so deleting a row changes it too.
+
+    A list's latest change does not move when a row is deleted or leaves
+    its filters, so lists get no Last-Modified and are revalidated by ETag.
+    """
+    last_modified = state['last_modified']
+    if last_modified is None:
+        return None, None
+    etag = md5(
+        f'{request.get_full_path()}|{request.headers.get("Accept", "")}|'
+        f'{state["count"]}|{last_modified.isoformat()}'.encode()
+    ).hexdigest()
+    return quote_etag(etag), int(last_modified.timestamp()) if use_last_modified else None
+
+
+def get_validators(request, queryset, use_last_modified=True):
+    """Return the ETag and Last-Modified timestamp of a response built from ``queryset``."""
+    return _validators(request, _aggregate(queryset), use_last_modified)
+
+
+async def aget_validators(request, queryset, use_last_modified=True):
+    return _validators(request, await _aaggregate(queryset), use_last_modified)
+
+
+def not_modified_response(request, etag, last_modified):
+    """A 304 (or 412) response when the request's conditions allow it, else None."""
+    if etag is None:
+        return None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified):
+    if etag is not None and response.status_code in (200, 304):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+
+
+def get_object_queryset(view, queryset):
+    """Narrow ``queryset`` to the object a detail request asks for, None if the lookup is invalid."""
+    lookup_url_kwarg = view.lookup_url_kwarg or view.lookup_field
+    try:
+        return queryset.filter(**{view.lookup_field: view.kwargs[lookup_url_kwarg]})
+    except (TypeError, ValueError, ValidationError):
+        return None
+
+
+class ConditionalGetMixin:
+    """
+    Answer list and retrieve requests with 304 Not Modified while the
+    client's If-None-Match, or for retrieve If-Modified-Since, still hold. The validators
+    come from one aggregate query over datetime_updated, nothing is fetched
+    or serialized for a 304.
+    """
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self._get_conditional_response(
+            request, queryset, super().list, *args, use_last_modified=False, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        queryset = get_object_queryset(self, self.filter_queryset(self.get_queryset()))
+        return self._get_conditional_response(request, queryset, super().retrieve, *args, **kwargs)
+
+    def _get_conditional_response(self, request, queryset, get_response, *args, use_last_modified=True, **kwargs):
+        if queryset is None:
+            return get_response(request, *args, **kwargs)
+
+        etag, last_modified = get_validators(request, queryset, use_last_modified)
+        response = not_modified_response(request, etag, last_modified)
+        if response is None:
+            response = get_response(request, *args, **kwargs)
+            set_validators(response, etag, last_modified)
+        return response
@@ -0,0 +1,124 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import count
+from threading import Lock, Thread
+from urllib.parse import urlencode
+import json
+import sys
+import time
+
+
+class FakeZarinpalHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length', 0))
+        data = json.loads(self.rfile.read(length) or b'{}')
+
+        if server.delay:
+            time.sleep(server.delay)
+
+        if self.path.endswith('/PaymentRequest.json'):
+            self.send_json(200, {'Status': 100, 'Authority': server.new_authority(data)})
+        elif self.path.endswith('/PaymentVerification.json'):
+            if server.take_failure():
+                self.send_json(503, {})
+            else:
+                self.send_json(200, server.verify(data))
+        else:
+            self.send_json(404, {})
+
+    def do_GET(self):
+        # StartPay immediately "pays" and sends the user back to the shop, so
+        # load scenarios can walk the whole checkout flow.
+        authority = self.path.rstrip('/').rsplit('/', 1)[-1]
+        callback_url = self.server.callback_urls.get(authority)
+        if '/StartPay/' not in self.path or callback_url is None:
+            self.send_json(404, {})
+            return
+        self.send_response(302)
+        self.send_header('Location', f'{callback_url}?{urlencode({"Authority": authority, "Status": "OK"})}')
+        self.end_headers()
+
+    def send_json(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class FakeZarinpalServer(ThreadingHTTPServer):
+    """
+    Local stand-in for the Zarinpal sandbox used by tests and load runs.
+
+    ``delay`` slows every API call down and ``verification_failures`` makes
+    that many verifications answer 503 before succeeding.
+    """
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, delay=0, verification_failures=0, verbose=False):
+        super().__init__((host, port), FakeZarinpalHandler)
+        self.delay = delay
+        self.verification_failures = verification_failures
+        self.verbose = verbose
+        self.callback_urls = {}
+        self.verified = set()
+        self.requests = []
+        self._authorities = count(1)
+        self._ref_ids = count(1000)
+        self._lock = Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/pg/'
+
+    @property
+    def api_url(self):
+        return f'{self.base_url}rest/WebGate/'
+
+    @property
+    def start_pay_url(self):
+        return f'{self.base_url}StartPay/'
+
+    def new_authority(self, data):
+        with self._lock:
+            authority = f'A{next(self._authorities):035d}'
+            self.callback_urls[authority] = data.get('CallbackURL')
+            self.requests.append(data)
+        return authority
+
+    def take_failure(self):
+        with self._lock:
+            if self.verification_failures > 0:
+                self.verification_failures -= 1
+                return True
+        return False
+
+    def verify(self, data):
+        authority = data.get('Authority')
+        with self._lock:
+            if authority not in self.callback_urls:
+                return {'Status': -54, 'errors': {'code': -54, 'message': 'Invalid authority.'}}
+            if authority in self.verified:
+                return {'Status': 101, 'RefID': 0}
+            self.verified.add(authority)
+            return {'Status': 100, 'RefID': next(self._ref_ids)}
+
+    def handle_error(self, request, client_address):
+        # Clients that time out on purpose hang up before the answer is sent.
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def start(self):
+        thread = Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -1,6 +1,8 @@
-from django_filters import FilterSet
+from django_filters import FilterSet, NumberFilter
+from rest_framework.filters import SearchFilter
 
-from .models import Product
+from .models import Order, Product
+from .search import is_full_text_search_enabled, search_products
 
 
 class ProductFilter(FilterSet):
@@ -9,4 +11,33 @@ class ProductFilter(FilterSet):
         fields = {
             'inventory': ['gt', 'lt'],
             'unit_price': ['gte', 'lte'],
+            'effective_price': ['gte', 'lte'],
         }
+
+
+class OrderFilter(FilterSet):
+    total_price__gte = NumberFilter(field_name='total_price', lookup_expr='gte')
+    total_price__lte = NumberFilter(field_name='total_price', lookup_expr='lte')
+
+    class Meta:
+        model = Order
+        fields = {
+            'status': ['exact'],
+            'datetime_created': ['gte', 'lte'],
+        }
+
+
+class ProductSearchFilter(SearchFilter):
+    """
+    Search products through the full text index, ranked by relevance, and
+    fall back to the regular icontains search when it is disabled.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if not is_full_text_search_enabled():
+            return super().filter_queryset(request, queryset, view)
+
+        search_terms = self.get_search_terms(request)
+        if not search_terms:
+            return queryset
+        return search_products(queryset, search_terms)
@@ -0,0 +1,107 @@
+from io import BytesIO
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from .media import content_hashed_name
+from .models import ProductImage
+
+logger = logging.getLogger(__name__)
+
+PIL_FORMATS = {
+    'webp': 'WEBP',
+    'jpeg': 'JPEG',
+}
+
+
+def rendition_name(name, rendition, extension):
+    """``store/product/images/a.png`` -> ``store/product/images/renditions/a_thumb.webp``"""
+    directory, filename = os.path.split(name)
+    return os.path.join(directory, 'renditions', f'{os.path.splitext(filename)[0]}_{rendition}.{extension}')
+
+
+def rendition_files(renditions):
+    return {
+        name for entry in renditions.values()
+        for extension, name in entry.items() if extension in PIL_FORMATS
+    }
+
+
+def _open(field_file):
+    config = settings.STORE_IMAGE_RENDITIONS
+    with field_file.open('rb'):
+        image = Image.open(field_file)
+        # Lets the JPEG decoder downscale while decoding, a large part of
+        # the work for camera sized originals.
+        largest = max(config['SIZES'].values(), key=lambda size: size[0] * size[1])
+        image.draft(None, largest)
+        image.load()
+    image = ImageOps.exif_transpose(image)
+    has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+    return image.convert('RGBA' if has_alpha else 'RGB')
+
+
+def _encode(image, extension, quality):
+    if extension == 'jpeg' and image.mode == 'RGBA':
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+
+    buffer = BytesIO()
+    options = {'quality': quality}
+    if extension == 'jpeg':
+        options.update(optimize=True, progressive=True)
+    image.save(buffer, format=PIL_FORMATS[extension], **options)
+    return ContentFile(buffer.getvalue())
+
+
+def create_renditions(field_file):
+    """
+    Resize the image in ``field_file`` to every STORE_IMAGE_RENDITIONS size,
+    in every format, and save the results next to it. Returns the mapping
+    stored in ProductImage.renditions:
+    ``{'thumb': {'width': 150, 'height': 100, 'webp': name, 'jpeg': name}, ...}``
+    """
+    config = settings.STORE_IMAGE_RENDITIONS
+    storage = field_file.storage
+    original = _open(field_file)
+
+    renditions = {}
+    for rendition, size in config['SIZES'].items():
+        image = original.copy()
+        image.thumbnail(size, Image.LANCZOS)
+        entry = {'width': image.width, 'height': image.height}
+        for extension in config['FORMATS']:
+            content = _encode(image, extension, config['QUALITY'])
+            # Named after their content like the originals, so a rendition
+            # made with other settings never replaces a cached one.
+            name = content_hashed_name(rendition_name(field_file.name, rendition, extension), content)
+            entry[extension] = name if storage.exists(name) else storage.save(name, content)
+        renditions[rendition] = entry
+    return renditions
+
+
+def render_product_image(image_id):
+    """Create the renditions of a ProductImage and store them on it, return False if it could not be."""
+    product_image = ProductImage.objects.filter(pk=image_id).first()
+    if product_image is None:
+        return False
+    previous = rendition_files(product_image.renditions)
+    try:
+        product_image.renditions = create_renditions(product_image.image)
+    except (OSError, Image.DecompressionBombError):
+        logger.exception('Could not create the renditions of product image %s', image_id)
+        return False
+    # Goes through save() so the product's cache and validators follow.
+    product_image.save(update_fields=['renditions', 'datetime_updated'])
+    for name in previous - rendition_files(product_image.renditions):
+        product_image.image.storage.delete(name)
+    return True
+
+
+def render_product_images(image_ids):
+    """Render a batch of product images, return the ids that failed."""
+    return [image_id for image_id in image_ids if not render_product_image(image_id)]
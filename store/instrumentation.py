@@ -0,0 +1,247 @@
+from contextlib import ExitStack
+from contextvars import ContextVar
+from threading import Lock
+import json
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_current_timing = ContextVar('store_request_timing', default=None)
+
+
+class RequestTiming:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.query_ms = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.view_start = None
+        self.view_ms = None
+        self.render_start = None
+        self.render_ms = None
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.query_ms += (time.perf_counter() - start) * 1000
+
+    def elapsed_ms(self, since):
+        return (time.perf_counter() - since) * 1000
+
+    def server_timing(self, total_ms):
+        entries = [
+            f'db;dur={self.query_ms:.1f};desc="{self.queries} queries"',
+            f'cache;desc="{self.cache_hits} hits {self.cache_misses} misses"',
+        ]
+        if self.view_ms is not None:
+            entries.append(f'view;dur={self.view_ms:.1f}')
+        if self.render_ms is not None:
+            entries.append(f'render;dur={self.render_ms:.1f}')
+        entries.append(f'total;dur={total_ms:.1f}')
+        return ', '.join(entries)
+
+
+def record_cache(hit):
+    """Count a cache lookup against the request being timed, if any."""
+    timing = _current_timing.get()
+    if timing is None:
+        return
+    if hit:
+        timing.cache_hits += 1
+    else:
+        timing.cache_misses += 1
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the quantile, None past the last one.
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + [None], self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return None
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'mean': round(self.sum / self.count, 2) if self.count else None,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+            'buckets': {
+                f'le_{bound}' if bound is not None else 'inf': count
+                for bound, count in zip(self.buckets + [None], self.counts)
+            },
+        }
+
+
+class ViewStats:
+    """Per view histograms of sampled requests, kept per process."""
+    metrics = ['total_ms', 'db_ms', 'queries']
+
+    def __init__(self):
+        self._views = {}
+        self._lock = Lock()
+
+    def observe(self, view, values):
+        buckets = settings.STORE_PERFORMANCE['BUCKETS']
+        with self._lock:
+            histograms = self._views.setdefault(view, {
+                'total_ms': Histogram(buckets['ms']),
+                'db_ms': Histogram(buckets['ms']),
+                'queries': Histogram(buckets['queries']),
+            })
+            for metric in self.metrics:
+                histograms[metric].observe(values[metric])
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                view: {metric: histogram.as_dict() for metric, histogram in histograms.items()}
+                for view, histograms in sorted(self._views.items())
+            }
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+
+view_stats = ViewStats()
+
+
+class PerformanceMiddleware:
+    """
+    Time a sample of requests: database queries and their duration, catalog
+    cache hits and misses, the view (ORM work and serialization), response
+    rendering and the total. Sampled responses get a Server-Timing header,
+    a structured log line and feed the per view histograms. Requests that
+    are not sampled only cost a call to random().
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+            # Plain hooks would cost every request a hop to a thread.
+            self.process_view = self.aprocess_view
+            self.process_template_response = self.aprocess_template_response
+
+    def sample(self):
+        rate = settings.STORE_PERFORMANCE['SAMPLE_RATE']
+        return rate and random.random() < rate
+
+    def start(self, request, stack):
+        timing = RequestTiming()
+        request._performance_timing = timing
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(timing.execute_wrapper))
+        return timing
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.sample():
+            return self.get_response(request)
+
+        with ExitStack() as stack:
+            timing = self.start(request, stack)
+            token = _current_timing.set(timing)
+            try:
+                response = self.get_response(request)
+            finally:
+                _current_timing.reset(token)
+        self.report(request, response, timing)
+        return response
+
+    async def __acall__(self, request):
+        if not self.sample():
+            return await self.get_response(request)
+
+        # Connections are per thread: wrap the ones of the thread the async
+        # ORM runs this request's queries in.
+        stack = ExitStack()
+        timing = await sync_to_async(self.start)(request, stack)
+        token = _current_timing.set(timing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_timing.reset(token)
+            await sync_to_async(stack.close)()
+        self.report(request, response, timing)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timing = getattr(request, '_performance_timing', None)
+        if timing is not None:
+            timing.view_start = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after the view returns, so the view
+        # time stops here and the render time is taken around render().
+        timing = getattr(request, '_performance_timing', None)
+        if timing is not None:
+            timing.view_ms = timing.elapsed_ms(timing.view_start)
+            timing.render_start = time.perf_counter()
+            response.add_post_render_callback(
+                lambda response: setattr(timing, 'render_ms', timing.elapsed_ms(timing.render_start))
+            )
+        return response
+
+    async def aprocess_view(self, *args):
+        return PerformanceMiddleware.process_view(self, *args)
+
+    async def aprocess_template_response(self, *args):
+        return PerformanceMiddleware.process_template_response(self, *args)
+
+    def report(self, request, response, timing):
+        total_ms = timing.elapsed_ms(timing.start)
+        if timing.view_start is not None and timing.view_ms is None:
+            timing.view_ms = timing.elapsed_ms(timing.view_start)
+        response['Server-Timing'] = timing.server_timing(total_ms)
+
+        match = request.resolver_match
+        view = f'{request.method} {match.view_name if match else "unresolved"}'
+        view_stats.observe(view, {'total_ms': total_ms, 'db_ms': timing.query_ms, 'queries': timing.queries})
+
+        if settings.STORE_PERFORMANCE['LOG']:
+            logger.info(json.dumps({
+                'event': 'request_timing',
+                'view': view,
+                'path': request.path,
+                'status': response.status_code,
+                'total_ms': round(total_ms, 2),
+                'view_ms': timing.view_ms and round(timing.view_ms, 2),
+                'render_ms': timing.render_ms and round(timing.render_ms, 2),
+                'db_ms': round(timing.query_ms, 2),
+                'queries': timing.queries,
+                'cache_hits': timing.cache_hits,
+                'cache_misses': timing.cache_misses,
+            }))
@@ -0,0 +1,57 @@
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Now
+
+from .cache import invalidate_products
+from .models import Product
+
+
+class OutOfStockError(Exception):
+    def __init__(self, lines):
+        super().__init__('Some products do not have enough inventory.')
+        self.lines = lines
+
+
+def reserve_inventory(quantities):
+    """
+    Decrement the inventory of every product in ``quantities`` (a mapping of
+    product id to quantity) or of none of them. Must run inside a transaction.
+
+    The rows are locked in primary key order, so concurrent checkouts that
+    share products always lock them in the same order and can not deadlock,
+    and all the decrements are applied by one conditional UPDATE.
+    Returns the locked products.
+    """
+    products = list(
+        Product.objects.select_for_update()
+        .filter(pk__in=quantities)
+        .order_by('pk')
+        .only('id', 'title', 'unit_price', 'effective_price', 'inventory')
+    )
+
+    out_of_stock = [
+        f'Product {product.id} ({product.title}): requested {quantities[product.id]}, '
+        f'only {max(product.inventory, 0)} left.'
+        for product in products
+        if product.inventory < quantities[product.id]
+    ]
+    if out_of_stock:
+        raise OutOfStockError(out_of_stock)
+
+    in_stock = Q()
+    for product_id, quantity in quantities.items():
+        in_stock |= Q(pk=product_id, inventory__gte=quantity)
+
+    updated = Product.objects.filter(in_stock).update(
+        inventory=F('inventory') - Case(
+            *[
+                When(pk=product_id, then=Value(quantity))
+                for product_id, quantity in quantities.items()
+            ]
+        ),
+        datetime_updated=Now()
+    )
+    if updated != len(quantities):
+        raise OutOfStockError(['Some products are no longer available.'])
+
+    invalidate_products(quantities)
+    return products
@@ -0,0 +1,35 @@
+from datetime import date
+import time
+
+from django.core.management.base import BaseCommand
+
+from store.analytics import backfill_daily_sales, order_date_range
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily sales rollup of historical orders.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', type=date.fromisoformat,
+                            help='First day (YYYY-MM-DD), defaults to the first order.')
+        parser.add_argument('--to', dest='date_to', type=date.fromisoformat,
+                            help='Last day (YYYY-MM-DD), defaults to the last order.')
+        parser.add_argument('--batch-days', type=int, default=31)
+
+    def handle(self, *args, **options):
+        date_range = order_date_range()
+        if date_range is None:
+            self.stdout.write('There are no orders to roll up.')
+            return
+
+        first_day = options['date_from'] or date_range[0]
+        last_day = options['date_to'] or date_range[1]
+        start = time.perf_counter()
+        total = 0
+        for batch_first, batch_last, rows in backfill_daily_sales(first_day, last_day, options['batch_days']):
+            total += rows
+            self.stdout.write(f'{batch_first} to {batch_last}: {rows} rollup rows.')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} rollup rows written in {time.perf_counter() - start:.2f}s.'
+        ))
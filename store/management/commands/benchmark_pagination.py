@@ -0,0 +1,95 @@
+from statistics import median, quantiles
+from urllib.parse import parse_qs, urlparse
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from rest_framework.pagination import Cursor
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from store.models import Order, Product
+from store.paginations import CustomCursorPagination, SelectablePagination
+from store.views import OrderViewSet, ProductViewSet
+
+
+ENDPOINTS = {
+    'products': (ProductViewSet, Product, '/store/products/'),
+    'orders': (OrderViewSet, Order, '/store/orders/'),
+}
+
+
+class Command(BaseCommand):
+    help = 'Compare page number and cursor pagination latency at shallow and deep pages.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--endpoint', choices=ENDPOINTS, default='products')
+        parser.add_argument('--pages', type=int, nargs='+', default=[1, 10_000])
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument(
+            '--username', help='Staff user to authenticate as (defaults to the first staff user).'
+        )
+
+    def handle(self, *args, **options):
+        viewset, model, url = ENDPOINTS[options['endpoint']]
+        view = viewset.as_view({'get': 'list'}, pagination_class=SelectablePagination)
+        user = self.get_user(options['username'])
+        page_size = CustomCursorPagination.page_size
+
+        catalog_cache = {**settings.STORE_CATALOG_CACHE, 'ENABLED': False}
+        with override_settings(ALLOWED_HOSTS=['testserver'], STORE_CATALOG_CACHE=catalog_cache):
+            self.stdout.write(f'{"mode":<8}{"page":>10}{"median ms":>12}{"p95 ms":>10}')
+            for page in options['pages']:
+                offset = (page - 1) * page_size
+                if not model.objects.order_by('-id')[offset:offset + 1].exists():
+                    self.stdout.write(self.style.WARNING(f'Skipping page {page}: not enough rows.'))
+                    continue
+
+                page_number_params = {'page': page}
+                cursor_params = {'pagination': 'cursor'}
+                if page > 1:
+                    position = model.objects.order_by('-id')\
+                        .values_list('id', flat=True)[offset - 1]
+                    cursor_params['cursor'] = self.encode_cursor(url, position)
+
+                for mode, params in [('page', page_number_params), ('cursor', cursor_params)]:
+                    timings = self.measure(view, url, params, user, options['repeat'])
+                    self.stdout.write(
+                        f'{mode:<8}{page:>10}{median(timings):>12.2f}{self.p95(timings):>10.2f}'
+                    )
+
+    def get_user(self, username):
+        users = get_user_model().objects.filter(is_staff=True)
+        if username:
+            users = users.filter(username=username)
+        user = users.order_by('pk').first()
+        if user is None:
+            raise CommandError('A staff user is required to run the benchmark.')
+        return user
+
+    def encode_cursor(self, url, position):
+        paginator = CustomCursorPagination()
+        paginator.base_url = url
+        cursor_url = paginator.encode_cursor(Cursor(offset=0, reverse=False, position=str(position)))
+        return parse_qs(urlparse(cursor_url).query)[paginator.cursor_query_param][0]
+
+    def measure(self, view, url, params, user, repeat):
+        factory = APIRequestFactory()
+        timings = []
+        for _ in range(repeat):
+            request = factory.get(url, params)
+            force_authenticate(request, user=user)
+            start = time.perf_counter()
+            response = view(request)
+            response.render()
+            timings.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                raise CommandError(f'{url} returned {response.status_code}.')
+        return timings
+
+    def p95(self, timings):
+        if len(timings) < 2:
+            return timings[0]
+        return quantiles(timings, n=20)[-1]
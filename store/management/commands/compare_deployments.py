@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from store.benchmark.scenario import CatalogScenario
+
+
+class Command(BaseCommand):
+    help = (
+        'Run the catalog browsing scenario against two running deployments, for example the '
+        'gunicorn WSGI service and the uvicorn ASGI one, and compare throughput and tail latency.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wsgi-url', default='http://web:8000/')
+        parser.add_argument('--asgi-url', default='http://web-asgi:8000/')
+        parser.add_argument('--users', type=int, default=100, help='Concurrent virtual users.')
+        parser.add_argument('--iterations', type=int, default=20, help='Journeys per user.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        summaries = {}
+        for name in ['wsgi', 'asgi']:
+            scenario = CatalogScenario(
+                options[f'{name}_url'],
+                users=options['users'],
+                iterations=options['iterations'],
+                seed=options['seed'],
+            )
+            scenario.run()
+            self.stdout.write(f'{name.upper()} {options[f"{name}_url"]}')
+            self.stdout.write(scenario.report())
+            summaries[name] = scenario.summary()
+
+        self.stdout.write(
+            f'{"":<6}{"requests":>9}{"errors":>8}{"req/s":>9}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"max ms":>9}'
+        )
+        for name, summary in summaries.items():
+            self.stdout.write(
+                f'{name:<6}{summary["requests"]:>9}{summary["errors"]:>8}{summary["requests_per_second"]:>9.1f}'
+                f'{summary["p50"]:>9.1f}{summary["p95"]:>9.1f}{summary["p99"]:>9.1f}{summary["max"]:>9.1f}'
+            )
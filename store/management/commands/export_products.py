@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from store.product_io import FORMATS, WRITERS, export_rows
+
+
+class Command(BaseCommand):
+    help = 'Stream every product to a CSV or JSON Lines file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='-', help='File to write, "-" for stdout.')
+        parser.add_argument('--format', choices=FORMATS, default='csv')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        write, _ = WRITERS[options['format']]
+        rows = 0
+
+        def counted():
+            nonlocal rows
+            for row in export_rows(chunk_size=options['chunk_size']):
+                rows += 1
+                yield row
+
+        start = time.perf_counter()
+        if options['output'] == '-':
+            for chunk in write(counted()):
+                self.stdout.write(chunk, ending='')
+            report = self.stderr
+        else:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as file:
+                file.writelines(write(counted()))
+            report = self.stdout
+        seconds = time.perf_counter() - start
+
+        report.write(self.style.SUCCESS(
+            f'{rows} products exported in {seconds:.2f}s ({rows / seconds if seconds else 0:.0f} rows/sec).'
+        ))
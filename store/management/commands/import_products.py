@@ -0,0 +1,38 @@
+from pathlib import Path
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from store.product_io import FORMATS, import_products
+
+
+class Command(BaseCommand):
+    help = 'Bulk create or update products from a CSV or JSON Lines file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import, "-" to read from stdin.')
+        parser.add_argument('--format', choices=FORMATS, help='Defaults to the file extension.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or Path(path).suffix.lstrip('.').lower()
+        if file_format not in FORMATS:
+            raise CommandError(f'Unknown format "{file_format}", use --format.')
+
+        if path == '-':
+            result = import_products(sys.stdin, file_format, options['batch_size'])
+        else:
+            with open(path, newline='', encoding='utf-8') as file:
+                result = import_products(file, file_format, options['batch_size'])
+
+        for error in result.errors:
+            self.stderr.write(f'Line {error["line"]}: {error["errors"]}')
+        if result.error_count > len(result.errors):
+            self.stderr.write(f'... and {result.error_count - len(result.errors)} more errors.')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{result.rows} rows: {result.created} created, {result.updated} updated, '
+            f'{result.error_count} skipped in {result.seconds:.2f}s '
+            f'({result.rows_per_second:.0f} rows/sec).'
+        ))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from store.models import Category
+
+
+class Command(BaseCommand):
+    help = 'Recount the products of every category and fix drifted product_count values.'
+
+    def handle(self, *args, **options):
+        corrected = Category.objects.refresh_product_count()
+        self.stdout.write(self.style.SUCCESS(
+            f'{corrected} category product counts corrected.'
+        ))
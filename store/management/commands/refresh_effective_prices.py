@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from store.cache import invalidate_products
+from store.models import Product
+from store.pricing import refresh_effective_prices
+
+
+class Command(BaseCommand):
+    help = 'Recompute the effective price of every product, e.g. after changing the tax rate.'
+
+    def handle(self, *args, **options):
+        product_ids = refresh_effective_prices(Product.objects.all())
+        if product_ids:
+            invalidate_products(product_ids)
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(product_ids)} product prices updated.'
+        ))
@@ -0,0 +1,44 @@
+from concurrent.futures import ProcessPoolExecutor
+import os
+import time
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from store.images import render_product_images
+from store.models import ProductImage
+
+
+class Command(BaseCommand):
+    help = 'Create the renditions of product images that have none, in parallel worker processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Re-render the images that already have renditions.')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='Worker processes, 1 renders in this process. Defaults to the CPU count.')
+        parser.add_argument('--chunk-size', type=int, default=20)
+
+    def handle(self, *args, **options):
+        images = ProductImage.objects.order_by('pk')
+        if not options['all']:
+            images = images.filter(renditions={})
+        image_ids = list(images.values_list('pk', flat=True))
+        chunk_size = options['chunk_size']
+        chunks = [image_ids[index:index + chunk_size] for index in range(0, len(image_ids), chunk_size)]
+
+        start = time.perf_counter()
+        if options['workers'] <= 1:
+            failed = [image_id for chunk in chunks for image_id in render_product_images(chunk)]
+        else:
+            # Forked workers must not share this process' database connections.
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options['workers'], initializer=django.setup) as executor:
+                failed = [image_id for ids in executor.map(render_product_images, chunks) for image_id in ids]
+
+        for image_id in failed:
+            self.stderr.write(f'Product image {image_id} could not be rendered.')
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(image_ids) - len(failed)} product images rendered, {len(failed)} failed '
+            f'in {time.perf_counter() - start:.2f}s.'
+        ))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from store.fake_gateway import FakeZarinpalServer
+
+
+class Command(BaseCommand):
+    help = 'Run a local fake Zarinpal gateway for development and load tests.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8001)
+        parser.add_argument('--delay', type=float, default=0, help='Seconds to wait before every API answer.')
+        parser.add_argument('--verification-failures', type=int, default=0)
+
+    def handle(self, *args, **options):
+        server = FakeZarinpalServer(
+            host=options['host'],
+            port=options['port'],
+            delay=options['delay'],
+            verification_failures=options['verification_failures'],
+            verbose=options['verbosity'] > 1,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Fake Zarinpal listening, set ZARINPAL_API_URL={server.api_url} '
+            f'and ZARINPAL_START_PAY_URL={server.start_pay_url}'
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
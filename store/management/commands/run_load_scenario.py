@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from store.benchmark.scenario import LoadScenario
+
+
+class Command(BaseCommand):
+    help = (
+        'Run the browse, search, cart, checkout and payment scenario against a running server '
+        'seeded with seed_benchmark_data. Point its ZARINPAL_* settings at run_fake_zarinpal first.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000/')
+        parser.add_argument('--users', type=int, default=10, help='Concurrent virtual users.')
+        parser.add_argument('--iterations', type=int, default=10, help='Journeys per user.')
+        parser.add_argument('--think-time', type=float, default=0, help='Mean pause between journeys, in seconds.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        scenario = LoadScenario(
+            options['base_url'],
+            users=options['users'],
+            iterations=options['iterations'],
+            think_time=options['think_time'],
+            seed=options['seed'],
+        )
+        scenario.run()
+        self.stdout.write(scenario.report())
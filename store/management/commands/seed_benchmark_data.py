@@ -0,0 +1,28 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from store.benchmark.dataset import SIZES, USERNAME_PREFIX, PASSWORD, DatasetGenerator
+
+
+class Command(BaseCommand):
+    help = 'Generate a deterministic benchmark dataset with bulk inserts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', choices=SIZES, default='small')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if get_user_model().objects.filter(username__startswith=USERNAME_PREFIX).exists():
+            raise CommandError('The database already holds a benchmark dataset, start from an empty one.')
+
+        DatasetGenerator(
+            SIZES[options['size']],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            log=self.stdout.write,
+        ).generate()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Benchmark users are {USERNAME_PREFIX}000000... with the password "{PASSWORD}".'
+        ))
@@ -0,0 +1,75 @@
+import hashlib
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db.models.fields.files import ImageField, ImageFieldFile
+from django.http import Http404, HttpResponse
+from django.utils._os import safe_join
+from django.views.decorators.http import require_safe
+from django.views.static import serve
+
+# photo.3f2a9c1b4d5e6f70.png, or photo.3f2a9c1b4d5e6f70_AbC1234.png when
+# the storage had to make the name unique.
+CONTENT_HASHED_NAME = re.compile(r'\.[0-9a-f]{16}(_[a-zA-Z0-9]{7})?\.[a-zA-Z0-9]+$')
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+
+def content_hashed_name(name, content):
+    """``a/photo.png`` -> ``a/photo.<the first 16 hex digits of the content's sha256>.png``"""
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    directory, filename = os.path.split(name)
+    stem, extension = os.path.splitext(filename)
+    return os.path.join(directory, f'{stem}.{digest.hexdigest()[:16]}{extension.lower()}')
+
+
+class ContentHashedImageFieldFile(ImageFieldFile):
+    def save(self, name, content, save=True):
+        super().save(content_hashed_name(name, content), content, save)
+
+
+class ContentHashedImageField(ImageField):
+    """
+    An ImageField whose files are named after their content, so a file name
+    never points to different bytes and can be cached forever.
+    """
+    attr_class = ContentHashedImageFieldFile
+
+
+def cache_control(name):
+    if CONTENT_HASHED_NAME.search(name):
+        return f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    return f'public, max-age={settings.STORE_MEDIA["MAX_AGE"]}'
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Decide whether a media file may be served and hand it to nginx with
+    X-Accel-Redirect, the file is never read here. Without an
+    ACCEL_REDIRECT location, as under runserver, Django serves it in DEBUG.
+    """
+    config = settings.STORE_MEDIA
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    name = os.path.relpath(full_path, settings.MEDIA_ROOT).replace(os.sep, '/')
+    if not name.startswith(tuple(config['PUBLIC_DIRECTORIES'])) or not os.path.isfile(full_path):
+        raise Http404
+
+    if config['ACCEL_REDIRECT']:
+        content_type, encoding = mimetypes.guess_type(name)
+        response = HttpResponse(content_type=content_type or 'application/octet-stream')
+        response['X-Accel-Redirect'] = config['ACCEL_REDIRECT'] + quote(name)
+    elif settings.DEBUG:
+        response = serve(request, name, document_root=settings.MEDIA_ROOT)
+    else:
+        raise Http404
+    response['Cache-Control'] = cache_control(name)
+    return response
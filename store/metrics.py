@@ -0,0 +1,145 @@
+import logging
+import os
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from celery.signals import task_failure, task_postrun, task_prerun, worker_ready
+from django.conf import settings
+from django.http import HttpResponse
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, \
+    generate_latest, multiprocess, start_http_server
+from prometheus_client.core import GaugeMetricFamily
+
+logger = logging.getLogger(__name__)
+
+
+REQUESTS = Counter(
+    'store_api_requests_total', 'API requests by view action and status.',
+    ['view', 'action', 'method', 'status'],
+)
+REQUEST_DURATION = Histogram(
+    'store_api_request_duration_seconds', 'API request duration by view action.',
+    ['view', 'action', 'method'],
+)
+TASKS = Counter(
+    'store_celery_tasks_total', 'Finished Celery tasks by state.',
+    ['task', 'state'],
+)
+TASK_FAILURES = Counter(
+    'store_celery_task_failures_total', 'Celery tasks that raised.',
+    ['task', 'exception'],
+)
+TASK_DURATION = Histogram(
+    'store_celery_task_duration_seconds', 'Celery task run time.',
+    ['task'],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 300),
+)
+PAYMENT_GATEWAY_DURATION = Histogram(
+    'store_payment_gateway_request_duration_seconds', 'Zarinpal API call duration by outcome.',
+    ['operation', 'outcome'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+
+def get_registry():
+    """
+    The registry to expose. With PROMETHEUS_MULTIPROC_DIR set every worker
+    process writes its samples there and they are merged on collection.
+    """
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    queues = settings.STORE_METRICS['CELERY_QUEUES']
+    if queues:
+        registry.register(CeleryQueueCollector(queues))
+    return registry
+
+
+class CeleryQueueCollector:
+    """Broker queue depth, read when the endpoint is scraped."""
+
+    def __init__(self, queues):
+        self.queues = queues
+
+    def collect(self):
+        from config.celery import celery
+
+        depth = GaugeMetricFamily('store_celery_queue_length', 'Messages waiting in a Celery queue.', labels=['queue'])
+        try:
+            with celery.connection_for_read() as connection:
+                channel = connection.default_channel
+                for queue in self.queues:
+                    depth.add_metric([queue], channel.queue_declare(queue=queue, passive=True).message_count)
+        except Exception:
+            logger.exception('Could not read the Celery queue lengths')
+        yield depth
+
+
+def metrics(request):
+    return HttpResponse(generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST)
+
+
+class MetricsMiddleware:
+    """Count and time every request under the viewset and action that served it."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        start = time.perf_counter()
+        response = self.get_response(request)
+        self.observe(request, response, start)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self.observe(request, response, start)
+        return response
+
+    def observe(self, request, response, start):
+        view, action = 'none', 'none'
+        if request.resolver_match is not None:
+            view_func = request.resolver_match.func
+            view = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+            actions = getattr(view_func, 'actions', None) or {}
+            view = view.__name__ if view else view_func.__name__
+            action = actions.get(request.method.lower(), request.method.lower())
+        REQUEST_DURATION.labels(view, action, request.method).observe(time.perf_counter() - start)
+        REQUESTS.labels(view, action, request.method, response.status_code).inc()
+
+
+_task_starts = {}
+
+
+@task_prerun.connect
+def _start_task_timer(task_id=None, **kwargs):
+    _task_starts[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def _observe_task(task_id=None, task=None, state=None, **kwargs):
+    start = _task_starts.pop(task_id, None)
+    if start is not None:
+        TASK_DURATION.labels(task.name).observe(time.perf_counter() - start)
+    TASKS.labels(task.name, state or 'UNKNOWN').inc()
+
+
+@task_failure.connect
+def _count_task_failure(sender=None, exception=None, **kwargs):
+    TASK_FAILURES.labels(sender.name, type(exception).__name__).inc()
+
+
+@worker_ready.connect
+def _serve_worker_metrics(**kwargs):
+    port = settings.STORE_METRICS['CELERY_PORT']
+    if port:
+        start_http_server(port, registry=get_registry())
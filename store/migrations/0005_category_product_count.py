@@ -0,0 +1,38 @@
+# Generated by Django 5.0.1 on 2026-10-18 09:12
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_product_count(apps, schema_editor):
+    Category = apps.get_model('store', 'Category')
+    Product = apps.get_model('store', 'Product')
+    Category.objects.update(
+        product_count=Coalesce(
+            Subquery(
+                Product.objects.filter(category_id=OuterRef('pk'))
+                .order_by()
+                .values('category_id')
+                .annotate(count=Count('pk'))
+                .values('count')
+            ),
+            0
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0004_order_zarinpal_authority_order_zarinpal_data_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='product_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_product_count, migrations.RunPython.noop),
+    ]
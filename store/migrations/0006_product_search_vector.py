@@ -0,0 +1,43 @@
+# Generated by Django 5.0.1 on 2026-10-18 20:11
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def populate_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Category = apps.get_model('store', 'Category')
+    Product = apps.get_model('store', 'Product')
+    config = settings.STORE_SEARCH['CONFIG']
+    category_title = Subquery(
+        Category.objects.filter(pk=OuterRef('category_id')).values('title')
+    )
+    Product.objects.update(
+        search_vector=SearchVector('title', weight='A', config=config)
+        + SearchVector(category_title, weight='B', config=config)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0005_category_product_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='store_product_search_idx'),
+        ),
+        migrations.RunPython(populate_search_vector, migrations.RunPython.noop),
+    ]
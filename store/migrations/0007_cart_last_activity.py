@@ -0,0 +1,26 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:05
+
+from django.db import migrations, models
+from django.db.models import F
+import django.utils.timezone
+
+
+def populate_last_activity(apps, schema_editor):
+    Cart = apps.get_model('store', 'Cart')
+    Cart.objects.update(last_activity=F('datetime_created'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0006_product_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='last_activity',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(populate_last_activity, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.0.1 on 2026-10-18 20:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F
+
+
+def populate_datetime_updated(apps, schema_editor):
+    Order = apps.get_model('store', 'Order')
+    Order.objects.update(datetime_updated=F('datetime_created'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0007_cart_last_activity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('value', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='datetime_updated',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.RunPython(populate_datetime_updated, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='order',
+            name='datetime_created',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(choices=[('p', 'Paid'), ('u', 'Unpaid'), ('c', 'Canceled')], max_length=1)),
+                ('orders', models.PositiveIntegerField()),
+                ('quantity', models.PositiveIntegerField()),
+                ('revenue', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('category', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='store.category')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='store.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'day'], name='store_dailysales_status_day')],
+                'unique_together': {('day', 'product', 'status')},
+            },
+        ),
+    ]
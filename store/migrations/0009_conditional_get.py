@@ -0,0 +1,37 @@
+# Generated by Django 5.0.1 on 2026-10-18 18:40
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0008_sales_rollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='datetime_updated',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='datetime_updated',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='datetime_updated',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='datetime_updated',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.0.1 on 2026-10-18 21:05
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import migrations, models
+
+# The default STORE_PRICING['TAX_RATE'] when this migration was written. Run
+# the refresh_effective_prices command after migrating with another rate.
+TAX_RATE = Decimal('0.09')
+
+
+def populate_effective_price(apps, schema_editor):
+    Product = apps.get_model('store', 'Product')
+    products = list(Product.objects.only('id', 'unit_price').prefetch_related('discounts'))
+    for product in products:
+        price = Decimal(product.unit_price)
+        for discount in product.discounts.all():
+            discount = min(max(Decimal(str(discount.discount)), Decimal(0)), Decimal(100))
+            price *= 1 - discount / 100
+        price *= 1 + TAX_RATE
+        product.effective_price = price.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+    Product.objects.bulk_update(products, ['effective_price'], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0009_conditional_get'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='effective_price',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=0, editable=False, max_digits=8),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='orderitem',
+            name='unit_price',
+            field=models.DecimalField(decimal_places=2, max_digits=8),
+        ),
+        migrations.RunPython(populate_effective_price, migrations.RunPython.noop),
+    ]
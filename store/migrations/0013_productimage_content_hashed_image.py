@@ -0,0 +1,19 @@
+# Generated by Django 5.0.1 on 2026-10-18 21:24
+
+import store.media
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0012_image_uploads'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='productimage',
+            name='image',
+            field=store.media.ContentHashedImageField(upload_to='store/product/images'),
+        ),
+    ]
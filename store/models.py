@@ -1,8 +1,39 @@
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import connections, models
+from django.db.models import Count, ExpressionWrapper, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, Now
 from django.conf import settings
+from django.utils import timezone
 from uuid import uuid4
 from decimal import Decimal
 
+from .media import ContentHashedImageField
+
+
+class CategoryManager(models.Manager):
+    def refresh_product_count(self, category_ids=None):
+        """
+        Recount the products of the given categories (or of every category)
+        and fix the ones whose stored product_count has drifted. Returns the
+        number of categories that were corrected.
+        """
+        product_count = Coalesce(
+            Subquery(
+                Product.objects.filter(category_id=OuterRef('pk'))
+                .order_by()
+                .values('category_id')
+                .annotate(count=Count('pk'))
+                .values('count')
+            ),
+            0
+        )
+        queryset = self.annotate(actual_product_count=product_count)\
+            .exclude(product_count=models.F('actual_product_count'))
+        if category_ids is not None:
+            queryset = queryset.filter(pk__in=category_ids)
+        return queryset.update(product_count=product_count, datetime_updated=Now())
+
 
 class Category(models.Model):
     title = models.CharField(max_length=255)
@@ -10,10 +41,24 @@ class Category(models.Model):
     top_product = models.ForeignKey(
         'Product', on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
     )
+    product_count = models.PositiveIntegerField(default=0, editable=False)
+    datetime_updated = models.DateTimeField(auto_now=True)
+
+    objects = CategoryManager()
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        # product_count is kept with F() updates by store.signals, saving an
+        # existing category must not write back the count it was loaded with.
+        if not self._state.adding:
+            update_fields = kwargs.get('update_fields')
+            if update_fields is None:
+                update_fields = [field.name for field in self._meta.concrete_fields if not field.primary_key]
+            kwargs['update_fields'] = [name for name in update_fields if name != 'product_count']
+        super().save(*args, **kwargs)
+
 
 class Discount(models.Model):
     discount = models.FloatField()
@@ -31,10 +76,18 @@ class Product(models.Model):
     description = models.TextField()
     slug = models.SlugField()
     unit_price = models.DecimalField(max_digits=6, decimal_places=2)
+    # unit_price with the discounts and the tax applied, kept by store.pricing.
+    effective_price = models.DecimalField(max_digits=8, decimal_places=2, editable=False, db_index=True)
     inventory = models.IntegerField()
     datetime_created = models.DateTimeField(auto_now_add=True)
-    datetime_updated = models.DateTimeField(auto_now=True)
+    datetime_updated = models.DateTimeField(auto_now=True, db_index=True)
     discounts = models.ManyToManyField(Discount, blank=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='store_product_search_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -44,7 +97,49 @@ class ProductImage(models.Model):
     product = models.ForeignKey(
         Product, on_delete=models.CASCADE, related_name='images'
     )
-    image = models.ImageField(upload_to='store/product/images')
+    image = ContentHashedImageField(upload_to='store/product/images')
+    # Resized copies made by store.images, see create_renditions().
+    renditions = models.JSONField(default=dict, blank=True, editable=False)
+    datetime_updated = models.DateTimeField(auto_now=True)
+
+
+class ImageUpload(models.Model):
+    """
+    A product image uploaded in parts by store.uploads. The parts are kept
+    in the image_uploads storage until the upload is completed.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid4)
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name='image_uploads'
+    )
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100)
+    size = models.PositiveIntegerField()
+    part_size = models.PositiveIntegerField()
+    product_image = models.OneToOneField(
+        ProductImage, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    datetime_created = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    @property
+    def part_count(self):
+        return -(-self.size // self.part_size)
+
+    def get_part_size(self, number):
+        if number == self.part_count:
+            return self.size - (number - 1) * self.part_size
+        return self.part_size
+
+
+class ImageUploadPart(models.Model):
+    upload = models.ForeignKey(
+        ImageUpload, on_delete=models.CASCADE, related_name='parts'
+    )
+    number = models.PositiveIntegerField()
+    size = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = [['upload', 'number']]
 
 
 class Customer(models.Model):
@@ -85,14 +180,87 @@ class Comment(models.Model):
     )
     body = models.TextField()
     datetime_created = models.DateTimeField(auto_now_add=True)
+    datetime_updated = models.DateTimeField(auto_now=True)
     status = models.CharField(
         max_length=2, choices=COMMENT_STATUS, default=COMMENT_STATUS_WAITING
     )
 
 
+class CartQuerySet(models.QuerySet):
+    def touch(self):
+        return self.update(last_activity=timezone.now())
+
+    def expired(self, ttl):
+        return self.filter(last_activity__lt=timezone.now() - ttl)
+
+    def with_total_price(self):
+        total_price = CartItem.objects.filter(cart_id=OuterRef('pk'))\
+            .order_by()\
+            .values('cart_id')\
+            .annotate(total=Sum(F('quantity') * F('product__effective_price')))\
+            .values('total')
+        return self.annotate(
+            total_price=Coalesce(
+                Subquery(total_price),
+                Decimal(0),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2)
+            )
+        )
+
+
 class Cart(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid4)
     datetime_created = models.DateTimeField(auto_now_add=True)
+    last_activity = models.DateTimeField(default=timezone.now, db_index=True)
+
+    objects = CartQuerySet.as_manager()
+
+
+class CartItemQuerySet(models.QuerySet):
+    def with_item_total(self):
+        return self.annotate(
+            item_total=ExpressionWrapper(
+                F('quantity') * F('product__effective_price'),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2)
+            )
+        )
+
+
+class CartItemManager(models.Manager.from_queryset(CartItemQuerySet)):
+    def add_quantities(self, cart_id, quantities):
+        """
+        Add ``quantities`` (a mapping of product id to quantity) to the cart
+        with a single INSERT ... ON CONFLICT DO UPDATE statement, so
+        concurrent adds of the same product never race on the
+        (cart, product) unique constraint. Returns the affected items.
+        """
+        if not quantities:
+            return []
+
+        Cart.objects.filter(pk=cart_id).touch()
+
+        connection = connections[self.db]
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        cart_id = self.model._meta.get_field('cart').get_db_prep_value(cart_id, connection)
+
+        params = []
+        for product_id, quantity in quantities.items():
+            params += [cart_id, product_id, quantity]
+
+        sql = '''
+            INSERT INTO {table} (cart_id, product_id, quantity)
+            VALUES {rows}
+            ON CONFLICT (cart_id, product_id)
+            DO UPDATE SET quantity = {table}.quantity + EXCLUDED.quantity
+            RETURNING id, cart_id, product_id, quantity
+        '''.format(table=table, rows=', '.join(['(%s, %s, %s)'] * len(quantities)))
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [
+                self.model.from_db(self.db, ['id', 'cart_id', 'product_id', 'quantity'], row)
+                for row in cursor.fetchall()
+            ]
 
 
 class CartItem(models.Model):
@@ -104,10 +272,38 @@ class CartItem(models.Model):
     )
     quantity = models.PositiveSmallIntegerField()
 
+    objects = CartItemManager()
+
     class Meta:
         unique_together = [['cart', 'product']]
 
 
+class OrderQuerySet(models.QuerySet):
+    def with_total_price(self):
+        total_price = OrderItem.objects.filter(order_id=OuterRef('pk'))\
+            .order_by()\
+            .values('order_id')\
+            .annotate(total=Sum(F('unit_price') * F('quantity')))\
+            .values('total')
+        return self.annotate(
+            total_price=Coalesce(
+                Subquery(total_price),
+                Decimal(0),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2)
+            )
+        )
+
+
+class OrderItemQuerySet(models.QuerySet):
+    def with_item_total(self):
+        return self.annotate(
+            item_total=ExpressionWrapper(
+                F('quantity') * F('unit_price'),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2)
+            )
+        )
+
+
 class Order(models.Model):
     ORDER_STATUS_PAID = 'p'
     ORDER_STATUS_UNPAID = 'u'
@@ -121,7 +317,8 @@ class Order(models.Model):
     customer = models.ForeignKey(
         Customer, on_delete=models.PROTECT, related_name='orders'
     )
-    datetime_created = models.DateTimeField(auto_now_add=True)
+    datetime_created = models.DateTimeField(auto_now_add=True, db_index=True)
+    datetime_updated = models.DateTimeField(auto_now=True, db_index=True)
     status = models.CharField(
         max_length=1, choices=ORDER_STATUS, default=ORDER_STATUS_UNPAID
     )
@@ -130,12 +327,10 @@ class Order(models.Model):
     zarinpal_ref_id = models.CharField(max_length=255, blank=True)
     zarinpal_data = models.TextField(blank=True)
 
+    objects = OrderQuerySet.as_manager()
+
     def __str__(self):
         return f'Order id = {self.id}'
-    
-    @property
-    def total_price(self):
-        return sum(item.unit_price * item.quantity for item in self.items.all())
 
 
 class OrderItem(models.Model):
@@ -146,7 +341,38 @@ class OrderItem(models.Model):
         Product, on_delete=models.PROTECT, related_name='order_items'
     )
     quantity = models.PositiveSmallIntegerField()
-    unit_price = models.DecimalField(max_digits=6, decimal_places=2)
+    unit_price = models.DecimalField(max_digits=8, decimal_places=2)
+
+    objects = OrderItemQuerySet.as_manager()
 
     class Meta:
         unique_together = [['order', 'product']]
+
+
+class DailySales(models.Model):
+    """
+    Order items rolled up per day, product and order status, maintained by
+    store.analytics. The category is the product's category at rollup time.
+    """
+    day = models.DateField()
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name='+'
+    )
+    category = models.ForeignKey(
+        Category, on_delete=models.SET_NULL, null=True, related_name='+'
+    )
+    status = models.CharField(max_length=1, choices=Order.ORDER_STATUS)
+    orders = models.PositiveIntegerField()
+    quantity = models.PositiveIntegerField()
+    revenue = models.DecimalField(max_digits=12, decimal_places=2)
+
+    class Meta:
+        unique_together = [['day', 'product', 'status']]
+        indexes = [
+            models.Index(fields=['status', 'day'], name='store_dailysales_status_day'),
+        ]
+
+
+class RollupWatermark(models.Model):
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.DateTimeField()
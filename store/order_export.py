@@ -0,0 +1,83 @@
+from django.db.models import Prefetch
+
+from .models import OrderItem
+from .streaming import csv_lines, json_lines
+
+
+CSV_FIELDS = [
+    'order_id', 'status', 'datetime_created', 'total_price',
+    'customer_id', 'first_name', 'last_name', 'email',
+    'product_id', 'product_title', 'quantity', 'unit_price',
+]
+EXPORT_FORMATS = ['csv', 'ndjson']
+
+
+def iter_orders(queryset, chunk_size=1000):
+    """
+    Iterate over ``queryset`` through a server-side cursor, ``chunk_size``
+    orders at a time with their items prefetched per chunk, so memory use
+    does not grow with the number of orders.
+    """
+    queryset = queryset.select_related('customer__user').prefetch_related(
+        Prefetch('items', queryset=OrderItem.objects.select_related('product').order_by('pk'))
+    )
+    if not queryset.ordered:
+        queryset = queryset.order_by('pk')
+    return queryset.iterator(chunk_size=chunk_size)
+
+
+def order_document(order):
+    user = order.customer.user
+    return {
+        'id': order.id,
+        'status': order.status,
+        'datetime_created': order.datetime_created,
+        'total_price': order.total_price,
+        'customer': {
+            'id': order.customer_id,
+            'first_name': user.first_name,
+            'last_name': user.last_name,
+            'email': user.email,
+        },
+        'items': [
+            {
+                'product_id': item.product_id,
+                'product_title': item.product.title,
+                'quantity': item.quantity,
+                'unit_price': item.unit_price,
+            }
+            for item in order.items.all()
+        ],
+    }
+
+
+def order_csv_rows(orders):
+    # One row per order item, orders without items still get a row.
+    for order in orders:
+        document = order_document(order)
+        customer = document['customer']
+        order_columns = {
+            'order_id': order.id,
+            'status': order.status,
+            'datetime_created': order.datetime_created.isoformat(),
+            'total_price': order.total_price,
+            'customer_id': customer['id'],
+            'first_name': customer['first_name'],
+            'last_name': customer['last_name'],
+            'email': customer['email'],
+        }
+        for item in document['items'] or [{}]:
+            yield {**order_columns, **item}
+
+
+def export_orders(queryset, file_format, chunk_size=1000):
+    orders = iter_orders(queryset, chunk_size)
+    if file_format == 'csv':
+        return csv_lines(order_csv_rows(orders), CSV_FIELDS)
+    return json_lines(order_document(order) for order in orders)
+
+
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
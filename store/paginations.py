@@ -1,5 +1,111 @@
-from rest_framework.pagination import PageNumberPagination
+from django.core.paginator import InvalidPage, Page
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination, PageNumberPagination
 
 
 class CustomPagination(PageNumberPagination):
     page_size = 10
+
+
+class AsyncPageNumberPagination(CustomPagination):
+    """
+    CustomPagination for async views: the count and the page are fetched
+    with the async ORM, the links and the response body are DRF's own.
+    """
+
+    async def apaginate_queryset(self, queryset, request):
+        paginator = self.django_paginator_class(queryset, self.get_page_size(request))
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            number = paginator.validate_number(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+
+        bottom = (number - 1) * paginator.per_page
+        objects = [obj async for obj in queryset[bottom:bottom + paginator.per_page]]
+        self.page = Page(objects, number, paginator)
+        self.request = request
+        return objects
+
+
+class CustomCursorPagination(CursorPagination):
+    page_size = 10
+    ordering = '-id'
+
+    def get_ordering(self, request, queryset, view):
+        # Unlike the DRF default, fall back to ``ordering`` when the view's
+        # ordering filter has no ordering of its own, and always end with the
+        # primary key so rows that share a position keep a stable order.
+        ordering = None
+        for backend in getattr(view, 'filter_backends', []):
+            if hasattr(backend, 'get_ordering'):
+                ordering = backend().get_ordering(request, queryset, view)
+                break
+
+        if not ordering:
+            return (self.ordering, )
+
+        ordering = tuple(ordering)
+        if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            ordering += (self.ordering, )
+        return ordering
+
+
+class SelectablePagination(BasePagination):
+    """
+    Page number pagination by default, keyset pagination when the client asks
+    for it with ``?pagination=cursor``. Cursor pages skip the COUNT(*) query and
+    seek on an indexed column, so deep pages cost the same as the first one.
+    """
+    mode_query_param = 'pagination'
+    cursor_mode = 'cursor'
+    default_pagination_class = CustomPagination
+    cursor_pagination_class = CustomCursorPagination
+
+    def get_paginator(self, request):
+        cursor_query_param = self.cursor_pagination_class.cursor_query_param
+        if request.query_params.get(self.mode_query_param) == self.cursor_mode \
+                or cursor_query_param in request.query_params:
+            return self.cursor_pagination_class()
+        if self.default_pagination_class is not None:
+            return self.default_pagination_class()
+        return None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.paginator = self.get_paginator(request)
+        if self.paginator is None:
+            return None
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.default_pagination_class().get_paginated_response_schema(schema)
+
+    def get_schema_operation_parameters(self, view):
+        parameters = [
+            {
+                'name': self.mode_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Set to "cursor" to use cursor pagination.',
+                'schema': {
+                    'type': 'string',
+                    'enum': [self.cursor_mode],
+                },
+            },
+        ]
+        if self.default_pagination_class is not None:
+            parameters += self.default_pagination_class().get_schema_operation_parameters(view)
+        parameters += self.cursor_pagination_class().get_schema_operation_parameters(view)
+        return parameters
+
+
+class OptionalCursorPagination(SelectablePagination):
+    default_pagination_class = None
+
+    def get_paginated_response_schema(self, schema):
+        return schema
@@ -1,98 +1,215 @@
+from functools import lru_cache
+import time
+
 import requests
-import json
+from asgiref.sync import sync_to_async
+from requests.adapters import HTTPAdapter
 
+from django.conf import settings
 from django.urls import reverse
 from django.shortcuts import redirect, get_object_or_404
 
 from rest_framework.response import Response
+from rest_framework import status
 
+from .metrics import PAYMENT_GATEWAY_DURATION
 from .models import Order
 
 
 DOLLAR_TO_TOMAN = 500_000
+RETRY_STATUSES = frozenset({500, 502, 503, 504})
+
+
+class PaymentGatewayError(Exception):
+    pass
+
+
+class ZarinpalClient:
+    """
+    Zarinpal REST client sharing one pooled HTTP session between requests.
+    Every call is bounded by a connect and read timeout and, retries
+    included, by ``deadline`` seconds, well under the gunicorn worker
+    timeout. Only verifications, which Zarinpal treats as idempotent, are
+    retried with backoff.
+    """
+    request_path = 'PaymentRequest.json'
+    verification_path = 'PaymentVerification.json'
+
+    def __init__(self, merchant_id, api_url, start_pay_url, connect_timeout=3.05,
+                 read_timeout=5, verify_retries=3, backoff_factor=0.5, deadline=15, pool_maxsize=10):
+        self.merchant_id = merchant_id
+        self.api_url = api_url
+        self.start_pay_url = start_pay_url
+        self.timeout = (connect_timeout, read_timeout)
+        self.verify_retries = verify_retries
+        self.backoff_factor = backoff_factor
+        self.deadline = deadline
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            'accept': 'application/json',
+            'content-type': 'application/json',
+        })
+        self.session.mount(self.api_url, HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize))
+
+    def _send(self, path, data, retries):
+        """
+        POST ``data``, retrying connection errors, timeouts and 5xx answers
+        up to ``retries`` times while the deadline allows. Every attempt's
+        timeouts are cut to the time left.
+        """
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            left = max(deadline - time.monotonic(), 0.01)
+            try:
+                response = self.session.post(
+                    self.api_url + path, json=data,
+                    timeout=(min(self.timeout[0], left), min(self.timeout[1], left))
+                )
+                error = None
+            except (requests.ConnectionError, requests.Timeout) as exception:
+                response, error = None, exception
+
+            # Like urllib3's Retry: no wait before the first retry, then doubling.
+            backoff = self.backoff_factor * 2 ** (attempt - 1) if attempt else 0
+            retryable = error is not None or response.status_code in RETRY_STATUSES
+            if not retryable or attempt >= retries or time.monotonic() + backoff >= deadline:
+                if error is not None:
+                    raise error
+                return response
+            time.sleep(backoff)
+            attempt += 1
+
+    def _post(self, path, data, retries=0):
+        operation = path.removesuffix('.json')
+        start = time.perf_counter()
+        try:
+            response = self._send(path, data, retries)
+            response.raise_for_status()
+            data = response.json()
+        except (requests.RequestException, ValueError) as error:
+            PAYMENT_GATEWAY_DURATION.labels(operation, 'error').observe(time.perf_counter() - start)
+            raise PaymentGatewayError(str(error)) from error
+        PAYMENT_GATEWAY_DURATION.labels(operation, 'ok').observe(time.perf_counter() - start)
+
+        errors = data.get('errors')
+        if errors:
+            raise PaymentGatewayError(
+                f'{errors.get("message", "")} {errors.get("code", "")}'.strip()
+            )
+        return data
+
+    def request_payment(self, amount, description, callback_url):
+        data = self._post(self.request_path, {
+            'MerchantID': self.merchant_id,
+            'Amount': amount,
+            'Description': description,
+            'CallbackURL': callback_url,
+        })
+        if not data.get('Authority'):
+            raise PaymentGatewayError(f'No authority returned, status {data.get("Status")}')
+        return data['Authority']
+
+    def verify_payment(self, amount, authority):
+        return self._post(self.verification_path, {
+            'MerchantID': self.merchant_id,
+            'Amount': amount,
+            'Authority': authority,
+        }, retries=self.verify_retries)
+
+    def get_start_pay_url(self, authority):
+        return f'{self.start_pay_url}{authority}'
+
+
+class AsyncZarinpalClient:
+    """
+    Awaitable facade over ZarinpalClient for ASGI views. Calls run in the
+    default executor, so the event loop is never blocked by the gateway and
+    the connection pool of the wrapped client is shared.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.request_payment = sync_to_async(client.request_payment, thread_sensitive=False)
+        self.verify_payment = sync_to_async(client.verify_payment, thread_sensitive=False)
+        self.get_start_pay_url = client.get_start_pay_url
+
+
+@lru_cache(maxsize=None)
+def get_zarinpal_client():
+    config = settings.ZARINPAL
+    return ZarinpalClient(
+        merchant_id=config['MERCHANT_ID'],
+        api_url=config['API_URL'],
+        start_pay_url=config['START_PAY_URL'],
+        connect_timeout=config['CONNECT_TIMEOUT'],
+        read_timeout=config['READ_TIMEOUT'],
+        verify_retries=config['VERIFY_RETRIES'],
+        backoff_factor=config['BACKOFF_FACTOR'],
+        deadline=config['DEADLINE'],
+        pool_maxsize=config['POOL_MAXSIZE'],
+    )
+
+
+def get_async_zarinpal_client():
+    return AsyncZarinpalClient(get_zarinpal_client())
+
+
+def get_rial_total_price(order):
+    return round(float(order.total_price) * DOLLAR_TO_TOMAN, 0)
 
 
 def payment_process(request, order):
-    dollar_total_price = order.total_price
-    rial_total_price = round(float(dollar_total_price) * DOLLAR_TO_TOMAN, 0)
-
-    zarinpal_request_url = 'https://sandbox.zarinpal.com/pg/rest/WebGate/PaymentRequest.json'
-
-    request_header = {
-        "accept": "application/json",
-        "content-type": "application/json",
-    }
-
-    request_data = {
-        'MerchantID': 'aaabbbaaabbbaaabbbaaabbbaaabbbaaabbb',
-        'Amount': rial_total_price,
-        'Description': f'#{order.id}: {order.customer.user.first_name} {order.customer.user.last_name}',
-        'CallbackURL': request.build_absolute_uri(reverse('order-callback')),
-    }
-
-    response = requests.post(
-        url=zarinpal_request_url,
-        data=json.dumps(request_data),
-        headers=request_header
-    )
+    client = get_zarinpal_client()
 
-    data = response.json()
+    try:
+        authority = client.request_payment(
+            amount=get_rial_total_price(order),
+            description=f'#{order.id}: {order.customer.user.first_name} {order.customer.user.last_name}',
+            callback_url=request.build_absolute_uri(reverse('order-callback')),
+        )
+    except PaymentGatewayError:
+        return Response('Error from zarinpal', status=status.HTTP_502_BAD_GATEWAY)
 
-    authority = data['Authority']
     order.zarinpal_authority = authority
     order.save()
 
-    if 'errors' not in data or len(data['errors']) == 0:
-        return redirect(f'https://sandbox.zarinpal.com/pg/StartPay/{authority}')
-    else:
-        return Response('Error from zarinpal')
+    return redirect(client.get_start_pay_url(authority))
 
 
 def payment_callback(request):
     payment_authority = request.GET.get('Authority')
     payment_status = request.GET.get('Status')
 
-    order = get_object_or_404(Order, zarinpal_authority=payment_authority)
-
-    dollar_total_price = order.total_price
-    rial_total_price = round(float(dollar_total_price) * DOLLAR_TO_TOMAN, 0)
-
-    if payment_status == 'OK':
-        request_header = {
-            "accept": "application/json",
-            "content-type": "application/json",
-        }
+    order = get_object_or_404(
+        Order.objects.with_total_price(),
+        zarinpal_authority=payment_authority
+    )
 
-        request_data = {
-            'MerchantID': 'aaabbbaaabbbaaabbbaaabbbaaabbbaaabbb',
-            'Amount': rial_total_price,
-            'Authority': payment_authority,
-        }
+    if payment_status != 'OK':
+        return Response('تراکنش ناموفق بود')
 
-        response = requests.post(
-            url='https://sandbox.zarinpal.com/pg/rest/WebGate/PaymentVerification.json',
-            data=json.dumps(request_data),
-            headers=request_header
+    try:
+        data = get_zarinpal_client().verify_payment(
+            amount=get_rial_total_price(order),
+            authority=payment_authority,
         )
+    except PaymentGatewayError as error:
+        return Response(f'تراکنش ناموفق بود {error}', status=status.HTTP_502_BAD_GATEWAY)
 
-        if 'errors' not in response.json():
-            data = response.json()
-            payment_code = data['Status']
+    payment_code = data['Status']
 
-            if payment_code == 100:
-                order.status = Order.ORDER_STATUS_PAID
-                order.zarinpal_ref_id = data['RefID']
-                order.zarinpal_data = data
-                order.save()
+    if payment_code == 100:
+        order.status = Order.ORDER_STATUS_PAID
+        order.zarinpal_ref_id = data['RefID']
+        order.zarinpal_data = data
+        order.save()
 
-                return Response('پرداخت شما با موفقیت انجام شد.')
+        return Response('پرداخت شما با موفقیت انجام شد.')
 
-            elif payment_code == 101:
-                return Response('پرداخت شما با موفقیت انجام شد. این تراکنش قبلا ثبت شده است.')
+    elif payment_code == 101:
+        return Response('پرداخت شما با موفقیت انجام شد. این تراکنش قبلا ثبت شده است.')
 
-            else:
-                error_code = response.json()['errors']['code']
-                error_message = response.json()['errors']['message']
-                return Response(f'تراکنش ناموفق بود {error_message} {error_code}')
     else:
-        return Response('تراکنش ناموفق بود')
+        return Response(f'تراکنش ناموفق بود {payment_code}')
@@ -0,0 +1,45 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.db.models import Prefetch
+from django.utils import timezone
+
+CENT = Decimal('0.01')
+
+
+def effective_price(unit_price, discounts=()):
+    """
+    The price a customer pays for one unit: every discount (a percentage)
+    applied on top of the previous ones, then the tax.
+    """
+    price = Decimal(unit_price)
+    for discount in discounts:
+        discount = min(max(Decimal(str(discount)), Decimal(0)), Decimal(100))
+        price *= 1 - discount / 100
+    price *= 1 + settings.STORE_PRICING['TAX_RATE']
+    return price.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def refresh_effective_prices(products, chunk_size=2000):
+    """
+    Recompute the stored effective price of the given product queryset and
+    save the ones that changed. Called from signals when a product's
+    discounts change and by bulk operations that bypass them. Returns the
+    ids of the products whose price changed.
+    """
+    discount_model = products.model.discounts.field.related_model
+    products = products.order_by('pk').only('id', 'unit_price', 'effective_price').prefetch_related(
+        Prefetch('discounts', queryset=discount_model.objects.only('id', 'discount'))
+    )
+
+    now = timezone.now()
+    changed = []
+    for product in products.iterator(chunk_size=chunk_size):
+        price = effective_price(product.unit_price, [discount.discount for discount in product.discounts.all()])
+        if price != product.effective_price:
+            product.effective_price = price
+            product.datetime_updated = now
+            changed.append(product)
+
+    products.model.objects.bulk_update(changed, ['effective_price', 'datetime_updated'], batch_size=chunk_size)
+    return [product.pk for product in changed]
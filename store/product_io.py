@@ -0,0 +1,220 @@
+from dataclasses import dataclass, field
+from itertools import islice
+import csv
+import json
+import time
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from rest_framework import serializers
+
+from .cache import invalidate_products
+from .models import Category, Product
+from .pricing import effective_price, refresh_effective_prices
+from .search import refresh_product_search_vectors
+from .streaming import csv_lines, json_lines
+
+
+EXPORT_FIELDS = ['id', 'title', 'slug', 'description', 'price', 'inventory', 'category']
+FORMATS = ['csv', 'jsonl']
+SLUG_MAX_LENGTH = Product._meta.get_field('slug').max_length
+
+
+class ProductRowSerializer(serializers.Serializer):
+    """
+    One imported row. Rows with an ``id`` update that product, rows without
+    one create a new product. The category is given by its title.
+    """
+    id = serializers.IntegerField(required=False, allow_null=True, min_value=1)
+    title = serializers.CharField(max_length=255, min_length=6)
+    slug = serializers.SlugField(max_length=SLUG_MAX_LENGTH, required=False, allow_blank=True)
+    description = serializers.CharField(allow_blank=True, required=False, default='')
+    price = serializers.DecimalField(max_digits=6, decimal_places=2)
+    inventory = serializers.IntegerField()
+    category = serializers.CharField(max_length=255)
+
+    def to_internal_value(self, data):
+        # CSV cells are always strings, an empty id means a new product.
+        if data.get('id') == '':
+            data = {**data, 'id': None}
+        return super().to_internal_value(data)
+
+
+class CategoryLookup:
+    """Resolve category titles to ids, querying each title at most once."""
+
+    def __init__(self):
+        self._ids = {}
+
+    def resolve(self, titles):
+        missing = set(titles) - self._ids.keys()
+        if missing:
+            for pk, title in Category.objects.filter(title__in=missing)\
+                    .order_by('-pk').values_list('pk', 'title'):
+                self._ids[title] = pk
+            for title in missing - self._ids.keys():
+                self._ids[title] = None
+        return {title: self._ids[title] for title in titles}
+
+
+@dataclass
+class ImportResult:
+    rows: int = 0
+    created: int = 0
+    updated: int = 0
+    error_count: int = 0
+    errors: list = field(default_factory=list)
+    seconds: float = 0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0
+
+    def add_error(self, line, errors, max_errors):
+        self.error_count += 1
+        if len(self.errors) < max_errors:
+            self.errors.append({'line': line, 'errors': errors})
+
+    def as_dict(self):
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'updated': self.updated,
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'rows_per_second': round(self.rows_per_second, 1),
+        }
+
+
+def read_csv(file):
+    # Rows are reported by the physical line they end on, so a description
+    # spanning several lines still points at the right place in the file.
+    reader = csv.DictReader(file)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def read_jsonl(file):
+    for line_number, line in enumerate(file, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError:
+            yield line_number, None
+
+
+READERS = {
+    'csv': read_csv,
+    'jsonl': read_jsonl,
+}
+
+
+def import_products(file, file_format, batch_size=1000, max_errors=100):
+    """
+    Stream products from a text ``file`` in ``file_format`` and bulk create
+    or update them ``batch_size`` rows at a time, each batch in its own
+    transaction. Invalid rows are skipped and reported in the result.
+    """
+    result = ImportResult()
+    lookup = CategoryLookup()
+    rows = READERS[file_format](file)
+    start = time.perf_counter()
+
+    while batch := list(islice(rows, batch_size)):
+        result.rows += len(batch)
+        _import_batch(batch, lookup, result, max_errors)
+
+    result.errors.sort(key=lambda error: error['line'])
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def _import_batch(batch, lookup, result, max_errors):
+    valid = []
+    for line, row in batch:
+        if not isinstance(row, dict):
+            result.add_error(line, {'non_field_errors': ['Row is not a valid JSON object.']}, max_errors)
+            continue
+        serializer = ProductRowSerializer(data=row)
+        if serializer.is_valid():
+            valid.append((line, serializer.validated_data))
+        else:
+            result.add_error(line, serializer.errors, max_errors)
+
+    category_ids = lookup.resolve({data['category'] for _, data in valid})
+    update_ids = [data['id'] for _, data in valid if data.get('id')]
+    existing = dict(
+        Product.objects.filter(pk__in=update_ids).values_list('pk', 'category_id')
+    )
+
+    now = timezone.now()
+    creates, updates = [], []
+    for line, data in valid:
+        category_id = category_ids[data['category']]
+        if category_id is None:
+            result.add_error(line, {'category': [f'Category "{data["category"]}" does not exist.']}, max_errors)
+            continue
+        if data.get('id') and data['id'] not in existing:
+            result.add_error(line, {'id': [f'Product {data["id"]} does not exist.']}, max_errors)
+            continue
+
+        product = Product(
+            id=data.get('id'),
+            title=data['title'],
+            slug=data.get('slug') or slugify(data['title'])[:SLUG_MAX_LENGTH],
+            description=data['description'],
+            unit_price=data['price'],
+            effective_price=effective_price(data['price']),
+            inventory=data['inventory'],
+            category_id=category_id,
+            datetime_updated=now,
+        )
+        (updates if product.id else creates).append(product)
+
+    if not creates and not updates:
+        return
+
+    with transaction.atomic():
+        created = Product.objects.bulk_create(creates)
+        Product.objects.bulk_update(
+            updates,
+            ['title', 'slug', 'description', 'unit_price', 'inventory', 'category', 'datetime_updated']
+        )
+
+        # Bulk writes bypass the signals that maintain these.
+        product_ids = [product.id for product in created + updates]
+        refresh_product_search_vectors(Product.objects.filter(pk__in=product_ids))
+        # New products have no discounts yet, updated ones may.
+        refresh_effective_prices(Product.objects.filter(pk__in=[product.id for product in updates]))
+        Category.objects.refresh_product_count(
+            {product.category_id for product in created + updates}
+            | {existing[product.id] for product in updates}
+        )
+        invalidate_products(product_ids)
+
+    result.created += len(created)
+    result.updated += len(updates)
+
+
+def export_rows(queryset=None, chunk_size=2000):
+    """Yield every product as a dict of EXPORT_FIELDS without loading the whole table."""
+    if queryset is None:
+        queryset = Product.objects.all()
+    values = queryset.order_by('pk').values_list(
+        'id', 'title', 'slug', 'description', 'unit_price', 'inventory', 'category__title'
+    )
+    for row in values.iterator(chunk_size=chunk_size):
+        yield dict(zip(EXPORT_FIELDS, row))
+
+
+def export_csv(rows):
+    return csv_lines(rows, EXPORT_FIELDS)
+
+
+WRITERS = {
+    'csv': (export_csv, 'text/csv'),
+    'jsonl': (json_lines, 'application/x-ndjson'),
+}
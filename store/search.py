@@ -0,0 +1,58 @@
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import F, OuterRef, Subquery
+
+
+def is_full_text_search_supported():
+    return connection.vendor == 'postgresql'
+
+
+def is_full_text_search_enabled():
+    return settings.STORE_SEARCH['FULL_TEXT'] and is_full_text_search_supported()
+
+
+def product_search_vector(category_model):
+    config = settings.STORE_SEARCH['CONFIG']
+    category_title = Subquery(
+        category_model.objects.filter(pk=OuterRef('category_id')).values('title')
+    )
+    return SearchVector('title', weight='A', config=config) \
+        + SearchVector(category_title, weight='B', config=config)
+
+
+def refresh_product_search_vectors(products):
+    """
+    Recompute the stored search vector of the given product queryset with a
+    single UPDATE statement. Called from signals for single saves and by
+    bulk operations that bypass them.
+    """
+    if not is_full_text_search_supported():
+        return 0
+    return products.update(
+        search_vector=product_search_vector(products.model.category.field.related_model)
+    )
+
+
+def product_search_query(terms):
+    # Every term is matched as a prefix so partial words keep matching the
+    # way they did with icontains.
+    words = re.findall(r'\w+', ' '.join(terms))
+    if not words:
+        return None
+    return SearchQuery(
+        ' & '.join(f'{word}:*' for word in words),
+        search_type='raw',
+        config=settings.STORE_SEARCH['CONFIG']
+    )
+
+
+def search_products(queryset, terms):
+    query = product_search_query(terms)
+    if query is None:
+        return queryset
+    return queryset.filter(search_vector=query)\
+        .annotate(search_rank=SearchRank(F('search_vector'), query))\
+        .order_by('-search_rank', '-id')
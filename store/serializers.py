@@ -1,13 +1,21 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
 from django.utils.text import slugify
 from decimal import Decimal
 
 from rest_framework import serializers
 
+from .carts import CartDoesNotExist, get_cart_store
+from .images import PIL_FORMATS
+from .inventory import OutOfStockError, reserve_inventory
 from .models import \
     Cart, \
     CartItem, \
     Comment, \
     Customer, \
+    ImageUpload, \
     Order, \
     OrderItem, \
     Product, \
@@ -16,7 +24,9 @@ from .models import \
 
 
 class CategorySerializer(serializers.ModelSerializer):
-    number_of_products = serializers.SerializerMethodField()
+    number_of_products = serializers.IntegerField(
+        source='product_count', read_only=True
+    )
 
     class Meta:
         model = Category
@@ -28,20 +38,72 @@ class CategorySerializer(serializers.ModelSerializer):
                 'Category title should be at least 6.')
         return data
 
-    def get_number_of_products(self, category):
-        return category.products.count()
-    
 
 class ProductImageSerializer(serializers.ModelSerializer):
+    renditions = serializers.SerializerMethodField()
+
     class Meta:
         model = ProductImage
-        fields = ['id', 'image', ]
+        fields = ['id', 'image', 'renditions', ]
+
+    def get_renditions(self, product_image):
+        # Empty until the rendition task has run, clients fall back to image.
+        request = self.context.get('request')
+        storage = product_image.image.storage
+
+        def url(name):
+            url = storage.url(name)
+            return request.build_absolute_uri(url) if request is not None else url
+
+        return {
+            rendition: {
+                key: url(value) if key in PIL_FORMATS else value
+                for key, value in entry.items()
+            }
+            for rendition, entry in product_image.renditions.items()
+        }
 
     def create(self, validated_data):
         product_id = self.context['product_pk']
         return ProductImage.objects.create(product_id=product_id, **validated_data)
 
 
+class ImageUploadSerializer(serializers.ModelSerializer):
+    part_count = serializers.IntegerField(read_only=True)
+    received_parts = serializers.SerializerMethodField()
+    product_image = ProductImageSerializer(read_only=True)
+
+    class Meta:
+        model = ImageUpload
+        fields = ['id', 'filename', 'content_type', 'size', 'part_size',
+                  'part_count', 'received_parts', 'product_image', ]
+        read_only_fields = ['id', 'part_size', ]
+
+    def get_received_parts(self, upload):
+        return sorted(part.number for part in upload.parts.all())
+
+    def validate_content_type(self, content_type):
+        content_types = settings.STORE_IMAGE_UPLOADS['CONTENT_TYPES']
+        if content_type not in content_types:
+            raise serializers.ValidationError(
+                f'Upload one of {", ".join(content_types)}.')
+        return content_type
+
+    def validate_size(self, size):
+        max_size = settings.STORE_IMAGE_UPLOADS['MAX_SIZE']
+        if not 0 < size <= max_size:
+            raise serializers.ValidationError(
+                f'Images can be up to {max_size} bytes.')
+        return size
+
+    def create(self, validated_data):
+        return ImageUpload.objects.create(
+            product_id=self.context['product_pk'],
+            part_size=settings.STORE_IMAGE_UPLOADS['PART_SIZE'],
+            **validated_data
+        )
+
+
 class ProductSerializer(serializers.ModelSerializer):
     price = serializers.DecimalField(
         max_digits=6, decimal_places=2, source='unit_price'
@@ -52,7 +114,9 @@ class ProductSerializer(serializers.ModelSerializer):
         queryset=Category.objects.all()
     )
     images = ProductImageSerializer(many=True, read_only=True)
-    number_of_comments = serializers.SerializerMethodField()
+    number_of_comments = serializers.IntegerField(
+        source='comments_count', read_only=True
+    )
 
     class Meta:
         model = Product
@@ -62,10 +126,7 @@ class ProductSerializer(serializers.ModelSerializer):
         read_only_fields = ['slug', ]
 
     def get_price_aftre_tax(self, product):
-        return round(product.unit_price * Decimal(1.09), 2)
-
-    def get_number_of_comments(self, product):
-        return product.comments.count()
+        return product.effective_price
 
     def validate(self, data):
         if len(data['title']) < 6:
@@ -77,6 +138,7 @@ class ProductSerializer(serializers.ModelSerializer):
         product = Product(**validated_data)
         product.slug = slugify(product.title)
         product.save()
+        product.comments_count = 0
         return product
 
 
@@ -99,57 +161,67 @@ class CommentSerializer(serializers.ModelSerializer):
 class CartItemProductSerializer(serializers.ModelSerializer):
     class Meta:
         model = Product
-        fields = ['id', 'title', 'unit_price', ]
+        fields = ['id', 'title', 'unit_price', 'effective_price', ]
 
 
 class CartItemSerializer(serializers.ModelSerializer):
     product = CartItemProductSerializer()
-    item_total = serializers.SerializerMethodField()
+    item_total = serializers.DecimalField(
+        max_digits=12, decimal_places=2, read_only=True
+    )
 
     class Meta:
         model = CartItem
         fields = ['id', 'product', 'quantity', 'item_total', ]
 
-    def get_item_total(self, cart_item):
-        return cart_item.quantity * cart_item.product.unit_price
-
 
 class CartSerializer(serializers.ModelSerializer):
     items = CartItemSerializer(many=True, read_only=True)
-    total_price = serializers.SerializerMethodField()
+    total_price = serializers.DecimalField(
+        max_digits=12, decimal_places=2, read_only=True
+    )
 
     class Meta:
         model = Cart
         fields = ['id', 'items', 'datetime_created', 'total_price', ]
         read_only_fields = ['id', ]
 
-    def get_total_price(self, cart):
-        return sum(
-            item.quantity * item.product.unit_price
-            for item in cart.items.all()
-        )
+    def create(self, validated_data):
+        cart = super().create(validated_data)
+        cart.total_price = Decimal(0)
+        return cart
+
+
+class StoredCartSerializer(serializers.Serializer):
+    id = serializers.UUIDField(read_only=True)
+    items = CartItemSerializer(many=True, read_only=True)
+    datetime_created = serializers.DateTimeField(read_only=True)
+    total_price = serializers.DecimalField(
+        max_digits=12, decimal_places=2, read_only=True
+    )
+
+
+class AddCartItemListSerializer(serializers.ListSerializer):
+    def create(self, validated_data):
+        quantities = defaultdict(int)
+        for item in validated_data:
+            quantities[item['product'].id] += item['quantity']
+
+        return CartItem.objects.add_quantities(self.context['cart_pk'], quantities)
 
 
 class AddCartItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = CartItem
         fields = ['id', 'product', 'quantity', ]
+        list_serializer_class = AddCartItemListSerializer
 
     def create(self, validated_data):
         product = validated_data.get('product')
         quantity = validated_data.get('quantity')
         cart_id = self.context['cart_pk']
 
-        try:
-            cart_item = CartItem.objects.get(
-                cart_id=cart_id, product_id=product.id)
-            cart_item.quantity += quantity
-            cart_item.save()
-        except CartItem.DoesNotExist:
-            cart_item = CartItem.objects.create(
-                cart_id=cart_id, **validated_data)
-
-        return cart_item
+        return CartItem.objects.add_quantities(cart_id, {product.id: quantity})[0]
 
 
 class UpdateCartItemSerializer(serializers.ModelSerializer):
@@ -166,10 +238,13 @@ class OrderItemProductSerializer(serializers.ModelSerializer):
 
 class OrderItemSerializer(serializers.ModelSerializer):
     product = OrderItemProductSerializer()
+    item_total = serializers.DecimalField(
+        max_digits=12, decimal_places=2, read_only=True
+    )
 
     class Meta:
         model = OrderItem
-        fields = ['id', 'product', 'quantity', 'unit_price', ]
+        fields = ['id', 'product', 'quantity', 'unit_price', 'item_total', ]
 
 
 class OrderCustomerSerializer(serializers.ModelSerializer):
@@ -189,30 +264,39 @@ class OrderCustomerSerializer(serializers.ModelSerializer):
 class OrderForAdminSerializer(serializers.ModelSerializer):
     items = OrderItemSerializer(many=True)
     customer = OrderCustomerSerializer()
+    total_price = serializers.DecimalField(
+        max_digits=12, decimal_places=2, read_only=True
+    )
 
     class Meta:
         model = Order
         fields = ['id', 'customer', 'status', 'datetime_created', 
-                  'items', ]
+                  'items', 'total_price', ]
 
 
 class OrderSerializer(serializers.ModelSerializer):
     items = OrderItemSerializer(many=True)
+    total_price = serializers.DecimalField(
+        max_digits=12, decimal_places=2, read_only=True
+    )
 
     class Meta:
         model = Order
-        fields = ['id', 'status', 'datetime_created', 'items', ]
+        fields = ['id', 'status', 'datetime_created', 'items',
+                  'total_price', ]
 
 
 class OrderCreateSerializer(serializers.Serializer):
     cart_id = serializers.UUIDField()
 
     def validate_cart_id(self, cart_id):
-        if not Cart.objects.filter(id=cart_id).exists():
+        items = get_cart_store().get_items(cart_id)
+
+        if items is None:
             raise serializers.ValidationError(
                 'There is no cart with this cart id.')
 
-        if CartItem.objects.filter(cart_id=cart_id).count() == 0:
+        if not items:
             raise serializers.ValidationError('This cart is empty.')
 
         return cart_id
@@ -223,26 +307,41 @@ class OrderCreateSerializer(serializers.Serializer):
 
         customer = Customer.objects.get(user_id=user_id)
 
-        order = Order.objects.create(customer=customer)
+        with transaction.atomic():
+            try:
+                with get_cart_store().checkout(cart_id) as quantities:
+                    order, _ = self.create_order(customer, quantities)
+            except CartDoesNotExist:
+                raise serializers.ValidationError(
+                    {'cart_id': ['There is no cart with this cart id.']})
+
+        return order
+
+    def create_order(self, customer, quantities):
+        if not quantities:
+            raise serializers.ValidationError(
+                {'cart_id': ['This cart is empty.']})
 
-        cart_items = CartItem.objects.select_related('product')\
-            .filter(cart_id=cart_id)
+        try:
+            products = reserve_inventory(quantities)
+        except OutOfStockError as error:
+            raise serializers.ValidationError({'out_of_stock': error.lines})
+
+        order = Order.objects.create(customer=customer)
 
         order_items = [
             OrderItem(
                 order=order,
-                product=item.product,
-                quantity=item.quantity,
-                unit_price=item.product.unit_price
+                product=product,
+                quantity=quantities[product.id],
+                unit_price=product.effective_price
             )
-            for item in cart_items
+            for product in products
         ]
 
         OrderItem.objects.bulk_create(order_items)
 
-        Cart.objects.get(id=cart_id).delete()
-
-        return order
+        return order, order_items
 
 
 class UpdateOrderSerializer(serializers.ModelSerializer):
@@ -251,6 +350,20 @@ class UpdateOrderSerializer(serializers.ModelSerializer):
         fields = ['status', ]
 
 
+class SalesQuerySerializer(serializers.Serializer):
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    status = serializers.ChoiceField(
+        choices=Order.ORDER_STATUS, default=Order.ORDER_STATUS_PAID
+    )
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+
+    def validate(self, data):
+        if 'date_from' in data and 'date_to' in data and data['date_from'] > data['date_to']:
+            raise serializers.ValidationError('date_from should not be after date_to.')
+        return data
+
+
 class CustomerSerializer(serializers.ModelSerializer):
     user_id = serializers.IntegerField(source='user.id')
     first_name = serializers.CharField(
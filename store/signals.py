@@ -1,11 +1,148 @@
+from django.db import transaction
 from django.dispatch import receiver
-from django.db.models.signals import post_save
+from django.db.models import F
+from django.db.models.functions import Now
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
 from django.conf import settings
 
-from .models import Customer
+from .cache import invalidate_products
+from .pricing import effective_price, refresh_effective_prices
+from .search import refresh_product_search_vectors
+from .tasks import render_product_image
+from .models import Category, Comment, Customer, Discount, Product, ProductImage
 
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
 def create_new_customer_profile(sender, instance, created, **kwargs):
     if created:
         Customer.objects.create(user=instance)
+
+
+@receiver(pre_save, sender=Product)
+def remember_previous_category(sender, instance, raw, **kwargs):
+    if raw or instance.pk is None:
+        return
+    instance._previous_category_id = Product.objects.filter(pk=instance.pk)\
+        .values_list('category_id', flat=True).first()
+
+
+@receiver(post_save, sender=Product)
+def update_category_product_count_on_save(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    previous_category_id = getattr(instance, '_previous_category_id', None)
+    if created:
+        Category.objects.filter(pk=instance.category_id)\
+            .update(product_count=F('product_count') + 1, datetime_updated=Now())
+    elif previous_category_id != instance.category_id:
+        Category.objects.filter(pk=previous_category_id, product_count__gt=0)\
+            .update(product_count=F('product_count') - 1, datetime_updated=Now())
+        Category.objects.filter(pk=instance.category_id)\
+            .update(product_count=F('product_count') + 1, datetime_updated=Now())
+    instance._previous_category_id = instance.category_id
+
+
+@receiver(post_delete, sender=Product)
+def update_category_product_count_on_delete(sender, instance, **kwargs):
+    Category.objects.filter(pk=instance.category_id, product_count__gt=0)\
+        .update(product_count=F('product_count') - 1, datetime_updated=Now())
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_cache(sender, instance, **kwargs):
+    invalidate_products([instance.pk])
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_product_cache_on_related_change(sender, instance, **kwargs):
+    invalidate_products([instance.product_id])
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def touch_product_on_related_change(sender, instance, raw=False, **kwargs):
+    # Images and comments are part of the product payload, so they move its
+    # Last-Modified and ETag too.
+    if raw:
+        return
+    Product.objects.filter(pk=instance.product_id).update(datetime_updated=Now())
+
+
+@receiver(post_save, sender=ProductImage)
+def render_product_image_on_upload(sender, instance, raw, update_fields, **kwargs):
+    if raw or (update_fields is not None and 'image' not in update_fields):
+        return
+    # A broker that is down must not fail the upload: the image is served
+    # without renditions until the render_product_images command runs.
+    transaction.on_commit(lambda: render_product_image.delay(instance.pk), robust=True)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_product_list_cache(sender, instance, **kwargs):
+    invalidate_products()
+
+
+@receiver(pre_save, sender=Product)
+def set_effective_price(sender, instance, raw, **kwargs):
+    if raw:
+        return
+    discounts = instance.discounts.values_list('discount', flat=True) if instance.pk is not None else []
+    instance.effective_price = effective_price(instance.unit_price, discounts)
+
+
+@receiver(pre_delete, sender=Discount)
+def remember_discounted_products(sender, instance, **kwargs):
+    # The product links are gone by post_delete.
+    instance._product_ids = list(instance.product_set.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Discount)
+@receiver(post_delete, sender=Discount)
+def reprice_products_on_discount_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    product_ids = getattr(instance, '_product_ids', None)
+    if product_ids is None:
+        product_ids = list(instance.product_set.values_list('pk', flat=True))
+    refresh_effective_prices(Product.objects.filter(pk__in=product_ids))
+    invalidate_products(product_ids)
+
+
+@receiver(m2m_changed, sender=Product.discounts.through)
+def reprice_products_on_discounts_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        product_ids = [instance.pk] if action.startswith('post_') else []
+    elif action == 'pre_clear':
+        instance._product_ids = list(instance.product_set.values_list('pk', flat=True))
+        product_ids = []
+    elif action == 'post_clear':
+        product_ids = instance._product_ids
+    elif action in ('post_add', 'post_remove'):
+        product_ids = list(pk_set)
+    else:
+        product_ids = []
+
+    if product_ids:
+        refresh_effective_prices(Product.objects.filter(pk__in=product_ids))
+        invalidate_products(product_ids)
+
+
+@receiver(post_save, sender=Product)
+def update_product_search_vector(sender, instance, raw, **kwargs):
+    if raw:
+        return
+    refresh_product_search_vectors(Product.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Category)
+def update_category_products_search_vector(sender, instance, created, raw, **kwargs):
+    if raw or created:
+        return
+    refresh_product_search_vectors(Product.objects.filter(category_id=instance.pk))
@@ -0,0 +1,84 @@
+from datetime import timedelta
+import logging
+import time
+
+from celery import shared_task
+from django.conf import settings
+from django.db import transaction
+
+from .analytics import update_daily_sales
+from . import images, uploads
+from .models import Cart, CartItem
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def delete_expired_carts(ttl=None, batch_size=None, max_batches=None):
+    """
+    Delete carts idle for longer than ``ttl`` seconds, oldest first, in
+    batches of ``batch_size`` so every transaction stays short. Carts locked
+    by a checkout in progress are skipped and picked up by a later run.
+    """
+    config = settings.STORE_CART_EXPIRY
+    ttl = timedelta(seconds=ttl or config['TTL'])
+    batch_size = batch_size or config['BATCH_SIZE']
+    max_batches = max_batches or config['MAX_BATCHES']
+
+    carts_deleted = items_deleted = batches = 0
+    while batches < max_batches:
+        start = time.perf_counter()
+        with transaction.atomic():
+            cart_ids = list(
+                Cart.objects.expired(ttl)
+                .select_for_update(skip_locked=True)
+                .order_by('last_activity')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not cart_ids:
+                break
+            _, deleted = Cart.objects.filter(pk__in=cart_ids).delete()
+
+        batches += 1
+        carts_deleted += deleted.get(Cart._meta.label, 0)
+        items_deleted += deleted.get(CartItem._meta.label, 0)
+        logger.info(
+            'Expired cart batch %d: deleted %d carts and %d items in %.1f ms',
+            batches,
+            deleted.get(Cart._meta.label, 0),
+            deleted.get(CartItem._meta.label, 0),
+            (time.perf_counter() - start) * 1000,
+        )
+
+    logger.info(
+        'Deleted %d expired carts and %d items in %d batches', carts_deleted, items_deleted, batches
+    )
+    return {'carts': carts_deleted, 'items': items_deleted, 'batches': batches}
+
+
+@shared_task
+def update_sales_rollup():
+    start = time.perf_counter()
+    days = update_daily_sales()
+    logger.info(
+        'Rebuilt the sales rollup of %d days in %.1f ms', days, (time.perf_counter() - start) * 1000
+    )
+    return days
+
+
+@shared_task
+def render_product_image(image_id):
+    start = time.perf_counter()
+    if not images.render_product_image(image_id):
+        return False
+    logger.info(
+        'Rendered product image %s in %.1f ms', image_id, (time.perf_counter() - start) * 1000
+    )
+    return True
+
+
+@shared_task
+def delete_expired_image_uploads(ttl=None):
+    deleted = uploads.delete_expired_uploads(ttl)
+    logger.info('Deleted %d expired image uploads', deleted)
+    return deleted
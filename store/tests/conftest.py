@@ -1,14 +1,72 @@
+from dataclasses import dataclass
+from statistics import quantiles
+from urllib.parse import urlencode
+import os
+import time
+
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from model_bakery import baker
 from rest_framework.test import APIClient
 import pytest
 
+from store.carts import get_cart_store
+from store.fake_gateway import FakeZarinpalServer
 from store.models import Cart, CartItem, Category, Comment, Customer, Order, OrderItem, Product
+from store.payment import get_zarinpal_client
 
 User = get_user_model()
 
+ENDPOINT_MEASUREMENTS = pytest.StashKey[list]()
+
+
+@dataclass
+class EndpointMeasurement:
+    route: str
+    method: str
+    status_code: int
+    queries: int
+    p95_ms: float
+    max_queries: int = None
+    max_p95_ms: float = None
+
+    @property
+    def within_budget(self):
+        return self.queries <= self.max_queries and self.p95_ms <= self.max_p95_ms
+
+
+def pytest_configure(config):
+    config.stash[ENDPOINT_MEASUREMENTS] = []
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    measurements = config.stash.get(ENDPOINT_MEASUREMENTS, [])
+    if not measurements:
+        return
+
+    terminalreporter.write_sep('-', 'endpoint budgets')
+    terminalreporter.write_line(
+        f'{"route":<30}{"method":<8}{"status":>7}{"queries":>12}{"p95 ms":>18}  result'
+    )
+    for measurement in sorted(measurements, key=lambda measurement: (measurement.route, measurement.method)):
+        terminalreporter.write_line(
+            f'{measurement.route:<30}{measurement.method:<8}{measurement.status_code:>7}'
+            f'{f"{measurement.queries}/{measurement.max_queries}":>12}'
+            f'{f"{measurement.p95_ms:.1f}/{measurement.max_p95_ms:.0f}":>18}  '
+            f'{"ok" if measurement.within_budget else "OVER BUDGET"}'
+        )
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
 
 @pytest.fixture
 def api_client():
@@ -113,6 +171,55 @@ def delete_order(api_client):
     return do_delete_order
 
 
+@pytest.fixture
+def pay_order(api_client):
+    def do_pay_order(order_id):
+        return api_client.post(reverse('order-payment', args=[order_id]))
+    return do_pay_order
+
+
+@pytest.fixture
+def payment_callback(api_client):
+    def do_payment_callback(authority, payment_status='OK'):
+        query = urlencode({'Authority': authority, 'Status': payment_status})
+        return api_client.post(f'{reverse("order-callback")}?{query}')
+    return do_payment_callback
+
+
+@pytest.fixture
+def fake_zarinpal(settings):
+    server = FakeZarinpalServer().start()
+    settings.ZARINPAL = {
+        **settings.ZARINPAL,
+        'API_URL': server.api_url,
+        'START_PAY_URL': server.start_pay_url,
+        'READ_TIMEOUT': 1,
+        'BACKOFF_FACTOR': 0,
+    }
+    get_zarinpal_client.cache_clear()
+    yield server
+    server.stop()
+    get_zarinpal_client.cache_clear()
+
+
+@pytest.fixture(params=['memory', 'redis'])
+def cart_store(request, settings):
+    if request.param == 'redis':
+        fakeredis = pytest.importorskip('fakeredis')
+        settings.STORE_CART_STORE = {
+            'BACKEND': 'store.carts.RedisCartStore',
+            'OPTIONS': {'client': fakeredis.FakeRedis(), 'ttl': 60},
+        }
+    else:
+        settings.STORE_CART_STORE = {
+            'BACKEND': 'store.carts.InMemoryCartStore',
+            'OPTIONS': {'ttl': 60},
+        }
+    get_cart_store.cache_clear()
+    yield get_cart_store()
+    get_cart_store.cache_clear()
+
+
 @pytest.fixture
 def category_baker():
     return baker.make(Category)
@@ -131,7 +238,7 @@ def cart_baker():
 @pytest.fixture
 def cart_item_baker(cart_baker):
     cart = cart_baker
-    return baker.make(CartItem, cart=cart)
+    return baker.make(CartItem, cart=cart, quantity=1, product__inventory=10)
 
 
 @pytest.fixture
@@ -167,3 +274,50 @@ def authenticate(api_client):
 
 
 
+
+
+@pytest.fixture
+def measure_endpoint(request, api_client, settings):
+    """
+    Request an endpoint ``repeat`` times, after one warm up request for safe
+    methods, and record its query count and p95 latency for the summary
+    table. The catalog cache is disabled so the real work is measured.
+    Latency budgets are multiplied by $STORE_LATENCY_BUDGET_SCALE.
+    """
+    settings.STORE_CATALOG_CACHE = {**settings.STORE_CATALOG_CACHE, 'ENABLED': False}
+    scale = float(os.environ.get('STORE_LATENCY_BUDGET_SCALE', 1))
+
+    def send(method, url, data, format, content_type):
+        extra = {'format': format} if format else {}
+        if content_type:
+            extra['content_type'] = content_type
+        response = getattr(api_client, method.lower())(url, data, **extra)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    def do_measure_endpoint(route, method, url, max_queries, max_p95_ms,
+                            data=None, format=None, content_type=None, repeat=5):
+        if method in ('GET', 'HEAD', 'OPTIONS'):
+            send(method, url, data, format, content_type)
+
+        timings = []
+        for _ in range(repeat):
+            request_data = data() if callable(data) else data
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                response = send(method, url, request_data, format, content_type)
+                timings.append((time.perf_counter() - start) * 1000)
+
+        measurement = EndpointMeasurement(
+            route=route,
+            method=method,
+            status_code=response.status_code,
+            queries=len(context),
+            p95_ms=quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0],
+            max_queries=max_queries,
+            max_p95_ms=max_p95_ms * scale,
+        )
+        request.config.stash[ENDPOINT_MEASUREMENTS].append(measurement)
+        return measurement
+    return do_measure_endpoint
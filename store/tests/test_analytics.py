@@ -0,0 +1,121 @@
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+
+from rest_framework import status
+from model_bakery import baker
+import pytest
+
+from django.core.management import call_command
+from django.urls import reverse
+
+from store.analytics import update_daily_sales
+from store.models import Category, DailySales, Order, OrderItem, Product, RollupWatermark
+
+
+def make_order(user, day, items, order_status=Order.ORDER_STATUS_PAID):
+    order = baker.make(Order, customer=user.customer, status=order_status)
+    Order.objects.filter(pk=order.pk).update(
+        datetime_created=datetime.combine(day, datetime.min.time(), tzinfo=dt_timezone.utc) + timedelta(hours=12)
+    )
+    for product, quantity, unit_price in items:
+        baker.make(OrderItem, order=order, product=product, quantity=quantity, unit_price=unit_price)
+    return order
+
+
+@pytest.fixture
+def sales(authenticate):
+    user = authenticate(is_staff=True)
+    laptops = baker.make(Category, title='Laptops')
+    chairs = baker.make(Category, title='Chairs')
+    laptop = baker.make(Product, title='Gaming laptop', category=laptops)
+    chair = baker.make(Product, title='Office chair', category=chairs)
+    make_order(user, date(2026, 1, 1), [(laptop, 1, 100), (chair, 2, 10)])
+    make_order(user, date(2026, 1, 1), [(laptop, 1, 100)])
+    make_order(user, date(2026, 1, 2), [(chair, 1, 10)])
+    make_order(user, date(2026, 1, 2), [(laptop, 5, 100)], order_status=Order.ORDER_STATUS_UNPAID)
+    update_daily_sales()
+    return {'user': user, 'laptop': laptop, 'chair': chair, 'laptops': laptops}
+
+
+@pytest.mark.django_db
+class TestDailySalesRollup:
+    def test_if_orders_exist_rolls_them_up_per_day_product_and_status(self, sales):
+        row = DailySales.objects.get(day=date(2026, 1, 1), product=sales['laptop'], status=Order.ORDER_STATUS_PAID)
+
+        assert row.orders == 2
+        assert row.quantity == 2
+        assert row.revenue == 200
+        assert row.category == sales['laptops']
+        assert DailySales.objects.count() == 4
+
+    def test_if_order_is_paid_later_its_day_is_rebuilt(self, sales):
+        order = Order.objects.get(status=Order.ORDER_STATUS_UNPAID)
+        order.status = Order.ORDER_STATUS_PAID
+        order.save()
+
+        update_daily_sales()
+
+        row = DailySales.objects.get(day=date(2026, 1, 2), product=sales['laptop'])
+        assert row.status == Order.ORDER_STATUS_PAID
+        assert row.revenue == 500
+
+    def test_if_nothing_changed_rebuilds_no_days(self, sales):
+        RollupWatermark.objects.update(value=datetime.now(dt_timezone.utc) + timedelta(hours=1))
+
+        assert update_daily_sales() == 0
+
+    def test_if_backfill_command_runs_rebuilds_history(self, sales):
+        DailySales.objects.all().delete()
+        out = StringIO()
+
+        call_command('backfill_sales_rollup', '--batch-days', '1', stdout=out)
+
+        assert DailySales.objects.count() == 4
+        assert '4 rollup rows written' in out.getvalue()
+
+
+@pytest.mark.django_db
+class TestSalesAnalytics:
+    def test_if_user_is_not_admin_returns_403(self, api_client, authenticate):
+        authenticate()
+
+        response = api_client.get(reverse('sales-analytics-daily'))
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_if_user_is_admin_returns_paid_revenue_per_day(self, api_client, sales):
+        response = api_client.get(reverse('sales-analytics-daily'))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [(row['day'], row['total_revenue']) for row in response.data] == [
+            (date(2026, 1, 1), 220),
+            (date(2026, 1, 2), 10),
+        ]
+
+    def test_if_date_range_is_given_returns_days_in_range(self, api_client, sales):
+        response = api_client.get(
+            reverse('sales-analytics-categories'), {'date_from': '2026-01-02', 'date_to': '2026-01-02'}
+        )
+
+        assert [(row['category_title'], row['total_revenue']) for row in response.data] == [('Chairs', 10)]
+
+    def test_if_status_is_given_returns_sales_of_that_status(self, api_client, sales):
+        response = api_client.get(reverse('sales-analytics-products'), {'status': 'u'})
+
+        assert [(row['product_title'], row['quantity_sold']) for row in response.data] == [('Gaming laptop', 5)]
+
+    def test_if_products_are_limited_returns_top_sellers(self, api_client, sales):
+        response = api_client.get(reverse('sales-analytics-products'), {'limit': 1})
+
+        assert [row['product_id'] for row in response.data] == [sales['laptop'].id]
+
+    def test_if_date_range_is_invalid_returns_400(self, api_client, sales):
+        response = api_client.get(
+            reverse('sales-analytics-daily'), {'date_from': '2026-01-02', 'date_to': '2026-01-01'}
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_if_sales_are_queried_reads_only_the_rollup(self, api_client, sales, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            api_client.get(reverse('sales-analytics-categories'))
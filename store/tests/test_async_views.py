@@ -0,0 +1,131 @@
+import json
+
+from asgiref.sync import async_to_sync
+from django.test import AsyncRequestFactory
+from django.urls import reverse
+from model_bakery import baker
+from rest_framework import status
+import pytest
+
+from store import async_views
+from store.models import Category, Comment, Product, ProductImage
+from store.views import CategoryViewSet, ProductViewSet
+
+factory = AsyncRequestFactory()
+
+
+@pytest.fixture
+def catalog():
+    category = baker.make(Category, title='Laptops')
+    products = baker.make(Product, category=category, inventory=10, _quantity=12)
+    baker.make(ProductImage, product=products[0], image='store/product/images/a.jpg')
+    baker.make(Comment, product=products[0], _quantity=3)
+    return {'category': category, 'products': products}
+
+
+def call(view_class, path, fallback=None, **kwargs):
+    view = view_class.as_view(fallback=fallback)
+    response = async_to_sync(view)(factory.get(path), **kwargs)
+    return response, json.loads(response.content)
+
+
+@pytest.mark.django_db
+class TestAsyncCatalogViews:
+    def test_if_product_list_is_requested_returns_same_page_as_viewset(self, api_client, catalog):
+        url = f'{reverse("product-list")}?page=2&ordering=-unit_price&inventory__gt=5'
+
+        response, data = call(async_views.AsyncProductList, url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['X-Cache'] == 'MISS'
+        assert data == json.loads(api_client.get(url).content)
+
+    def test_if_product_list_is_cached_returns_hit(self, catalog):
+        url = reverse('product-list')
+        call(async_views.AsyncProductList, url)
+
+        response, _ = call(async_views.AsyncProductList, url)
+
+        assert response['X-Cache'] == 'HIT'
+
+    def test_if_page_does_not_exist_returns_404(self, catalog):
+        response, data = call(async_views.AsyncProductList, f'{reverse("product-list")}?page=9')
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert 'detail' in data
+
+    def test_if_filter_is_invalid_returns_400(self, catalog):
+        response, data = call(async_views.AsyncProductList, f'{reverse("product-list")}?inventory__gt=many')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'inventory__gt' in data
+
+    def test_if_product_exists_returns_same_body_as_viewset(self, api_client, catalog):
+        product = catalog['products'][0]
+        url = reverse('product-detail', args=[product.id])
+
+        response, data = call(async_views.AsyncProductDetail, url, pk=str(product.id))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert data == json.loads(api_client.get(url).content)
+
+    def test_if_product_does_not_exist_returns_404(self, catalog):
+        response, _ = call(async_views.AsyncProductDetail, reverse('product-detail', args=[0]), pk='0')
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_if_category_list_is_requested_returns_same_body_as_viewset(self, api_client, catalog):
+        url = reverse('category-list')
+
+        response, data = call(async_views.AsyncCategoryList, url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert data == json.loads(api_client.get(url).content)
+
+    def test_if_comment_list_is_requested_returns_same_body_as_viewset(self, api_client, catalog):
+        product = catalog['products'][0]
+        url = reverse('product-comments-list', args=[product.id])
+
+        response, data = call(async_views.AsyncCommentList, url, product_pk=str(product.id))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(data) == 3
+        assert data == json.loads(api_client.get(url).content)
+
+    def test_if_product_is_unchanged_returns_304(self, api_client, catalog):
+        product = catalog['products'][0]
+        url = reverse('product-detail', args=[product.id])
+        etag = api_client.get(url)['ETag']
+        view = async_views.AsyncProductDetail.as_view()
+
+        response = async_to_sync(view)(factory.get(url, headers={'If-None-Match': etag}), pk=str(product.id))
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response['ETag'] == etag
+
+    def test_if_comments_are_unchanged_returns_304(self, catalog):
+        product = catalog['products'][0]
+        url = reverse('product-comments-list', args=[product.id])
+        etag = call(async_views.AsyncCommentList, url, product_pk=str(product.id))[0]['ETag']
+        view = async_views.AsyncCommentList.as_view()
+
+        response = async_to_sync(view)(factory.get(url, headers={'If-None-Match': etag}), product_pk=str(product.id))
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_if_cursor_page_is_requested_uses_the_viewset(self, catalog):
+        fallback = ProductViewSet.as_view({'get': 'list'})
+
+        view = async_views.AsyncProductList.as_view(fallback=fallback)
+
+        response = async_to_sync(view)(factory.get(f'{reverse("product-list")}?pagination=cursor'))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert 'count' not in response.data
+
+    def test_if_method_is_not_get_uses_the_viewset(self, catalog):
+        view = async_views.AsyncCategoryList.as_view(fallback=CategoryViewSet.as_view({'post': 'create'}))
+
+        response = async_to_sync(view)(factory.post(reverse('category-list'), {'title': 'Phones and tablets'}))
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
@@ -0,0 +1,73 @@
+from django.contrib.auth import get_user_model
+import pytest
+
+from store.benchmark.dataset import DatasetGenerator, DatasetSize
+from store.benchmark.scenario import CatalogScenario, LoadScenario
+from store.models import Cart, Category, Comment, Customer, DailySales, Order, OrderItem, Product, ProductImage
+
+
+TINY = DatasetSize(
+    categories=3, products=30, images_per_product=1, comments_per_product=2, customers=4,
+    carts=2, items_per_cart=2, orders=10, items_per_order=2
+)
+
+
+def generate(seed=0):
+    DatasetGenerator(TINY, seed=seed, batch_size=7, log=lambda message: None).generate()
+
+
+def snapshot():
+    return (
+        list(Product.objects.order_by('pk').values_list('title', 'unit_price', 'inventory', 'category__title')),
+        list(OrderItem.objects.order_by('pk').values_list('order__status', 'product__title', 'quantity', 'unit_price')),
+        list(Cart.objects.order_by('pk').values_list('id', flat=True)),
+    )
+
+
+def clear():
+    for model in [DailySales, OrderItem, Order, Cart, Comment, ProductImage, Product, Category, Customer]:
+        model.objects.all().delete()
+    get_user_model().objects.all().delete()
+
+
+@pytest.mark.django_db
+class TestDatasetGenerator:
+    def test_if_dataset_is_generated_creates_every_model_and_derived_data(self):
+        generate()
+
+        assert Product.objects.count() == TINY.products
+        assert OrderItem.objects.count() == TINY.orders * TINY.items_per_order
+        assert sum(Category.objects.values_list('product_count', flat=True)) == TINY.products
+        assert DailySales.objects.exists()
+
+    def test_if_seed_is_the_same_generates_the_same_rows(self):
+        generate(seed=1)
+        first = snapshot()
+        clear()
+
+        generate(seed=1)
+
+        assert snapshot() == first
+
+
+@pytest.mark.django_db(transaction=True)
+class TestLoadScenario:
+    def test_if_scenario_runs_every_journey_succeeds(self, live_server, fake_zarinpal):
+        generate()
+        scenario = LoadScenario(live_server.url, users=2, iterations=2)
+
+        stats = scenario.run()
+
+        assert {name: stats[name].errors for name in stats} == {name: 0 for name in stats}
+        assert len(stats['POST /store/orders/callback/'].latencies) == 4
+        assert Order.objects.filter(status=Order.ORDER_STATUS_PAID, zarinpal_ref_id__gt='').count() == 4
+        assert 'requests/sec' in scenario.report()
+
+    def test_if_catalog_scenario_runs_every_request_succeeds(self, live_server):
+        generate()
+        scenario = CatalogScenario(live_server.url, users=2, iterations=2)
+
+        stats = scenario.run()
+
+        assert {name: stats[name].errors for name in stats} == {name: 0 for name in stats}
+        assert scenario.summary()['requests'] == 20
@@ -1,7 +1,19 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from threading import Barrier
+
 from rest_framework import status
+from rest_framework.test import APIClient, APIRequestFactory
+from model_bakery import baker
 import pytest
 
+from django.db import connection
 from django.urls import reverse
+from django.utils import timezone
+
+from store.models import Cart, CartItem, Product
+from store.tasks import delete_expired_carts
+from store.views import StoredCartItemViewSet, StoredCartViewSet
 
 
 @pytest.mark.django_db
@@ -44,6 +56,28 @@ class TestRetrieveCart:
 
         assert response.status_code == status.HTTP_404_NOT_FOUND
 
+    def test_if_cart_has_many_items_totals_are_computed_by_the_database(
+            self, api_client, cart_baker, django_assert_num_queries):
+        cart = cart_baker
+        items = [
+            baker.make(CartItem, cart=cart, product=product, quantity=index % 5 + 1)
+            for index, product in enumerate(baker.make(Product, _quantity=200))
+        ]
+
+        with django_assert_num_queries(2):
+            response = api_client.get(reverse('cart-detail', args=[cart.id]))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert {item['id']: item['item_total'] for item in response.data['items']} == {
+            item.id: item.quantity * item.product.effective_price for item in items
+        }
+        assert response.data['total_price'] == sum(item.quantity * item.product.effective_price for item in items)
+
+    def test_if_cart_is_empty_returns_0_total(self, api_client, cart_baker):
+        response = api_client.get(reverse('cart-detail', args=[cart_baker.id]))
+
+        assert response.data['total_price'] == 0
+
 
 @pytest.mark.django_db
 class TestDeleteCart:
@@ -69,3 +103,227 @@ class TestDeleteCart:
         response = delete_cart(cart.id)
 
         assert response.status_code == status.HTTP_204_NO_CONTENT
+
+
+@pytest.mark.django_db
+class TestAddCartItem:
+    def test_if_product_is_added_twice_quantity_is_incremented(self, api_client, cart_baker, product_baker):
+        cart = cart_baker
+        product = product_baker
+
+        for quantity in [2, 3]:
+            response = api_client.post(
+                reverse('cart-items-list', args=[cart.id]), {'product': product.id, 'quantity': quantity}
+            )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['quantity'] == 5
+        assert CartItem.objects.get(cart=cart, product=product).quantity == 5
+
+    def test_if_many_products_are_added_they_are_upserted_in_one_statement(self, api_client, cart_baker, django_assert_max_num_queries):
+        cart = cart_baker
+        products = baker.make(Product, _quantity=3)
+        baker.make(CartItem, cart=cart, product=products[0], quantity=1)
+
+        items = [
+            {'product': products[0].id, 'quantity': 1},
+            {'product': products[1].id, 'quantity': 2},
+            {'product': products[2].id, 'quantity': 3},
+            {'product': products[2].id, 'quantity': 1},
+        ]
+
+        # One lookup per validated product, the cart activity touch and a
+        # single upsert.
+        with django_assert_max_num_queries(len(items) + 2):
+            response = api_client.post(reverse('cart-items-list', args=[cart.id]), items, format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert dict(CartItem.objects.filter(cart=cart).values_list('product_id', 'quantity')) == {
+            products[0].id: 2,
+            products[1].id: 2,
+            products[2].id: 4,
+        }
+
+
+@pytest.mark.django_db(transaction=True)
+class TestConcurrentAddCartItem:
+    def test_if_product_is_added_concurrently_quantities_are_summed(self):
+        requests = 20
+        cart = baker.make(Cart)
+        product = baker.make(Product)
+        barrier = Barrier(requests)
+
+        def add_to_cart(_):
+            try:
+                barrier.wait()
+                return APIClient().post(
+                    reverse('cart-items-list', args=[cart.id]), {'product': product.id, 'quantity': 1}
+                ).status_code
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=requests) as executor:
+            status_codes = list(executor.map(add_to_cart, range(requests)))
+
+        assert status_codes == [status.HTTP_201_CREATED] * requests
+        assert CartItem.objects.get(cart=cart, product=product).quantity == requests
+
+
+@pytest.mark.django_db
+class TestCartActivity:
+    def test_if_item_is_added_cart_activity_is_updated(self, api_client, product_baker):
+        cart = baker.make(Cart, last_activity=timezone.now() - timedelta(days=30))
+
+        api_client.post(reverse('cart-items-list', args=[cart.id]), {'product': product_baker.id, 'quantity': 1})
+
+        cart.refresh_from_db()
+        assert cart.last_activity > timezone.now() - timedelta(minutes=1)
+
+    def test_if_item_is_updated_cart_activity_is_updated(self, api_client, cart_item_baker):
+        cart_item = cart_item_baker
+        Cart.objects.filter(pk=cart_item.cart_id).update(last_activity=timezone.now() - timedelta(days=30))
+
+        api_client.patch(reverse('cart-items-detail', args=[cart_item.cart_id, cart_item.id]), {'quantity': 3})
+
+        assert Cart.objects.get(pk=cart_item.cart_id).last_activity > timezone.now() - timedelta(minutes=1)
+
+    def test_if_item_is_deleted_cart_activity_is_updated(self, api_client, cart_item_baker):
+        cart_item = cart_item_baker
+        Cart.objects.filter(pk=cart_item.cart_id).update(last_activity=timezone.now() - timedelta(days=30))
+
+        api_client.delete(reverse('cart-items-detail', args=[cart_item.cart_id, cart_item.id]))
+
+        assert Cart.objects.get(pk=cart_item.cart_id).last_activity > timezone.now() - timedelta(minutes=1)
+
+
+@pytest.mark.django_db
+class TestDeleteExpiredCarts:
+    def test_if_carts_are_expired_they_are_deleted_with_their_items(self):
+        expired = baker.make(Cart, last_activity=timezone.now() - timedelta(days=8), _quantity=5)
+        active = baker.make(Cart, last_activity=timezone.now() - timedelta(days=6))
+        baker.make(CartItem, cart=expired[0], quantity=1)
+        baker.make(CartItem, cart=active, quantity=1)
+
+        result = delete_expired_carts(ttl=60 * 60 * 24 * 7, batch_size=2)
+
+        assert result == {'carts': 5, 'items': 1, 'batches': 3}
+        assert list(Cart.objects.values_list('pk', flat=True)) == [active.pk]
+        assert CartItem.objects.filter(cart=active).exists()
+
+    def test_if_max_batches_is_reached_the_rest_is_left_for_the_next_run(self):
+        baker.make(Cart, last_activity=timezone.now() - timedelta(days=8), _quantity=5)
+
+        result = delete_expired_carts(ttl=60 * 60 * 24 * 7, batch_size=2, max_batches=1)
+
+        assert result['carts'] == 2
+        assert Cart.objects.count() == 3
+
+
+@pytest.fixture
+def stored_cart_views():
+    return {
+        'cart': StoredCartViewSet.as_view({'post': 'create', 'get': 'retrieve', 'delete': 'destroy'}),
+        'items': StoredCartItemViewSet.as_view({'get': 'list', 'post': 'create'}),
+        'item': StoredCartItemViewSet.as_view({'get': 'retrieve', 'patch': 'partial_update', 'delete': 'destroy'}),
+    }
+
+
+@pytest.mark.django_db
+class TestStoredCart:
+    factory = APIRequestFactory()
+
+    def test_if_cart_is_created_returns_201(self, cart_store, stored_cart_views):
+        response = stored_cart_views['cart'](self.factory.post('/store/carts/'))
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert cart_store.exists(response.data['id'])
+        assert response.data['items'] == []
+
+    def test_if_cart_not_exists_returns_404(self, cart_store, stored_cart_views):
+        response = stored_cart_views['cart'](self.factory.get('/store/carts/a/'), pk='a')
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_if_product_is_added_twice_quantity_is_incremented(self, cart_store, stored_cart_views, product_baker):
+        product = product_baker
+        cart_id = cart_store.create()
+
+        for quantity in [2, 3]:
+            response = stored_cart_views['items'](
+                self.factory.post('/', {'product': product.id, 'quantity': quantity}), cart_pk=str(cart_id)
+            )
+        cart_response = stored_cart_views['cart'](self.factory.get('/'), pk=str(cart_id))
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['quantity'] == 5
+        assert cart_response.data['items'][0]['quantity'] == 5
+        assert cart_response.data['total_price'] == 5 * product.effective_price
+
+    def test_if_cart_has_many_items_totals_are_computed_in_one_query(
+            self, cart_store, stored_cart_views, django_assert_num_queries):
+        products = baker.make(Product, _quantity=50)
+        cart_id = cart_store.create()
+        for index, product in enumerate(products):
+            cart_store.add_item(cart_id, product.id, index % 5 + 1)
+
+        with django_assert_num_queries(1):
+            response = stored_cart_views['cart'](self.factory.get('/'), pk=str(cart_id))
+
+        assert [item['item_total'] for item in response.data['items']] == [
+            (index % 5 + 1) * product.effective_price for index, product in enumerate(products)
+        ]
+        assert response.data['total_price'] == sum(item['item_total'] for item in response.data['items'])
+
+    def test_if_item_is_updated_returns_200(self, cart_store, stored_cart_views, product_baker):
+        product = product_baker
+        cart_id = cart_store.create()
+        cart_store.add_item(cart_id, product.id, 1)
+
+        response = stored_cart_views['item'](
+            self.factory.patch('/', {'quantity': 4}), cart_pk=str(cart_id), pk=str(product.id)
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert cart_store.get_items(cart_id) == {product.id: 4}
+
+    def test_if_item_is_deleted_returns_204(self, cart_store, stored_cart_views, product_baker):
+        product = product_baker
+        cart_id = cart_store.create()
+        cart_store.add_item(cart_id, product.id, 1)
+
+        response = stored_cart_views['item'](self.factory.delete('/'), cart_pk=str(cart_id), pk=str(product.id))
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert cart_store.get_items(cart_id) == {}
+
+    def test_if_cart_is_deleted_returns_204(self, cart_store, stored_cart_views):
+        cart_id = cart_store.create()
+
+        response = stored_cart_views['cart'](self.factory.delete('/'), pk=str(cart_id))
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert not cart_store.exists(cart_id)
+
+    def test_if_cart_is_checked_out_order_is_created_and_cart_removed(self, cart_store, authenticate, create_order):
+        product = baker.make(Product, inventory=5)
+        cart_id = cart_store.create()
+        cart_store.add_item(cart_id, product.id, 2)
+        authenticate(is_staff=False)
+
+        response = create_order({'cart_id': cart_id})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['items'][0]['quantity'] == 2
+        assert not cart_store.exists(cart_id)
+        assert not Cart.objects.exists()
+
+    def test_if_checkout_fails_cart_is_kept(self, cart_store, authenticate, create_order):
+        product = baker.make(Product, inventory=1)
+        cart_id = cart_store.create()
+        cart_store.add_item(cart_id, product.id, 2)
+        authenticate(is_staff=False)
+
+        response = create_order({'cart_id': cart_id})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert cart_store.get_items(cart_id) == {product.id: 2}
@@ -1,8 +1,14 @@
+from io import StringIO
+
 from rest_framework import status
+from model_bakery import baker
 import pytest
 
+from django.core.management import call_command
 from django.urls import reverse
 
+from store.models import Category, Product
+
 
 @pytest.mark.django_db
 class TestCreateCategory:
@@ -35,6 +41,47 @@ class TestCreateCategory:
         assert response.data['id'] > 0
 
 
+@pytest.mark.django_db
+class TestListCategory:
+    def test_if_categories_have_many_products_query_count_is_constant(self, api_client, django_assert_num_queries):
+        for category in baker.make(Category, _quantity=5):
+            baker.make(Product, category=category, _quantity=10)
+
+        with django_assert_num_queries(2):
+            response = api_client.get(reverse('category-list'))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [category['number_of_products'] for category in response.data] == [10] * 5
+
+
+@pytest.mark.django_db
+class TestConditionalGetCategory:
+    def test_if_categories_are_unchanged_returns_304(self, api_client, category_baker):
+        etag = api_client.get(reverse('category-list'))['ETag']
+
+        response = api_client.get(reverse('category-list'), HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_if_category_gets_a_product_returns_200(self, api_client, category_baker):
+        etag = api_client.get(reverse('category-list'))['ETag']
+        baker.make(Product, category=category_baker)
+
+        response = api_client.get(reverse('category-list'), HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data[0]['number_of_products'] == 1
+
+    def test_if_category_is_deleted_returns_200(self, api_client):
+        categories = baker.make(Category, _quantity=2)
+        etag = api_client.get(reverse('category-list'))['ETag']
+        Category.objects.filter(pk=categories[0].pk).delete()
+
+        response = api_client.get(reverse('category-list'), HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+
+
 @pytest.mark.django_db
 class TestRetrieveCategory:
     def test_if_category_exists_returns_200(self, api_client, category_baker):
@@ -121,3 +168,69 @@ class TestDeleteCategory:
         response = delete_category(category.id)
 
         assert response.status_code == status.HTTP_204_NO_CONTENT
+
+
+@pytest.mark.django_db
+class TestCategoryProductCount:
+    def test_if_product_is_created_product_count_increases(self, category_baker):
+        category = category_baker
+
+        baker.make(Product, category=category, _quantity=2)
+
+        category.refresh_from_db()
+        assert category.product_count == 2
+
+    def test_if_product_is_deleted_product_count_decreases(self, product_baker):
+        product = product_baker
+
+        product.delete()
+
+        product.category.refresh_from_db()
+        assert product.category.product_count == 0
+
+    def test_if_product_category_changes_product_count_moves(self, product_baker, category_baker):
+        product = product_baker
+        previous_category = product.category
+        new_category = category_baker
+
+        product.category = new_category
+        product.save()
+
+        previous_category.refresh_from_db()
+        new_category.refresh_from_db()
+        assert previous_category.product_count == 0
+        assert new_category.product_count == 1
+
+    def test_if_loaded_category_is_saved_product_count_is_kept(self, category_baker):
+        category = Category.objects.get(pk=category_baker.pk)
+        baker.make(Product, category=category, _quantity=2)
+
+        category.title = 'Renamed'
+        category.save()
+
+        category.refresh_from_db()
+        assert category.title == 'Renamed'
+        assert category.product_count == 2
+
+    def test_if_category_is_updated_product_count_is_kept(self, authenticate, update_category, category_baker):
+        category = category_baker
+        baker.make(Product, category=category, _quantity=2)
+        authenticate(is_staff=True)
+
+        response = update_category(category.id, {'title': 'Renamed'})
+
+        category.refresh_from_db()
+        assert response.status_code == status.HTTP_200_OK
+        assert category.product_count == 2
+
+    def test_if_product_count_drifts_reconcile_command_fixes_it(self, category_baker):
+        category = category_baker
+        baker.make(Product, category=category, _quantity=3)
+        Product.objects.filter(category=category).update(category=baker.make(Category))
+        Category.objects.filter(pk=category.pk).update(product_count=7)
+
+        call_command('reconcile_category_counts', stdout=StringIO())
+
+        assert list(
+            Category.objects.order_by('pk').values_list('product_count', flat=True)
+        ) == [0, 3]
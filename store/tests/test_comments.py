@@ -1,7 +1,65 @@
 from rest_framework import status
+from model_bakery import baker
 import pytest
 
 from django.urls import reverse
+from django.utils.http import http_date
+
+from store.models import Comment
+
+
+@pytest.mark.django_db
+class TestListComment:
+    def test_if_pagination_is_not_given_returns_all_comments(self, api_client, product_baker):
+        product = product_baker
+        baker.make(Comment, product=product, _quantity=12)
+
+        response = api_client.get(reverse('product-comments-list', args=[product.id]))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data) == 12
+
+    def test_if_pagination_is_cursor_returns_pages(self, api_client, product_baker):
+        product = product_baker
+        baker.make(Comment, product=product, _quantity=12)
+
+        response = api_client.get(
+            reverse('product-comments-list', args=[product.id]), {'pagination': 'cursor'}
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data['results']) == 10
+        assert response.data['next'] is not None
+
+    def test_if_comments_are_unchanged_returns_304(self, api_client, comment_baker):
+        url = reverse('product-comments-list', args=[comment_baker.product_id])
+        etag = api_client.get(url)['ETag']
+
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_if_comment_is_deleted_list_revalidated_by_date_returns_200(self, api_client, product_baker):
+        comments = baker.make(Comment, product=product_baker, _quantity=2)
+        url = reverse('product-comments-list', args=[product_baker.id])
+        api_client.get(url)
+        comments[0].delete()
+
+        response = api_client.get(url, HTTP_IF_MODIFIED_SINCE=http_date())
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data) == 1
+
+    def test_if_comment_is_edited_returns_200(self, api_client, comment_baker):
+        url = reverse('product-comments-list', args=[comment_baker.product_id])
+        etag = api_client.get(url)['ETag']
+        comment_baker.status = Comment.COMMENT_STATUS_APPROVED
+        comment_baker.save()
+
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data[0]['status'] == Comment.COMMENT_STATUS_APPROVED
 
 
 @pytest.mark.django_db
@@ -0,0 +1,139 @@
+from io import BytesIO, StringIO
+import re
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.urls import reverse
+from model_bakery import baker
+from PIL import Image
+from rest_framework import status
+import pytest
+
+from config.celery import celery
+from store.images import create_renditions, render_product_image
+from store.tasks import render_product_image as render_product_image_task
+from store.models import ProductImage
+
+
+def image_file(name='photo.png', size=(800, 400), color=(255, 0, 0), image_format='PNG'):
+    buffer = BytesIO()
+    Image.new('RGBA' if len(color) == 4 else 'RGB', size, color).save(buffer, format=image_format)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type=f'image/{image_format.lower()}')
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def eager_celery(monkeypatch):
+    monkeypatch.setattr(celery.conf, 'task_always_eager', True)
+
+
+@pytest.fixture
+def dispatched(monkeypatch):
+    image_ids = []
+    monkeypatch.setattr(render_product_image_task, 'delay', image_ids.append)
+    return image_ids
+
+
+@pytest.mark.django_db
+class TestCreateRenditions:
+    def test_if_image_is_rendered_returns_every_size_and_format(self, media_root, product_baker):
+        product_image = ProductImage.objects.create(product=product_baker, image=image_file())
+
+        renditions = create_renditions(product_image.image)
+
+        assert set(renditions) == {'thumb', 'card', 'full'}
+        assert renditions['thumb']['width'] == 150 and renditions['thumb']['height'] == 75
+        assert renditions['full']['width'] == 800
+        assert re.fullmatch(
+            r'store/product/images/renditions/photo\.[0-9a-f]{16}_card\.[0-9a-f]{16}\.webp', renditions['card']['webp']
+        )
+        with Image.open(media_root / renditions['card']['jpeg']) as jpeg:
+            assert jpeg.format == 'JPEG' and jpeg.size == (480, 240)
+
+    def test_if_image_has_transparency_jpeg_is_flattened(self, media_root, product_baker):
+        product_image = ProductImage.objects.create(product=product_baker, image=image_file(color=(255, 0, 0, 128)))
+
+        renditions = create_renditions(product_image.image)
+
+        with Image.open(media_root / renditions['thumb']['jpeg']) as jpeg:
+            assert jpeg.mode == 'RGB'
+        with Image.open(media_root / renditions['thumb']['webp']) as webp:
+            assert webp.mode == 'RGBA'
+
+    def test_if_settings_change_new_renditions_replace_the_old_files(self, settings, media_root, product_baker):
+        product_image = ProductImage.objects.create(product=product_baker, image=image_file())
+        render_product_image(product_image.id)
+        old_name = ProductImage.objects.get(pk=product_image.pk).renditions['thumb']['jpeg']
+        settings.STORE_IMAGE_RENDITIONS = {**settings.STORE_IMAGE_RENDITIONS, 'QUALITY': 40}
+
+        render_product_image(product_image.id)
+
+        new_name = ProductImage.objects.get(pk=product_image.pk).renditions['thumb']['jpeg']
+        assert new_name != old_name
+        assert (media_root / new_name).exists()
+        assert not (media_root / old_name).exists()
+
+    def test_if_file_is_not_an_image_returns_false(self, media_root, product_baker):
+        product_image = ProductImage.objects.create(
+            product=product_baker, image=SimpleUploadedFile('broken.png', b'not an image')
+        )
+
+        assert render_product_image(product_image.id) is False
+        product_image.refresh_from_db()
+        assert product_image.renditions == {}
+
+
+@pytest.mark.django_db
+class TestUploadProductImage:
+    def test_if_image_is_uploaded_renditions_are_created_after_commit(
+            self, media_root, eager_celery, authenticate, api_client, product_baker,
+            django_capture_on_commit_callbacks):
+        product = product_baker
+        authenticate(is_staff=True)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            response = api_client.post(
+                reverse('product-images-list', args=[product.id]), {'image': image_file()}, format='multipart'
+            )
+        images_response = api_client.get(reverse('product-images-list', args=[product.id]))
+
+        assert response.status_code == status.HTTP_201_CREATED
+        renditions = images_response.data[0]['renditions']
+        assert renditions['thumb']['webp'].startswith('http://testserver/media/store/product/images/renditions/')
+        assert renditions['thumb']['width'] == 150
+
+    def test_if_renditions_are_saved_task_is_not_dispatched_again(
+            self, media_root, dispatched, product_baker, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            product_image = baker.make(ProductImage, product=product_baker, image='store/product/images/a.png')
+        with django_capture_on_commit_callbacks(execute=True):
+            product_image.renditions = {'thumb': {'width': 1, 'height': 1}}
+            product_image.save(update_fields=['renditions', 'datetime_updated'])
+
+        assert dispatched == [product_image.id]
+
+
+@pytest.mark.django_db(transaction=True)
+class TestRenderProductImagesCommand:
+    @pytest.mark.parametrize('workers', [1, 2])
+    def test_if_images_have_no_renditions_they_are_rendered(self, media_root, dispatched, workers):
+        images = [baker.make(ProductImage, image=image_file(f'{index}.png')) for index in range(3)]
+        out = StringIO()
+
+        call_command('render_product_images', workers=workers, chunk_size=1, stdout=out)
+
+        assert all(ProductImage.objects.get(pk=image.pk).renditions for image in images)
+        assert '3 product images rendered, 0 failed' in out.getvalue()
+
+    def test_if_images_have_renditions_they_are_skipped(self, media_root, dispatched):
+        baker.make(ProductImage, image=image_file(), renditions={'thumb': {}})
+        out = StringIO()
+
+        call_command('render_product_images', workers=1, stdout=out)
+
+        assert '0 product images rendered, 0 failed' in out.getvalue()
@@ -0,0 +1,128 @@
+import logging
+import json
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.urls import reverse
+from model_bakery import baker
+from rest_framework import status
+import pytest
+
+from store.instrumentation import Histogram, PerformanceMiddleware, view_stats
+from store.models import Category, Product
+
+
+@pytest.fixture
+def sample_everything(settings):
+    settings.STORE_PERFORMANCE = {**settings.STORE_PERFORMANCE, 'SAMPLE_RATE': 1}
+    view_stats.reset()
+    yield
+    view_stats.reset()
+
+
+@pytest.fixture
+def products():
+    category = baker.make(Category)
+    return baker.make(Product, category=category, _quantity=3)
+
+
+class TestHistogram:
+    def test_if_values_are_observed_returns_bucket_quantiles(self):
+        histogram = Histogram([10, 100])
+        for value in [1, 2, 3, 50, 500]:
+            histogram.observe(value)
+
+        stats = histogram.as_dict()
+
+        assert stats['count'] == 5
+        assert stats['p50'] == 10
+        assert stats['p95'] is None
+        assert stats['buckets'] == {'le_10': 3, 'le_100': 1, 'inf': 1}
+
+
+@pytest.mark.django_db
+class TestPerformanceMiddleware:
+    def test_if_sampling_is_off_returns_no_server_timing(self, api_client, products, settings):
+        settings.STORE_PERFORMANCE = {**settings.STORE_PERFORMANCE, 'SAMPLE_RATE': 0}
+
+        response = api_client.get(reverse('product-list'))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert 'Server-Timing' not in response
+
+    def test_if_request_is_sampled_returns_server_timing(self, api_client, products, sample_everything):
+        response = api_client.get(reverse('product-list'))
+
+        timing = response['Server-Timing']
+        assert 'queries"' in timing
+        assert 'cache;desc="0 hits 1 misses"' in timing
+        assert 'view;dur=' in timing
+        assert 'render;dur=' in timing
+        assert 'total;dur=' in timing
+
+    def test_if_request_is_sampled_counts_cache_hits(self, api_client, products, sample_everything):
+        api_client.get(reverse('product-list'))
+
+        response = api_client.get(reverse('product-list'))
+
+        assert response['X-Cache'] == 'HIT'
+        assert response['Server-Timing'].startswith('db;dur=0.0;desc="0 queries", cache;desc="1 hits 0 misses"')
+
+    def test_if_request_is_sampled_logs_structured_line(self, api_client, products, sample_everything, caplog):
+        with caplog.at_level(logging.INFO, logger='store.instrumentation'):
+            api_client.get(reverse('category-list'))
+
+        line = json.loads(caplog.records[-1].getMessage())
+        assert line['event'] == 'request_timing'
+        assert line['view'] == 'GET category-list'
+        assert line['status'] == 200
+        assert line['queries'] >= 1
+
+    def test_if_request_is_sampled_feeds_view_histograms(self, api_client, products, sample_everything):
+        api_client.get(reverse('category-list'))
+        api_client.get(reverse('category-list'))
+
+        stats = view_stats.as_dict()['GET category-list']
+        assert stats['total_ms']['count'] == 2
+        assert stats['queries']['count'] == 2
+
+    def test_if_handler_is_async_counts_queries_of_the_async_orm(self, products, sample_everything):
+        async def get_response(request):
+            await Product.objects.acount()
+            await sync_to_async(list)(Category.objects.all())
+            return HttpResponse()
+        middleware = PerformanceMiddleware(get_response)
+
+        response = async_to_sync(middleware)(RequestFactory().get('/'))
+
+        assert response['Server-Timing'].startswith('db;dur=')
+        assert 'desc="2 queries"' in response['Server-Timing']
+
+
+@pytest.mark.django_db
+class TestPerformanceStats:
+    def test_if_user_is_not_admin_returns_403(self, authenticate, api_client):
+        authenticate()
+
+        response = api_client.get(reverse('performance-list'))
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_if_user_is_admin_returns_view_histograms(self, authenticate, api_client, products, sample_everything):
+        authenticate(is_staff=True)
+        api_client.get(reverse('category-list'))
+
+        response = api_client.get(reverse('performance-list'))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['GET category-list']['total_ms']['count'] == 1
+
+    def test_if_stats_are_reset_returns_204(self, authenticate, api_client, products, sample_everything):
+        authenticate(is_staff=True)
+        api_client.get(reverse('category-list'))
+
+        response = api_client.post(reverse('performance-reset'))
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert 'GET category-list' not in view_stats.as_dict()
@@ -0,0 +1,86 @@
+from django.core.files.base import ContentFile
+from django.urls import reverse
+from rest_framework import status
+import pytest
+
+from store.media import content_hashed_name
+from store.models import ProductImage
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.STORE_MEDIA = {**settings.STORE_MEDIA, 'ACCEL_REDIRECT': '/protected-media/'}
+    return tmp_path
+
+
+@pytest.fixture
+def media_file(media_root):
+    def do_media_file(name, content=b'\x89PNG\r\n\x1a\n'):
+        path = media_root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+        return name
+    return do_media_file
+
+
+class TestContentHashedName:
+    def test_if_content_is_the_same_returns_the_same_name(self):
+        first = content_hashed_name('a/photo.PNG', ContentFile(b'image'))
+
+        assert first == content_hashed_name('a/photo.PNG', ContentFile(b'image'))
+        assert first != content_hashed_name('a/photo.PNG', ContentFile(b'other image'))
+        assert first.startswith('a/photo.') and first.endswith('.png')
+
+
+@pytest.mark.django_db
+class TestSaveProductImage:
+    def test_if_image_is_saved_its_name_has_a_content_hash(self, media_root, product_baker):
+        product_image = ProductImage(product=product_baker)
+        product_image.image.save('photo.png', ContentFile(b'image'), save=False)
+
+        assert product_image.image.name == content_hashed_name('store/product/images/photo.png', ContentFile(b'image'))
+        assert (media_root / product_image.image.name).read_bytes() == b'image'
+
+
+class TestServeMedia:
+    def test_if_name_has_content_hash_returns_immutable_accel_redirect(self, client, media_file):
+        name = media_file('store/product/images/photo.0123456789abcdef.png')
+
+        response = client.get(reverse('media', args=[name]))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['X-Accel-Redirect'] == f'/protected-media/{name}'
+        assert response['Content-Type'] == 'image/png'
+        assert response['Cache-Control'] == 'public, max-age=31536000, immutable'
+        # nginx sends the file, Django does not read it.
+        assert not response.streaming
+        assert response.content == b''
+
+    def test_if_name_has_no_content_hash_returns_short_max_age(self, settings, client, media_file):
+        name = media_file('store/product/images/photo one.png')
+
+        response = client.get(reverse('media', args=[name]))
+
+        assert response['X-Accel-Redirect'] == '/protected-media/store/product/images/photo%20one.png'
+        assert response['Cache-Control'] == f'public, max-age={settings.STORE_MEDIA["MAX_AGE"]}'
+
+    @pytest.mark.parametrize('path', [
+        'store/product/images/missing.png',
+        'store/other/secret.txt',
+        'store/product/images/../../../other/secret.txt',
+    ])
+    def test_if_file_is_not_public_returns_404(self, client, media_file, path):
+        media_file('store/other/secret.txt')
+
+        response = client.get(f'/media/{path}')
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert 'X-Accel-Redirect' not in response
+
+    def test_if_method_is_not_safe_returns_405(self, client, media_file):
+        name = media_file('store/product/images/photo.0123456789abcdef.png')
+
+        response = client.post(reverse('media', args=[name]))
+
+        assert response.status_code == status.HTTP_405_METHOD_NOT_ALLOWED
@@ -0,0 +1,77 @@
+from django.urls import reverse
+from model_bakery import baker
+from prometheus_client import REGISTRY, CollectorRegistry
+from rest_framework import status
+import pytest
+
+from store.metrics import get_registry
+from store.models import Category, Product
+from store.tasks import update_sales_rollup
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@pytest.mark.django_db
+class TestMetricsEndpoint:
+    def test_if_metrics_are_scraped_returns_viewset_actions(self, api_client):
+        baker.make(Product, category=baker.make(Category))
+        api_client.get(reverse('product-list'))
+
+        response = api_client.get(reverse('metrics'))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert 'store_api_requests_total{action="list",method="GET",status="200",view="ProductViewSet"}' \
+            in response.content.decode()
+
+    def test_if_request_is_served_counts_it_by_action(self, api_client):
+        product = baker.make(Product, category=baker.make(Category))
+        labels = {'view': 'ProductViewSet', 'action': 'retrieve', 'method': 'GET', 'status': '200'}
+        before = sample('store_api_requests_total', **labels)
+
+        api_client.get(reverse('product-detail', args=[product.id]))
+
+        assert sample('store_api_requests_total', **labels) == before + 1
+
+    def test_if_multiprocess_dir_is_set_returns_merged_registry(self, monkeypatch, tmp_path):
+        monkeypatch.setenv('PROMETHEUS_MULTIPROC_DIR', str(tmp_path))
+
+        registry = get_registry()
+
+        assert isinstance(registry, CollectorRegistry)
+        assert registry is not REGISTRY
+
+
+@pytest.mark.django_db
+class TestTaskMetrics:
+    def test_if_task_succeeds_records_duration(self):
+        name = 'store.tasks.update_sales_rollup'
+        before = sample('store_celery_task_duration_seconds_count', task=name)
+
+        update_sales_rollup.apply()
+
+        assert sample('store_celery_task_duration_seconds_count', task=name) == before + 1
+        assert sample('store_celery_tasks_total', task=name, state='SUCCESS') >= 1
+
+    def test_if_task_fails_counts_failure(self):
+        name = 'store.tasks.update_sales_rollup'
+        before = sample('store_celery_task_failures_total', task=name, exception='TypeError')
+
+        update_sales_rollup.apply(args=['unexpected'])
+
+        assert sample('store_celery_task_failures_total', task=name, exception='TypeError') == before + 1
+
+
+@pytest.mark.django_db
+class TestPaymentGatewayMetrics:
+    def test_if_payment_is_requested_records_gateway_latency(self, authenticate, pay_order, order_item_baker,
+                                                             fake_zarinpal):
+        user = authenticate(is_staff=False)
+        order_item = order_item_baker(user)
+        labels = {'operation': 'PaymentRequest', 'outcome': 'ok'}
+        before = sample('store_payment_gateway_request_duration_seconds_count', **labels)
+
+        pay_order(order_item.order.id)
+
+        assert sample('store_payment_gateway_request_duration_seconds_count', **labels) == before + 1
@@ -1,9 +1,19 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+import csv
+import json
+
 from rest_framework import status
+from rest_framework.test import APIClient
 from django.contrib.auth import get_user_model
+from model_bakery import baker
 import pytest
 
+from django.db import connection
 from django.urls import reverse
 
+from store.models import Cart, CartItem, Order, OrderItem, Product
+
 
 @pytest.mark.django_db
 class TestCreateOrder:
@@ -61,6 +71,193 @@ class TestCreateOrder:
         assert response.data['id'] > 0
 
 
+@pytest.mark.django_db
+class TestOrderInventory:
+    def test_if_order_is_created_inventory_decreases(self, create_order, authenticate, cart_item_baker):
+        cart_item = cart_item_baker
+        authenticate(is_staff=False)
+
+        response = create_order({'cart_id': cart_item.cart.id})
+
+        cart_item.product.refresh_from_db()
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['total_price'] == cart_item.product.effective_price
+        assert cart_item.product.inventory == 9
+        assert not Cart.objects.filter(id=cart_item.cart.id).exists()
+
+    def test_if_product_is_out_of_stock_returns_400(self, create_order, authenticate, cart_baker):
+        cart = cart_baker
+        in_stock = baker.make(CartItem, cart=cart, quantity=1, product__inventory=5)
+        out_of_stock = baker.make(CartItem, cart=cart, quantity=3, product__inventory=2)
+        authenticate(is_staff=False)
+
+        response = create_order({'cart_id': cart.id})
+
+        in_stock.product.refresh_from_db()
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data['out_of_stock'] == [
+            f'Product {out_of_stock.product.id} ({out_of_stock.product.title}): requested 3, only 2 left.'
+        ]
+        assert in_stock.product.inventory == 5
+        assert not Order.objects.exists()
+        assert Cart.objects.filter(id=cart.id).exists()
+
+
+@pytest.mark.django_db(transaction=True)
+class TestConcurrentOrders:
+    def test_if_many_checkouts_share_a_product_it_is_not_oversold(self):
+        checkouts = 20
+        inventory = 7
+        product = baker.make(Product, inventory=inventory)
+        clients = []
+        for index in range(checkouts):
+            user = get_user_model().objects.create_user(
+                username=f'user{index}', email=f'user{index}@example.com', password='testpass')
+            cart = baker.make(Cart)
+            baker.make(CartItem, cart=cart, product=product, quantity=1)
+            client = APIClient()
+            client.force_authenticate(user=user)
+            clients.append((client, cart.id))
+
+        barrier = Barrier(checkouts)
+
+        def checkout(client_and_cart):
+            client, cart_id = client_and_cart
+            try:
+                barrier.wait()
+                return client.post(reverse('order-list'), {'cart_id': cart_id}).status_code
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=checkouts) as executor:
+            status_codes = list(executor.map(checkout, clients))
+
+        product.refresh_from_db()
+        assert status_codes.count(status.HTTP_200_OK) == inventory
+        assert status_codes.count(status.HTTP_400_BAD_REQUEST) == checkouts - inventory
+        assert product.inventory == 0
+        assert Order.objects.count() == inventory
+
+
+@pytest.mark.django_db
+class TestListOrder:
+    def test_if_pagination_is_not_given_returns_all_orders(self, authenticate, api_client, order_baker):
+        user = authenticate(is_staff=True)
+        for _ in range(12):
+            order_baker(user)
+
+        response = api_client.get(reverse('order-list'))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data) == 12
+
+    def test_if_pagination_is_cursor_returns_pages(self, authenticate, api_client, order_baker):
+        user = authenticate(is_staff=True)
+        for _ in range(12):
+            order_baker(user)
+
+        response = api_client.get(reverse('order-list'), {'pagination': 'cursor'})
+        next_response = api_client.get(response.data['next'])
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data['results']) == 10
+        assert len(next_response.data['results']) == 2
+
+    def test_if_ordering_is_total_price_returns_orders_sorted_by_total(self, authenticate, api_client, order_baker):
+        user = authenticate(is_staff=True)
+        for unit_price in [30, 10, 20]:
+            baker.make(OrderItem, order=order_baker(user), unit_price=unit_price, quantity=2)
+        order_baker(user)
+
+        response = api_client.get(reverse('order-list'), {'ordering': 'total_price'})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [order['total_price'] for order in response.data] == [0, 20, 40, 60]
+
+    def test_if_total_price_is_filtered_returns_matching_orders(self, authenticate, api_client, order_baker):
+        user = authenticate(is_staff=True)
+        for unit_price in [30, 10, 20]:
+            baker.make(OrderItem, order=order_baker(user), unit_price=unit_price, quantity=2)
+
+        response = api_client.get(reverse('order-list'), {'total_price__gte': 40})
+
+        assert sorted(order['total_price'] for order in response.data) == [40, 60]
+
+    def test_if_order_has_items_returns_line_totals(self, authenticate, api_client, order_baker):
+        user = authenticate(is_staff=False)
+        order = order_baker(user)
+        for unit_price, quantity in [(30, 2), (10, 5)]:
+            baker.make(OrderItem, order=order, unit_price=unit_price, quantity=quantity)
+
+        response = api_client.get(reverse('order-detail', args=[order.id]))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert sorted(item['item_total'] for item in response.data['items']) == [50, 60]
+        assert response.data['total_price'] == 110
+
+
+@pytest.mark.django_db
+class TestExportOrder:
+    def read(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_if_user_is_not_admin_returns_403(self, authenticate, api_client):
+        authenticate()
+
+        response = api_client.get(reverse('order-export'))
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_if_format_is_csv_streams_a_row_per_order_item(self, authenticate, api_client, order_baker):
+        user = authenticate(is_staff=True)
+        order = order_baker(user)
+        baker.make(OrderItem, order=order, unit_price=10, quantity=2, _quantity=2)
+        empty_order = order_baker(user)
+
+        response = api_client.get(reverse('order-export'))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.streaming
+        rows = list(csv.DictReader(self.read(response).splitlines()))
+        assert [int(row['order_id']) for row in rows] == [order.id, order.id, empty_order.id]
+        assert rows[0]['total_price'] == '40.00'
+        assert rows[2]['product_id'] == ''
+
+    def test_if_format_is_ndjson_streams_an_order_per_line(self, authenticate, api_client, order_baker):
+        user = authenticate(is_staff=True)
+        order = order_baker(user)
+        item = baker.make(OrderItem, order=order, unit_price=10, quantity=2)
+
+        response = api_client.get(reverse('order-export'), {'file_format': 'ndjson'})
+
+        orders = [json.loads(line) for line in self.read(response).splitlines()]
+        assert len(orders) == 1
+        assert orders[0]['customer']['id'] == order.customer_id
+        assert orders[0]['items'][0]['product_id'] == item.product_id
+        assert orders[0]['total_price'] == '20.00'
+
+    def test_if_status_is_filtered_exports_matching_orders(self, authenticate, api_client, order_baker):
+        user = authenticate(is_staff=True)
+        paid = baker.make(Order, customer=user.customer, status=Order.ORDER_STATUS_PAID)
+        order_baker(user)
+
+        response = api_client.get(reverse('order-export'), {'file_format': 'ndjson', 'status': 'p'})
+
+        assert [json.loads(line)['id'] for line in self.read(response).splitlines()] == [paid.id]
+
+    def test_if_orders_are_many_query_count_is_per_chunk(self, authenticate, api_client, order_baker, django_assert_max_num_queries):
+        user = authenticate(is_staff=True)
+        for _ in range(30):
+            baker.make(OrderItem, order=order_baker(user))
+
+        response = api_client.get(reverse('order-export'))
+        # The order cursor and one items prefetch per chunk, not one per order.
+        with django_assert_max_num_queries(5):
+            lines = self.read(response).splitlines()
+
+        assert len(lines) == 31
+
+
 @pytest.mark.django_db
 class TestRetrieveOrder:
     def test_if_user_is_anonymous_returns_401(self, api_client):
@@ -0,0 +1,106 @@
+import asyncio
+import time
+
+from rest_framework import status
+import pytest
+
+from store.models import Order
+from store.payment import DOLLAR_TO_TOMAN, PaymentGatewayError, get_async_zarinpal_client, get_zarinpal_client
+
+
+@pytest.mark.django_db
+class TestPaymentProcess:
+    def test_if_user_is_anonymous_returns_401(self, pay_order):
+        response = pay_order(1)
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_if_gateway_accepts_request_redirects_to_start_pay(self, authenticate, pay_order, order_item_baker, fake_zarinpal):
+        user = authenticate(is_staff=False)
+        order_item = order_item_baker(user)
+
+        response = pay_order(order_item.order.id)
+
+        order = Order.objects.with_total_price().get(pk=order_item.order.id)
+        assert response.status_code == status.HTTP_302_FOUND
+        assert response['Location'] == fake_zarinpal.start_pay_url + order.zarinpal_authority
+        assert fake_zarinpal.requests[0]['Amount'] == round(float(order.total_price) * DOLLAR_TO_TOMAN, 0)
+
+    def test_if_gateway_is_too_slow_returns_502(self, authenticate, pay_order, order_item_baker, fake_zarinpal, settings):
+        settings.ZARINPAL = {**settings.ZARINPAL, 'READ_TIMEOUT': 0.1}
+        get_zarinpal_client.cache_clear()
+        fake_zarinpal.delay = 0.5
+        user = authenticate(is_staff=False)
+        order_item = order_item_baker(user)
+
+        response = pay_order(order_item.order.id)
+
+        assert response.status_code == status.HTTP_502_BAD_GATEWAY
+
+
+@pytest.mark.django_db
+class TestPaymentCallback:
+    def test_if_payment_is_verified_order_is_paid(self, authenticate, pay_order, payment_callback, order_item_baker, fake_zarinpal):
+        user = authenticate(is_staff=False)
+        order = order_item_baker(user).order
+        pay_order(order.id)
+        order.refresh_from_db()
+
+        response = payment_callback(order.zarinpal_authority)
+
+        order.refresh_from_db()
+        assert response.status_code == status.HTTP_200_OK
+        assert order.status == Order.ORDER_STATUS_PAID
+        assert order.zarinpal_ref_id != ''
+
+    def test_if_verification_fails_temporarily_it_is_retried(self, authenticate, pay_order, payment_callback, order_item_baker, fake_zarinpal):
+        user = authenticate(is_staff=False)
+        order = order_item_baker(user).order
+        pay_order(order.id)
+        order.refresh_from_db()
+        fake_zarinpal.verification_failures = 2
+
+        response = payment_callback(order.zarinpal_authority)
+
+        order.refresh_from_db()
+        assert response.status_code == status.HTTP_200_OK
+        assert order.status == Order.ORDER_STATUS_PAID
+
+    def test_if_payment_is_canceled_order_stays_unpaid(self, authenticate, pay_order, payment_callback, order_item_baker, fake_zarinpal):
+        user = authenticate(is_staff=False)
+        order = order_item_baker(user).order
+        pay_order(order.id)
+        order.refresh_from_db()
+
+        response = payment_callback(order.zarinpal_authority, payment_status='NOK')
+
+        order.refresh_from_db()
+        assert response.status_code == status.HTTP_200_OK
+        assert order.status == Order.ORDER_STATUS_UNPAID
+        assert fake_zarinpal.verified == set()
+
+
+class TestZarinpalClientDeadline:
+    def test_if_gateway_keeps_timing_out_retries_stop_at_deadline(self, fake_zarinpal, settings):
+        settings.ZARINPAL = {**settings.ZARINPAL, 'READ_TIMEOUT': 0.3, 'VERIFY_RETRIES': 10, 'DEADLINE': 1}
+        get_zarinpal_client.cache_clear()
+        fake_zarinpal.delay = 0.5
+        start = time.monotonic()
+
+        with pytest.raises(PaymentGatewayError):
+            get_zarinpal_client().verify_payment(1000, 'A1')
+
+        assert time.monotonic() - start < 1.5
+
+
+class TestAsyncZarinpalClient:
+    def test_if_payment_is_requested_and_verified_returns_ref_id(self, fake_zarinpal):
+        client = get_async_zarinpal_client()
+
+        async def pay():
+            authority = await client.request_payment(1000, 'test', 'http://testserver/callback/')
+            return await client.verify_payment(1000, authority)
+
+        data = asyncio.run(pay())
+
+        assert data['Status'] == 100
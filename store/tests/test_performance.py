@@ -0,0 +1,207 @@
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Callable
+from urllib.parse import urlencode
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+
+from model_bakery import baker
+from PIL import Image
+import pytest
+
+from store import urls
+from store.analytics import update_daily_sales
+from store.models import Cart, CartItem, Category, Comment, ImageUpload, Order, OrderItem, Product, ProductImage
+from store.uploads import save_part
+
+
+CATEGORIES = 10
+PRODUCTS_PER_CATEGORY = 10
+COMMENTS_PER_PRODUCT = 3
+IMAGES_PER_PRODUCT = 2
+ORDERS = 20
+ITEMS_PER_ORDER = 3
+CART_ITEMS = 10
+
+
+@pytest.fixture
+def seeded_store(authenticate):
+    """
+    A catalog big enough that a query per row shows up in the query counts,
+    browsed by a staff user that owns the orders and the cart.
+    """
+    user = authenticate(is_staff=True)
+    categories = baker.make(Category, _quantity=CATEGORIES)
+    products = []
+    for category in categories:
+        products += baker.make(
+            Product, category=category, inventory=1000, _quantity=PRODUCTS_PER_CATEGORY
+        )
+    for product in products:
+        baker.make(Comment, product=product, _quantity=COMMENTS_PER_PRODUCT, _bulk_create=True)
+        baker.make(
+            ProductImage, product=product, image='store/product/images/seed.jpg',
+            _quantity=IMAGES_PER_PRODUCT, _bulk_create=True
+        )
+
+    orders = baker.make(Order, customer=user.customer, zarinpal_authority=baker.seq('A'), _quantity=ORDERS)
+    for index, order in enumerate(orders):
+        for offset in range(ITEMS_PER_ORDER):
+            baker.make(OrderItem, order=order, product=products[index + offset], quantity=1, unit_price=10)
+    update_daily_sales()
+
+    cart = baker.make(Cart)
+    for product in products[:CART_ITEMS]:
+        baker.make(CartItem, cart=cart, product=product, quantity=1)
+
+    return {
+        'user': user,
+        'category': categories[0],
+        'product': products[0],
+        'comment': products[0].comments.first(),
+        'image': products[0].images.first(),
+        'order': orders[0],
+        'cart': cart,
+        'cart_item': cart.items.first(),
+    }
+
+
+def png_bytes():
+    buffer = BytesIO()
+    Image.new('RGB', (64, 64), (255, 0, 0)).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def image_upload(settings, tmp_path, seeded_store):
+    """A single part upload of a seeded product, with its part received."""
+    settings.MEDIA_ROOT = str(tmp_path / 'media')
+    settings.STORAGES = {
+        **settings.STORAGES,
+        'image_uploads': {**settings.STORAGES['image_uploads'], 'OPTIONS': {'location': str(tmp_path / 'uploads')}},
+    }
+    content = png_bytes()
+    upload = baker.make(
+        ImageUpload, product=seeded_store['product'], filename='seed.png', content_type='image/png',
+        size=len(content), part_size=settings.STORE_IMAGE_UPLOADS['PART_SIZE']
+    )
+    save_part(upload, 1, BytesIO(content))
+    seeded_store['upload'] = upload
+    seeded_store['upload_content'] = content
+    return upload
+
+
+@dataclass(frozen=True)
+class Budget:
+    route: str
+    method: str
+    max_queries: int
+    max_p95_ms: float
+    args: Callable = lambda seed: []
+    data: Callable = None
+    format: str = None
+    content_type: str = None
+    query: Callable = None
+    repeat: int = 5
+    fixtures: tuple = ()
+
+    def __str__(self):
+        return f'{self.method} {self.route}'
+
+
+def new_product(seed):
+    return {
+        'title': 'Seeded product',
+        'description': 'Seeded',
+        'price': 10,
+        'inventory': 5,
+        'category': reverse('category-detail', args=[seed['category'].id]),
+    }
+
+
+def product_file(seed):
+    rows = ''.join(f'Imported product {i},10.00,5,{seed["category"].title}\n' for i in range(100))
+    return {'file': SimpleUploadedFile('products.csv', f'title,price,inventory,category\n{rows}'.encode())}
+
+
+# Query budgets are exact enough that one extra query per row fails them,
+# latency budgets are loose enough for a laptop running the whole suite.
+BUDGETS = [
+    Budget('api-root', 'GET', 0, 50),
+    Budget('product-list', 'GET', 4, 150),
+    Budget('product-list', 'POST', 5, 150, data=new_product, repeat=1),
+    Budget('product-detail', 'GET', 3, 100, args=lambda seed: [seed['product'].id]),
+    Budget('product-bulk-import', 'POST', 6, 1500, data=product_file, format='multipart', repeat=1),
+    Budget('product-bulk-export', 'GET', 1, 300),
+    Budget('category-list', 'GET', 2, 100),
+    Budget('category-detail', 'GET', 2, 50, args=lambda seed: [seed['category'].id]),
+    Budget('product-comments-list', 'GET', 2, 100, args=lambda seed: [seed['product'].id]),
+    Budget('product-comments-detail', 'GET', 2, 50,
+           args=lambda seed: [seed['product'].id, seed['comment'].id]),
+    Budget('product-images-list', 'GET', 2, 100, args=lambda seed: [seed['product'].id]),
+    Budget('product-images-detail', 'GET', 2, 50, args=lambda seed: [seed['product'].id, seed['image'].id]),
+    Budget('product-image-uploads-list', 'POST', 2, 50, args=lambda seed: [seed['product'].id],
+           data=lambda seed: {'filename': 'a.png', 'content_type': 'image/png', 'size': 1024}),
+    Budget('product-image-uploads-detail', 'GET', 2, 50,
+           args=lambda seed: [seed['product'].id, seed['upload'].id], fixtures=('image_upload', )),
+    Budget('product-image-uploads-part', 'PUT', 3, 100,
+           args=lambda seed: [seed['product'].id, seed['upload'].id, 1], data=lambda seed: seed['upload_content'],
+           content_type='application/octet-stream', fixtures=('image_upload', )),
+    Budget('product-image-uploads-complete', 'POST', 10, 200,
+           args=lambda seed: [seed['product'].id, seed['upload'].id], repeat=1, fixtures=('image_upload', )),
+    Budget('cart-list', 'POST', 3, 50, repeat=3),
+    Budget('cart-detail', 'GET', 2, 100, args=lambda seed: [seed['cart'].id]),
+    Budget('cart-items-list', 'GET', 1, 100, args=lambda seed: [seed['cart'].id]),
+    Budget('cart-items-list', 'POST', 3, 100, args=lambda seed: [seed['cart'].id],
+           data=lambda seed: {'product': seed['product'].id, 'quantity': 1}),
+    Budget('cart-items-detail', 'GET', 1, 50, args=lambda seed: [seed['cart'].id, seed['cart_item'].id]),
+    Budget('order-list', 'GET', 2, 200),
+    Budget('order-list', 'POST', 15, 300, data=lambda seed: {'cart_id': seed['cart'].id}, repeat=1),
+    Budget('order-detail', 'GET', 2, 100, args=lambda seed: [seed['order'].id]),
+    Budget('order-export', 'GET', 2, 300),
+    Budget('order-payment', 'POST', 3, 300, args=lambda seed: [seed['order'].id],
+           repeat=1, fixtures=('fake_zarinpal', )),
+    Budget('order-callback', 'POST', 1, 100,
+           query=lambda seed: {'Authority': seed['order'].zarinpal_authority, 'Status': 'NOK'}),
+    Budget('customer-list', 'GET', 1, 100),
+    Budget('customer-detail', 'GET', 1, 50, args=lambda seed: [seed['user'].customer.id]),
+    Budget('customer-me', 'GET', 1, 50),
+    Budget('sales-analytics-daily', 'GET', 1, 50),
+    Budget('sales-analytics-categories', 'GET', 1, 50),
+    Budget('sales-analytics-products', 'GET', 1, 50),
+    Budget('performance-list', 'GET', 1, 50),
+    Budget('performance-reset', 'POST', 1, 50),
+]
+
+
+@pytest.mark.django_db
+class TestEndpointBudgets:
+    def test_if_route_exists_it_has_a_budget(self):
+        routes = {pattern.name for pattern in urls.urlpatterns}
+
+        assert routes == {budget.route for budget in BUDGETS}
+
+    @pytest.mark.parametrize('budget', BUDGETS, ids=str)
+    def test_if_endpoint_is_requested_stays_within_budget(self, request, budget, seeded_store, measure_endpoint):
+        for fixture in budget.fixtures:
+            request.getfixturevalue(fixture)
+        url = reverse(budget.route, args=budget.args(seeded_store))
+        if budget.query is not None:
+            url = f'{url}?{urlencode(budget.query(seeded_store))}'
+
+        measurement = measure_endpoint(
+            budget.route,
+            budget.method,
+            url,
+            budget.max_queries,
+            budget.max_p95_ms,
+            data=budget.data and (lambda: budget.data(seeded_store)),
+            format=budget.format,
+            content_type=budget.content_type,
+            repeat=budget.repeat,
+        )
+
+        assert measurement.status_code < 400
+        assert measurement.queries <= measurement.max_queries
+        assert measurement.p95_ms <= measurement.max_p95_ms
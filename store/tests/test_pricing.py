@@ -0,0 +1,133 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.urls import reverse
+from model_bakery import baker
+from rest_framework import status
+import pytest
+
+from store.models import CartItem, Discount, Product
+from store.pricing import effective_price
+
+
+class TestEffectivePrice:
+    def test_if_there_is_no_discount_returns_price_with_tax(self, settings):
+        settings.STORE_PRICING = {'TAX_RATE': Decimal('0.09')}
+
+        assert effective_price(Decimal('100')) == Decimal('109.00')
+
+    def test_if_discounts_are_stacked_returns_compounded_price(self, settings):
+        settings.STORE_PRICING = {'TAX_RATE': Decimal('0.1')}
+
+        assert effective_price(Decimal('100'), [10, 50]) == Decimal('49.50')
+
+    def test_if_discount_is_over_100_returns_0(self, settings):
+        assert effective_price(Decimal('100'), [150]) == Decimal('0.00')
+
+
+@pytest.mark.django_db
+class TestProductEffectivePrice:
+    def test_if_product_is_saved_returns_price_with_tax(self, api_client, product_baker):
+        product = product_baker
+        product.unit_price = Decimal('10')
+        product.save()
+
+        response = api_client.get(reverse('product-detail', args=[product.id]))
+
+        assert response.data['price_aftre_tax'] == Decimal('10.90')
+
+    def test_if_discount_is_added_returns_discounted_price(self, api_client, product_baker):
+        product = product_baker
+        product.unit_price = Decimal('10')
+        product.save()
+        api_client.get(reverse('product-detail', args=[product.id]))
+
+        product.discounts.add(baker.make(Discount, discount=50))
+        response = api_client.get(reverse('product-detail', args=[product.id]))
+
+        assert response.data['price_aftre_tax'] == Decimal('5.45')
+
+    def test_if_discount_is_changed_returns_new_price(self, api_client):
+        discount = baker.make(Discount, discount=50)
+        product = baker.make(Product, unit_price=Decimal('10'))
+        discount.product_set.add(product)
+        api_client.get(reverse('product-detail', args=[product.id]))
+
+        discount.discount = 20
+        discount.save()
+        response = api_client.get(reverse('product-detail', args=[product.id]))
+
+        assert response.data['price_aftre_tax'] == Decimal('8.72')
+
+    def test_if_discount_is_deleted_returns_price_with_tax(self, api_client):
+        discount = baker.make(Discount, discount=50)
+        product = baker.make(Product, unit_price=Decimal('10'))
+        product.discounts.add(discount)
+        api_client.get(reverse('product-detail', args=[product.id]))
+
+        discount.delete()
+        response = api_client.get(reverse('product-detail', args=[product.id]))
+
+        assert response.data['price_aftre_tax'] == Decimal('10.90')
+
+    def test_if_discounts_are_cleared_returns_price_with_tax(self):
+        discount = baker.make(Discount, discount=50)
+        product = baker.make(Product, unit_price=Decimal('10'))
+        discount.product_set.add(product)
+
+        discount.product_set.clear()
+        product.refresh_from_db()
+
+        assert product.effective_price == Decimal('10.90')
+
+    def test_if_tax_rate_changes_refresh_command_reprices_products(self, settings):
+        product = baker.make(Product, unit_price=Decimal('10'))
+        settings.STORE_PRICING = {'TAX_RATE': Decimal('0.2')}
+        out = StringIO()
+
+        call_command('refresh_effective_prices', stdout=out)
+        product.refresh_from_db()
+
+        assert product.effective_price == Decimal('12.00')
+        assert '1 product prices updated.' in out.getvalue()
+
+
+@pytest.mark.django_db
+class TestFilterProductByEffectivePrice:
+    def test_if_filtered_by_effective_price_returns_discounted_products(self, api_client):
+        cheap = baker.make(Product, unit_price=Decimal('100'))
+        cheap.discounts.add(baker.make(Discount, discount=90))
+        baker.make(Product, unit_price=Decimal('50'))
+
+        response = api_client.get(reverse('product-list'), {'effective_price__lte': 20})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [product['id'] for product in response.data['results']] == [cheap.id]
+
+    def test_if_ordered_by_effective_price_returns_products_in_order(self, api_client):
+        discounted = baker.make(Product, unit_price=Decimal('100'))
+        discounted.discounts.add(baker.make(Discount, discount=90))
+        regular = baker.make(Product, unit_price=Decimal('50'))
+
+        response = api_client.get(reverse('product-list'), {'ordering': 'effective_price'})
+
+        assert [product['id'] for product in response.data['results']] == [discounted.id, regular.id]
+
+
+@pytest.mark.django_db
+class TestCheckoutEffectivePrice:
+    def test_if_order_is_created_returns_discounted_unit_price(
+            self, authenticate, api_client, create_order, cart_baker):
+        authenticate(is_staff=False)
+        product = baker.make(Product, unit_price=Decimal('10'), inventory=10)
+        product.discounts.add(baker.make(Discount, discount=50))
+        baker.make(CartItem, cart=cart_baker, product=product, quantity=2)
+
+        cart_response = api_client.get(reverse('cart-detail', args=[cart_baker.id]))
+        response = create_order({'cart_id': cart_baker.id})
+
+        assert cart_response.data['total_price'] == Decimal('10.90')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['items'][0]['unit_price'] == Decimal('5.45')
+        assert response.data['total_price'] == Decimal('10.90')
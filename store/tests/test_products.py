@@ -1,7 +1,17 @@
+from io import StringIO
+import json
+
 from rest_framework import status
+from model_bakery import baker
 import pytest
 
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.urls import reverse
+from django.utils.http import http_date
+
+from store.cache import get_catalog_cache_stats
+from store.models import Category, Comment, Product
 
 
 @pytest.mark.django_db
@@ -64,6 +74,51 @@ class TestCreateProduct:
         assert response.data['id'] > 0
 
 
+@pytest.mark.django_db
+class TestListProduct:
+    def test_if_products_have_many_comments_query_count_is_constant(self, api_client, django_assert_num_queries):
+        products = baker.make(Product, _quantity=10)
+        author = baker.make('core.CustomUser')
+        Comment.objects.bulk_create(
+            Comment(product=product, author=author, body='a')
+            for product in products
+            for _ in range(1000)
+        )
+
+        with django_assert_num_queries(4):
+            response = api_client.get(reverse('product-list'))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data['results']) == 10
+        assert all(
+            product['number_of_comments'] == 1000
+            for product in response.data['results']
+        )
+
+
+    def test_if_pagination_is_cursor_returns_pages_in_id_order(self, api_client):
+        products = baker.make(Product, _quantity=15)
+
+        response = api_client.get(reverse('product-list'), {'pagination': 'cursor'})
+        next_response = api_client.get(response.data['next'])
+
+        assert response.status_code == status.HTTP_200_OK
+        assert 'count' not in response.data
+        assert [product['id'] for product in response.data['results'] + next_response.data['results']] \
+            == sorted((product.id for product in products), reverse=True)
+        assert next_response.data['next'] is None
+
+    def test_if_pagination_is_cursor_and_ordering_is_given_returns_ordered_pages(self, api_client):
+        baker.make(Product, _quantity=15)
+
+        response = api_client.get(reverse('product-list'), {'pagination': 'cursor', 'ordering': 'unit_price'})
+        next_response = api_client.get(response.data['next'])
+
+        prices = [product['price'] for product in response.data['results'] + next_response.data['results']]
+        assert prices == sorted(prices)
+        assert len(prices) == 15
+
+
 @pytest.mark.django_db
 class TestRetrieveProduct:
     def test_if_product_exists_returns_200(self, api_client, product_baker):
@@ -76,6 +131,15 @@ class TestRetrieveProduct:
         assert response.data['title'] == product.title
         assert response.data['slug'] == product.slug
 
+    def test_if_product_has_comments_returns_number_of_comments(self, api_client, product_baker):
+        product = product_baker
+        baker.make(Comment, product=product, _quantity=3)
+
+        response = api_client.get(reverse('product-detail', args=[product.id]))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['number_of_comments'] == 3
+
     def test_if_category_not_exists_returns_404(self, api_client):
         response = api_client.get(reverse('product-detail', args=[10 ** 10]))
 
@@ -148,3 +212,279 @@ class TestDeleteProduct:
         response = delete_product(product.id)
 
         assert response.status_code == status.HTTP_204_NO_CONTENT
+
+
+@pytest.mark.django_db
+class TestProductCache:
+    def test_if_product_list_is_cached_returns_without_queries(self, api_client, product_baker, django_assert_num_queries):
+        api_client.get(reverse('product-list'))
+
+        with django_assert_num_queries(0):
+            response = api_client.get(reverse('product-list'))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['X-Cache'] == 'HIT'
+        assert get_catalog_cache_stats() == {'hits': 1, 'misses': 1}
+
+    def test_if_query_params_differ_returns_separate_pages(self, api_client, product_baker):
+        api_client.get(reverse('product-list'))
+
+        response = api_client.get(reverse('product-list'), {'ordering': 'unit_price'})
+
+        assert response['X-Cache'] == 'MISS'
+
+    def test_if_product_is_updated_detail_is_invalidated(self, api_client, product_baker):
+        product = product_baker
+        api_client.get(reverse('product-detail', args=[product.id]))
+
+        product.title = 'bbbbbb'
+        product.save()
+        response = api_client.get(reverse('product-detail', args=[product.id]))
+
+        assert response['X-Cache'] == 'MISS'
+        assert response.data['title'] == 'bbbbbb'
+
+    def test_if_comment_is_created_list_is_invalidated(self, api_client, product_baker):
+        product = product_baker
+        api_client.get(reverse('product-list'))
+
+        baker.make(Comment, product=product)
+        response = api_client.get(reverse('product-list'))
+
+        assert response['X-Cache'] == 'MISS'
+        assert response.data['results'][0]['number_of_comments'] == 1
+
+    def test_if_other_product_changes_detail_stays_cached(self, api_client, product_baker):
+        product = product_baker
+        api_client.get(reverse('product-detail', args=[product.id]))
+
+        baker.make(Product)
+        response = api_client.get(reverse('product-detail', args=[product.id]))
+
+        assert response['X-Cache'] == 'HIT'
+
+
+@pytest.mark.django_db
+class TestConditionalGetProduct:
+    def test_if_product_list_is_unchanged_returns_304(self, api_client, product_baker):
+        etag = api_client.get(reverse('product-list'))['ETag']
+
+        response = api_client.get(reverse('product-list'), HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response['ETag'] == etag
+        assert not response.content
+
+    def test_if_product_list_is_cached_returns_304_without_queries(self, api_client, product_baker,
+                                                                   django_assert_num_queries):
+        etag = api_client.get(reverse('product-list'))['ETag']
+
+        with django_assert_num_queries(0):
+            response = api_client.get(reverse('product-list'), HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response['X-Cache'] == 'HIT'
+
+    def test_if_product_is_deleted_list_revalidated_by_date_returns_200(self, api_client, category_baker):
+        products = baker.make(Product, category=category_baker, _quantity=2)
+        first = api_client.get(reverse('product-list'))
+        products[0].delete()
+
+        response = api_client.get(reverse('product-list'), HTTP_IF_MODIFIED_SINCE=http_date())
+
+        assert 'Last-Modified' not in first
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['count'] == 1
+
+    def test_if_product_is_not_modified_since_returns_304(self, api_client, product_baker):
+        url = reverse('product-detail', args=[product_baker.id])
+        last_modified = api_client.get(url)['Last-Modified']
+
+        response = api_client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_if_product_is_updated_returns_200(self, api_client, product_baker):
+        url = reverse('product-detail', args=[product_baker.id])
+        etag = api_client.get(url)['ETag']
+        product_baker.inventory += 1
+        product_baker.save()
+
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != etag
+
+    def test_if_product_gets_a_comment_returns_200(self, api_client, product_baker):
+        url = reverse('product-detail', args=[product_baker.id])
+        etag = api_client.get(url)['ETag']
+        baker.make(Comment, product=product_baker)
+
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['number_of_comments'] == 1
+
+    def test_if_page_differs_returns_different_etag(self, api_client, category_baker):
+        baker.make(Product, category=category_baker, _quantity=15)
+
+        first = api_client.get(reverse('product-list'))
+        second = api_client.get(reverse('product-list'), {'page': 2})
+
+        assert first['ETag'] != second['ETag']
+
+
+@pytest.mark.django_db
+class TestSearchProduct:
+    def test_if_search_matches_title_prefix_returns_product(self, api_client, category_baker):
+        product = baker.make(Product, title='Gaming laptop', category=category_baker)
+        baker.make(Product, title='Office chair', category=category_baker)
+
+        response = api_client.get(reverse('product-list'), {'search': 'lapt'})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [item['id'] for item in response.data['results']] == [product.id]
+
+    def test_if_title_and_category_match_returns_title_match_first(self, api_client):
+        category_match = baker.make(Product, title='Desk', category=baker.make(Category, title='Laptops'))
+        title_match = baker.make(Product, title='Laptop stand', category=baker.make(Category, title='Office'))
+
+        response = api_client.get(reverse('product-list'), {'search': 'laptop'})
+
+        assert [item['id'] for item in response.data['results']] == [title_match.id, category_match.id]
+
+    def test_if_category_title_changes_products_are_reindexed(self, api_client, category_baker):
+        category = category_baker
+        product = baker.make(Product, title='Desk', category=category)
+
+        category.title = 'Furniture'
+        category.save()
+        response = api_client.get(reverse('product-list'), {'search': 'furniture'})
+
+        assert [item['id'] for item in response.data['results']] == [product.id]
+
+    def test_if_full_text_search_is_disabled_returns_substring_matches(self, api_client, category_baker, settings):
+        settings.STORE_SEARCH = {**settings.STORE_SEARCH, 'FULL_TEXT': False}
+        product = baker.make(Product, title='Gaming laptop', category=category_baker)
+
+        response = api_client.get(reverse('product-list'), {'search': 'aptop'})
+
+        assert [item['id'] for item in response.data['results']] == [product.id]
+
+
+@pytest.mark.django_db
+class TestImportProduct:
+    def upload(self, api_client, name, content):
+        return api_client.post(
+            reverse('product-bulk-import'),
+            {'file': SimpleUploadedFile(name, content.encode())},
+            format='multipart'
+        )
+
+    def test_if_user_is_not_admin_returns_403(self, api_client, authenticate):
+        authenticate()
+
+        response = self.upload(api_client, 'products.csv', 'title\n')
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_if_csv_is_valid_creates_and_updates_products(self, api_client, authenticate):
+        authenticate(is_staff=True)
+        category = baker.make(Category, title='Laptops')
+        product = baker.make(Product, title='Old title', category=baker.make(Category, title='Other'))
+
+        response = self.upload(api_client, 'products.csv', (
+            'id,title,slug,description,price,inventory,category\n'
+            f'{product.id},Updated laptop,,,10.50,3,Laptops\n'
+            ',Gaming laptop,,"A fast\nlaptop",20.00,5,Laptops\n'
+        ))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['created'] == 1
+        assert response.data['updated'] == 1
+        product.refresh_from_db()
+        assert product.title == 'Updated laptop'
+        assert product.category == category
+        created = Product.objects.get(title='Gaming laptop')
+        assert created.slug == 'gaming-laptop'
+        assert created.description == 'A fast\nlaptop'
+        category.refresh_from_db()
+        assert category.product_count == 2
+
+    def test_if_rows_are_invalid_skips_them_and_reports_lines(self, api_client, authenticate):
+        authenticate(is_staff=True)
+        baker.make(Category, title='Laptops')
+        rows = [
+            {'title': 'Gaming laptop', 'price': '20.00', 'inventory': 5, 'category': 'Laptops'},
+            {'title': 'Short', 'price': '20.00', 'inventory': 5, 'category': 'Laptops'},
+            {'title': 'Office chair', 'price': '20.00', 'inventory': 5, 'category': 'Chairs'},
+        ]
+        content = '\n'.join(json.dumps(row) for row in rows) + '\nnot json\n'
+
+        response = self.upload(api_client, 'products.jsonl', content)
+
+        assert response.data['created'] == 1
+        assert response.data['error_count'] == 3
+        assert [error['line'] for error in response.data['errors']] == [2, 3, 4]
+        assert list(Product.objects.values_list('title', flat=True)) == ['Gaming laptop']
+
+    def test_if_products_are_imported_they_are_searchable(self, api_client, authenticate):
+        authenticate(is_staff=True)
+        baker.make(Category, title='Laptops')
+        self.upload(api_client, 'products.jsonl', json.dumps(
+            {'title': 'Gaming laptop', 'price': '20.00', 'inventory': 5, 'category': 'Laptops'}
+        ))
+
+        response = api_client.get(reverse('product-list'), {'search': 'gaming'})
+
+        assert [item['title'] for item in response.data['results']] == ['Gaming laptop']
+
+    def test_if_command_imports_in_batches_reports_rows_per_second(self, tmp_path):
+        baker.make(Category, title='Laptops')
+        path = tmp_path / 'products.csv'
+        path.write_text('title,price,inventory,category\n' + ''.join(
+            f'Laptop {i:04},10.00,1,Laptops\n' for i in range(50)
+        ))
+        out = StringIO()
+
+        call_command('import_products', str(path), '--batch-size', '20', stdout=out)
+
+        assert Product.objects.count() == 50
+        assert 'rows/sec' in out.getvalue()
+
+
+@pytest.mark.django_db
+class TestExportProduct:
+    def test_if_user_is_not_admin_returns_403(self, api_client, authenticate):
+        authenticate()
+
+        response = api_client.get(reverse('product-bulk-export'))
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_if_format_is_jsonl_streams_every_product(self, api_client, authenticate):
+        authenticate(is_staff=True)
+        products = baker.make(Product, category=baker.make(Category, title='Laptops'), _quantity=3)
+
+        response = api_client.get(reverse('product-bulk-export'), {'file_format': 'jsonl'})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.streaming
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        assert [row['id'] for row in rows] == [product.id for product in products]
+        assert rows[0]['category'] == 'Laptops'
+
+    def test_if_export_is_imported_back_updates_the_same_products(self, api_client, authenticate):
+        authenticate(is_staff=True)
+        products = baker.make(Product, category=baker.make(Category, title='Laptops'), _quantity=3)
+        out = StringIO()
+        call_command('export_products', stdout=out, stderr=StringIO())
+
+        response = api_client.post(
+            reverse('product-bulk-import'),
+            {'file': SimpleUploadedFile('products.csv', out.getvalue().encode())},
+            format='multipart'
+        )
+
+        assert response.data['updated'] == len(products)
+        assert Product.objects.count() == len(products)
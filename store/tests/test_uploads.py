@@ -0,0 +1,217 @@
+from datetime import timedelta
+from io import BytesIO
+
+from django.urls import reverse
+from django.utils import timezone
+from model_bakery import baker
+from PIL import Image
+from rest_framework import status
+import pytest
+
+from store.models import ImageUpload, ProductImage
+from store.tasks import delete_expired_image_uploads
+from store.uploads import get_upload_storage, part_name
+
+
+def png_bytes(size=(300, 200)):
+    buffer = BytesIO()
+    Image.new('RGB', size, (0, 128, 255)).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def upload_storage(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path / 'media')
+    settings.STORAGES = {
+        **settings.STORAGES,
+        'image_uploads': {**settings.STORAGES['image_uploads'], 'OPTIONS': {'location': str(tmp_path / 'uploads')}},
+    }
+    return tmp_path
+
+
+@pytest.fixture
+def start_upload(upload_storage, authenticate, api_client, product_baker):
+    authenticate(is_staff=True)
+
+    def do_start_upload(content, content_type='image/png', filename='photo.png'):
+        return api_client.post(
+            reverse('product-image-uploads-list', args=[product_baker.id]),
+            {'filename': filename, 'content_type': content_type, 'size': len(content)}
+        )
+    return do_start_upload
+
+
+@pytest.fixture
+def put_part(api_client, product_baker):
+    def do_put_part(upload_id, number, content):
+        return api_client.put(
+            reverse('product-image-uploads-part', args=[product_baker.id, upload_id, number]),
+            content, content_type='application/octet-stream'
+        )
+    return do_put_part
+
+
+@pytest.mark.django_db
+class TestStartImageUpload:
+    def test_if_user_is_not_admin_returns_403(self, authenticate, api_client, product_baker):
+        authenticate(is_staff=False)
+
+        response = api_client.post(
+            reverse('product-image-uploads-list', args=[product_baker.id]),
+            {'filename': 'a.png', 'content_type': 'image/png', 'size': 10}
+        )
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_if_upload_is_valid_returns_201(self, settings, start_upload):
+        settings.STORE_IMAGE_UPLOADS = {**settings.STORE_IMAGE_UPLOADS, 'PART_SIZE': 100}
+
+        response = start_upload(b'x' * 250)
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['part_size'] == 100
+        assert response.data['part_count'] == 3
+        assert response.data['received_parts'] == []
+
+    def test_if_content_type_is_not_an_image_returns_400(self, start_upload):
+        response = start_upload(b'x' * 10, content_type='application/pdf')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'content_type' in response.data
+
+    def test_if_file_is_too_large_returns_400(self, settings, start_upload):
+        settings.STORE_IMAGE_UPLOADS = {**settings.STORE_IMAGE_UPLOADS, 'MAX_SIZE': 100}
+
+        response = start_upload(b'x' * 101)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'size' in response.data
+
+
+@pytest.mark.django_db
+class TestUploadImagePart:
+    def test_if_parts_are_received_returns_them_in_upload(
+            self, settings, start_upload, put_part, api_client, product_baker):
+        settings.STORE_IMAGE_UPLOADS = {**settings.STORE_IMAGE_UPLOADS, 'PART_SIZE': 100}
+        content = png_bytes()
+        upload_id = start_upload(content).data['id']
+
+        response = put_part(upload_id, 2, content[100:200])
+        upload_response = api_client.get(
+            reverse('product-image-uploads-detail', args=[product_baker.id, upload_id])
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {'number': 2, 'size': 100}
+        assert upload_response.data['received_parts'] == [2]
+
+    def test_if_part_is_sent_again_it_is_replaced(self, settings, upload_storage, start_upload, put_part):
+        settings.STORE_IMAGE_UPLOADS = {**settings.STORE_IMAGE_UPLOADS, 'PART_SIZE': 100}
+        content = png_bytes()
+        upload_id = start_upload(content).data['id']
+
+        put_part(upload_id, 2, b'x' * 100)
+        response = put_part(upload_id, 2, content[100:200])
+
+        upload = ImageUpload.objects.get(pk=upload_id)
+        assert response.status_code == status.HTTP_200_OK
+        assert upload.parts.count() == 1
+        with get_upload_storage().open(part_name(upload, 2)) as part:
+            assert part.read() == content[100:200]
+
+    def test_if_part_has_wrong_size_returns_400(self, settings, start_upload, put_part):
+        settings.STORE_IMAGE_UPLOADS = {**settings.STORE_IMAGE_UPLOADS, 'PART_SIZE': 100}
+        content = png_bytes()
+        upload_id = start_upload(content).data['id']
+
+        too_long = put_part(upload_id, 2, content[100:201])
+        too_short = put_part(upload_id, 2, content[100:199])
+
+        assert too_long.status_code == status.HTTP_400_BAD_REQUEST
+        assert too_short.status_code == status.HTTP_400_BAD_REQUEST
+        assert not ImageUpload.objects.get(pk=upload_id).parts.exists()
+
+    def test_if_first_part_is_not_of_content_type_returns_400(self, start_upload, put_part):
+        upload_id = start_upload(b'GIF89a' + b'x' * 20).data['id']
+
+        response = put_part(upload_id, 1, b'GIF89a' + b'x' * 20)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_if_part_number_is_out_of_range_returns_400(self, start_upload, put_part):
+        content = png_bytes()
+        upload_id = start_upload(content).data['id']
+
+        response = put_part(upload_id, 2, content)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+class TestCompleteImageUpload:
+    def test_if_all_parts_are_received_returns_201(
+            self, settings, upload_storage, start_upload, put_part, api_client, product_baker):
+        settings.STORE_IMAGE_UPLOADS = {**settings.STORE_IMAGE_UPLOADS, 'PART_SIZE': 100}
+        content = png_bytes()
+        upload_id = start_upload(content).data['id']
+        upload = ImageUpload.objects.get(pk=upload_id)
+        for number in reversed(range(1, upload.part_count + 1)):
+            put_part(upload_id, number, content[(number - 1) * 100:number * 100])
+
+        response = api_client.post(
+            reverse('product-image-uploads-complete', args=[product_baker.id, upload_id])
+        )
+
+        product_image = ProductImage.objects.get(product=product_baker)
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['id'] == product_image.id
+        assert (upload_storage / 'media' / product_image.image.name).read_bytes() == content
+        assert not get_upload_storage().exists(part_name(upload, 1))
+
+    def test_if_parts_are_missing_returns_400(self, settings, start_upload, put_part, api_client, product_baker):
+        settings.STORE_IMAGE_UPLOADS = {**settings.STORE_IMAGE_UPLOADS, 'PART_SIZE': 100}
+        content = png_bytes()
+        upload_id = start_upload(content).data['id']
+        put_part(upload_id, 1, content[:100])
+
+        response = api_client.post(
+            reverse('product-image-uploads-complete', args=[product_baker.id, upload_id])
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not ProductImage.objects.exists()
+
+    def test_if_file_is_not_a_valid_image_returns_400(self, start_upload, put_part, api_client, product_baker):
+        content = b'\x89PNG\r\n\x1a\n' + b'x' * 50
+        upload_id = start_upload(content).data['id']
+        put_part(upload_id, 1, content)
+
+        response = api_client.post(
+            reverse('product-image-uploads-complete', args=[product_baker.id, upload_id])
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not ProductImage.objects.exists()
+
+
+@pytest.mark.django_db
+class TestDeleteExpiredImageUploads:
+    def test_if_upload_is_expired_it_is_deleted_with_its_parts(self, upload_storage, start_upload, put_part):
+        content = png_bytes()
+        expired_id = start_upload(content).data['id']
+        put_part(expired_id, 1, content)
+        recent_id = start_upload(content).data['id']
+        ImageUpload.objects.filter(pk=expired_id).update(datetime_created=timezone.now() - timedelta(days=2))
+
+        deleted = delete_expired_image_uploads(ttl=86400)
+
+        assert deleted == 1
+        assert [str(pk) for pk in ImageUpload.objects.values_list('pk', flat=True)] == [recent_id]
+        assert not (upload_storage / 'uploads' / expired_id / '00001').exists()
+
+    def test_if_upload_is_completed_it_is_kept(self, upload_storage, product_baker):
+        product_image = baker.make(ProductImage, product=product_baker, image='store/product/images/a.png')
+        upload = baker.make(ImageUpload, product=product_baker, size=1, part_size=1, product_image=product_image)
+        ImageUpload.objects.filter(pk=upload.pk).update(datetime_created=timezone.now() - timedelta(days=2))
+
+        assert delete_expired_image_uploads(ttl=86400) == 0
@@ -0,0 +1,192 @@
+from datetime import timedelta
+import os
+
+from django.conf import settings
+from django.core.files.base import File
+from django.core.files.storage import storages
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from .media import content_hashed_name
+from .models import ImageUpload, ImageUploadPart, ProductImage
+
+READ_SIZE = 64 * 1024
+
+# What the first bytes of a file of each content type look like.
+SIGNATURES = {
+    'image/jpeg': lambda head: head.startswith(b'\xff\xd8\xff'),
+    'image/png': lambda head: head.startswith(b'\x89PNG\r\n\x1a\n'),
+    'image/webp': lambda head: head[:4] == b'RIFF' and head[8:12] == b'WEBP',
+}
+SIGNATURE_SIZE = 12
+EXTENSIONS = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/webp': '.webp',
+}
+
+
+class UploadError(Exception):
+    pass
+
+
+def get_upload_storage():
+    return storages[settings.STORE_IMAGE_UPLOADS['STORAGE']]
+
+
+def part_name(upload, number):
+    return f'{upload.id}/{number:05}'
+
+
+class PartReader:
+    """
+    Read a part from the request stream in READ_SIZE chunks, failing as
+    soon as it is longer than announced or, for the first part, does not
+    start like a file of the upload's content type.
+    """
+
+    def __init__(self, stream, size, content_type=None):
+        self.stream = stream
+        self.size = size
+        self.content_type = content_type
+        self.head = b''
+        self.received = 0
+
+    def read(self, size=READ_SIZE):
+        if size is None or size < 0:
+            size = READ_SIZE
+        # One byte past the part's size is enough to tell it is too long.
+        data = self.stream.read(min(size, READ_SIZE, self.size + 1 - self.received))
+        self.received += len(data)
+        if self.received > self.size:
+            raise UploadError(f'The part is larger than {self.size} bytes.')
+
+        if self.content_type is not None:
+            self.head += data[:SIGNATURE_SIZE - len(self.head)]
+            if len(self.head) == SIGNATURE_SIZE or not data:
+                if not SIGNATURES[self.content_type](self.head):
+                    raise UploadError(f'The file is not a {self.content_type} file.')
+                self.content_type = None
+        return data
+
+
+def save_part(upload, number, stream):
+    """Write part ``number`` of ``upload`` from ``stream`` to the upload storage, replacing a previous try."""
+    if upload.product_image_id is not None:
+        raise UploadError('The upload is already completed.')
+    if not 1 <= number <= upload.part_count:
+        raise UploadError(f'Part numbers go from 1 to {upload.part_count}.')
+
+    storage = get_upload_storage()
+    name = part_name(upload, number)
+    size = upload.get_part_size(number)
+    reader = PartReader(stream, size, upload.content_type if number == 1 else None)
+    ImageUploadPart.objects.filter(upload=upload, number=number).delete()
+    storage.delete(name)
+    try:
+        storage.save(name, File(reader, name=name))
+        if reader.received != size:
+            raise UploadError(f'The part should be {size} bytes, it is {reader.received}.')
+    except Exception:
+        storage.delete(name)
+        raise
+
+    ImageUploadPart.objects.create(upload=upload, number=number, size=size)
+    return size
+
+
+class PartsFile:
+    """The parts of an upload read one after the other, as one file."""
+
+    def __init__(self, storage, names, size):
+        self.storage = storage
+        self.names = iter(names)
+        self.size = size
+        self.current = None
+
+    def read(self, size=READ_SIZE):
+        while True:
+            if self.current is None:
+                name = next(self.names, None)
+                if name is None:
+                    return b''
+                self.current = self.storage.open(name, 'rb')
+            data = self.current.read(size)
+            if data:
+                return data
+            self.current.close()
+            self.current = None
+
+    def close(self):
+        if self.current is not None:
+            self.current.close()
+
+
+def complete_upload(upload):
+    """
+    Copy the parts into the media storage as one file and create the
+    ProductImage from it. The copy is streamed, a part at a time.
+    """
+    with transaction.atomic():
+        upload = ImageUpload.objects.select_for_update().get(pk=upload.pk)
+        if upload.product_image_id is not None:
+            return upload.product_image
+
+        received = set(upload.parts.values_list('number', flat=True))
+        missing = [number for number in range(1, upload.part_count + 1) if number not in received]
+        if missing:
+            raise UploadError(f'Parts {", ".join(map(str, missing))} are missing.')
+
+        storage = get_upload_storage()
+        names = [part_name(upload, number) for number in range(1, upload.part_count + 1)]
+        stem = os.path.splitext(os.path.basename(upload.filename))[0] or 'image'
+        # The parts are read twice, to name the file after its content and
+        # to copy it.
+        parts = PartsFile(storage, names, upload.size)
+        try:
+            filename = content_hashed_name(f'{stem}{EXTENSIONS[upload.content_type]}', File(parts))
+        finally:
+            parts.close()
+        field = ProductImage._meta.get_field('image')
+        parts = PartsFile(storage, names, upload.size)
+        try:
+            name = field.storage.save(field.generate_filename(None, filename), File(parts, name=filename))
+        finally:
+            parts.close()
+
+        try:
+            with field.storage.open(name, 'rb') as file:
+                Image.open(file).verify()
+        except (OSError, SyntaxError, ValueError, Image.DecompressionBombError):
+            field.storage.delete(name)
+            raise UploadError('The file is not a valid image.')
+
+        product_image = ProductImage.objects.create(product_id=upload.product_id, image=name)
+        upload.product_image = product_image
+        upload.save(update_fields=['product_image'])
+        upload.parts.all().delete()
+
+    for name in names:
+        storage.delete(name)
+    return product_image
+
+
+def delete_upload(upload):
+    storage = get_upload_storage()
+    for number in upload.parts.values_list('number', flat=True):
+        storage.delete(part_name(upload, number))
+    upload.delete()
+
+
+def delete_expired_uploads(ttl=None):
+    """Delete the uploads that were not completed in time, with their parts."""
+    ttl = timedelta(seconds=ttl or settings.STORE_IMAGE_UPLOADS['TTL'])
+    expired = ImageUpload.objects.filter(
+        product_image__isnull=True, datetime_created__lt=timezone.now() - ttl
+    )
+    deleted = 0
+    for upload in expired.iterator():
+        delete_upload(upload)
+        deleted += 1
+    return deleted
@@ -1,21 +1,49 @@
+from django.conf import settings
+from django.urls import re_path
 from rest_framework_nested.routers import DefaultRouter, NestedDefaultRouter
 
 from . import views
+from .carts import get_cart_store
 
 
+if get_cart_store().uses_database:
+    cart_viewset, cart_item_viewset = views.CartViewSet, views.CartItemViewSet
+else:
+    cart_viewset, cart_item_viewset = views.StoredCartViewSet, views.StoredCartItemViewSet
+
 router = DefaultRouter()
 
 router.register('products', views.ProductViewSet, basename='product')
 router.register('categories', views.CategoryViewSet, basename='category')
-router.register('carts', views.CartViewSet, basename='cart')
+router.register('carts', cart_viewset, basename='cart')
 router.register('orders', views.OrderViewSet, basename='order')
 router.register('customers', views.CustomerViewSet, basename='customer')
+router.register('analytics/sales', views.SalesAnalyticsViewSet, basename='sales-analytics')
+router.register('performance', views.PerformanceStatsViewSet, basename='performance')
 
 products_router = NestedDefaultRouter(router, 'products', lookup='product')
 products_router.register('comments', views.CommentViewSet, basename='product-comments')
 products_router.register('images', views.ProductImageViewSet, basename='product-images')
+products_router.register('image-uploads', views.ImageUploadViewSet, basename='product-image-uploads')
 
 carts_router = NestedDefaultRouter(router, 'carts', lookup='cart')
-carts_router.register('items', views.CartItemViewSet, basename='cart-items')
+carts_router.register('items', cart_item_viewset, basename='cart-items')
 
 urlpatterns = router.urls + products_router.urls + carts_router.urls
+
+if settings.STORE_ASYNC_CATALOG['ENABLED']:
+    from . import async_views
+
+    # Matched before the routers' patterns of the same name, which the async
+    # views hand writes and unsupported reads to.
+    fallbacks = {pattern.name: pattern.callback for pattern in urlpatterns}
+    urlpatterns = [
+        re_path(r'^products/$', async_views.AsyncProductList.as_view(
+            fallback=fallbacks['product-list']), name='product-list'),
+        re_path(r'^products/(?P<pk>[^/.]+)/$', async_views.AsyncProductDetail.as_view(
+            fallback=fallbacks['product-detail']), name='product-detail'),
+        re_path(r'^categories/$', async_views.AsyncCategoryList.as_view(
+            fallback=fallbacks['category-list']), name='category-list'),
+        re_path(r'^products/(?P<product_pk>[^/.]+)/comments/$', async_views.AsyncCommentList.as_view(
+            fallback=fallbacks['product-comments-list']), name='product-comments-list'),
+    ] + urlpatterns
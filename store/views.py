@@ -1,26 +1,43 @@
+from io import BytesIO, TextIOWrapper
+from uuid import UUID
+
 from django.shortcuts import render, get_object_or_404
-from django.db.models import Prefetch
+from django.db.models import Count, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
 
-from rest_framework.viewsets import ModelViewSet, GenericViewSet
+from rest_framework.viewsets import ModelViewSet, GenericViewSet, ViewSet
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.mixins import CreateModelMixin, DestroyModelMixin, RetrieveModelMixin
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import OrderingFilter
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAdminUser, IsAuthenticated
 
 from django_filters.rest_framework import DjangoFilterBackend
 
+from . import uploads
+from .analytics import sales_between, sales_by_category, sales_by_day, sales_by_product
+from .cache import CatalogCacheMixin
+from .conditional import ConditionalGetMixin
+from .carts import CartDoesNotExist, get_cart_store, load_stored_cart
 from .payment import payment_process, payment_callback
-from .filters import ProductFilter
-from .paginations import CustomPagination
+from .instrumentation import view_stats
+from .filters import OrderFilter, ProductFilter, ProductSearchFilter
+from .paginations import OptionalCursorPagination, SelectablePagination
 from .permissions import IsAdminOrReadOnly
+from .order_export import EXPORT_CONTENT_TYPES, EXPORT_FORMATS, export_orders
+from .product_io import FORMATS, WRITERS, export_rows, import_products
+from .streaming import streaming_download
 from .models import \
     Cart, \
     CartItem, \
     Category, \
     Comment, \
     Customer, \
+    ImageUpload, \
+    ImageUploadPart, \
     Order, \
     OrderItem, \
     Product, \
@@ -32,26 +49,39 @@ from .serializers import \
     CategorySerializer, \
     CommentSerializer, \
     CustomerSerializer, \
+    ImageUploadSerializer, \
     OrderCreateSerializer, \
     OrderForAdminSerializer, \
     OrderSerializer, \
     ProductImageSerializer, \
     ProductSerializer, \
+    SalesQuerySerializer, \
+    StoredCartSerializer, \
     UpdateCartItemSerializer, \
     UpdateOrderSerializer
 
 
-class ProductViewSet(ModelViewSet):
+class ProductViewSet(CatalogCacheMixin, ConditionalGetMixin, ModelViewSet):
     queryset = Product.objects.prefetch_related(
-        'comments',
         'images'
-    ).select_related('category').all()
+    ).select_related('category').annotate(
+        comments_count=Coalesce(
+            Subquery(
+                Comment.objects.filter(product_id=OuterRef('pk'))
+                .order_by()
+                .values('product_id')
+                .annotate(count=Count('pk'))
+                .values('count')
+            ),
+            0
+        )
+    ).all()
     serializer_class = ProductSerializer
-    pagination_class = CustomPagination
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    pagination_class = SelectablePagination
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter, OrderingFilter]
     filterset_class = ProductFilter
     search_fields = ['title', 'category__title', ]
-    ordering_fields = ['unit_price', 'inventory', ]
+    ordering_fields = ['unit_price', 'effective_price', 'inventory', ]
     permission_classes = [IsAdminOrReadOnly]
 
     def destroy(self, request, pk):
@@ -66,8 +96,37 @@ class ProductViewSet(ModelViewSet):
         product.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(detail=False, methods=['POST'], url_path='import',
+            permission_classes=[IsAdminUser], parser_classes=[MultiPartParser])
+    def bulk_import(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'file': ['No file was submitted.']}, status=status.HTTP_400_BAD_REQUEST)
+
+        file_format = request.data.get('file_format') or upload.name.rsplit('.', 1)[-1].lower()
+        if file_format not in FORMATS:
+            return Response(
+                {'file_format': [f'Choose one of {", ".join(FORMATS)}.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-class ProductImageViewSet(ModelViewSet):
+        result = import_products(TextIOWrapper(upload, encoding='utf-8', newline=''), file_format)
+        return Response(result.as_dict())
+
+    @action(detail=False, methods=['GET'], url_path='export', permission_classes=[IsAdminUser])
+    def bulk_export(self, request):
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in FORMATS:
+            return Response(
+                {'file_format': [f'Choose one of {", ".join(FORMATS)}.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        write, content_type = WRITERS[file_format]
+        return streaming_download(write(export_rows()), content_type, f'products.{file_format}')
+
+
+class ProductImageViewSet(ConditionalGetMixin, ModelViewSet):
     serializer_class = ProductImageSerializer
     permission_classes = [IsAdminOrReadOnly]
 
@@ -76,11 +135,56 @@ class ProductImageViewSet(ModelViewSet):
         return ProductImage.objects.filter(product_id=product_id)
 
     def get_serializer_context(self):
-        return {'product_pk': self.kwargs['product_pk']}
+        return {**super().get_serializer_context(), 'product_pk': self.kwargs['product_pk']}
+
+
+class ImageUploadViewSet(CreateModelMixin, RetrieveModelMixin, DestroyModelMixin, GenericViewSet):
+    """
+    Resumable image uploads: POST the file's name, type and size, PUT its
+    parts in any order and as many times as needed, then POST complete to
+    turn it into a product image. GET returns the parts received so far.
+    """
+    serializer_class = ImageUploadSerializer
+    permission_classes = [IsAdminUser]
 
+    def get_queryset(self):
+        queryset = ImageUpload.objects.filter(product_id=self.kwargs['product_pk'])
+        if self.action in ('part', 'complete'):
+            return queryset
+        return queryset.select_related('product_image').prefetch_related(
+            Prefetch('parts', queryset=ImageUploadPart.objects.order_by('number'))
+        )
 
-class CategoryViewSet(ModelViewSet):
-    queryset = Category.objects.prefetch_related('products').all()
+    def get_serializer_context(self):
+        return {**super().get_serializer_context(), 'product_pk': self.kwargs['product_pk']}
+
+    def perform_destroy(self, instance):
+        uploads.delete_upload(instance)
+
+    @action(detail=True, methods=['PUT'], url_path=r'parts/(?P<number>[0-9]+)', url_name='part')
+    def part(self, request, product_pk, pk, number):
+        # The body is streamed to the upload storage as it is read, never
+        # parsed or held in memory.
+        upload = self.get_object()
+        try:
+            size = uploads.save_part(upload, int(number), request.stream or BytesIO())
+        except uploads.UploadError as error:
+            return Response({'detail': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'number': int(number), 'size': size})
+
+    @action(detail=True, methods=['POST'])
+    def complete(self, request, product_pk, pk):
+        upload = self.get_object()
+        try:
+            product_image = uploads.complete_upload(upload)
+        except uploads.UploadError as error:
+            return Response({'detail': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = ProductImageSerializer(product_image, context=self.get_serializer_context())
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class CategoryViewSet(ConditionalGetMixin, ModelViewSet):
+    queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [IsAdminOrReadOnly]
 
@@ -88,7 +192,7 @@ class CategoryViewSet(ModelViewSet):
         category = get_object_or_404(
             Category, pk=pk
         )
-        if category.products.count() > 0:
+        if category.products.exists():
             return Response(
                 {'error': 'There is some products that include this category.'},
                 status=status.HTTP_405_METHOD_NOT_ALLOWED
@@ -97,8 +201,9 @@ class CategoryViewSet(ModelViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class CommentViewSet(ModelViewSet):
+class CommentViewSet(ConditionalGetMixin, ModelViewSet):
     serializer_class = CommentSerializer
+    pagination_class = OptionalCursorPagination
     permission_classes = [IsAuthenticatedOrReadOnly]
 
     def get_queryset(self):
@@ -119,9 +224,9 @@ class CartViewSet(CreateModelMixin,
     queryset = Cart.objects.prefetch_related(
         Prefetch(
             'items',
-            queryset=CartItem.objects.select_related('product').all()
+            queryset=CartItem.objects.select_related('product').with_item_total()
         )
-    ).all()
+    ).with_total_price()
     serializer_class = CartSerializer
 
 
@@ -130,11 +235,24 @@ class CartItemViewSet(ModelViewSet):
 
     def get_queryset(self):
         cart_id = self.kwargs['cart_pk']
-        return CartItem.objects.select_related('product').filter(cart_id=cart_id)
+        return CartItem.objects.select_related('product').with_item_total().filter(cart_id=cart_id)
 
     def get_serializer_context(self):
         return {'cart_pk': self.kwargs['cart_pk']}
 
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        Cart.objects.filter(pk=self.kwargs['cart_pk']).touch()
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        Cart.objects.filter(pk=self.kwargs['cart_pk']).touch()
+
+    def get_serializer(self, *args, **kwargs):
+        if isinstance(kwargs.get('data'), list):
+            kwargs['many'] = True
+        return super().get_serializer(*args, **kwargs)
+
     def get_serializer_class(self):
         if self.request.method == 'POST':
             return AddCartItemSerializer
@@ -143,22 +261,116 @@ class CartItemViewSet(ModelViewSet):
         return CartItemSerializer
 
 
+def get_stored_cart_id(cart_id):
+    try:
+        return UUID(str(cart_id))
+    except ValueError:
+        raise NotFound()
+
+
+class StoredCartViewSet(ViewSet):
+    """
+    CartViewSet counterpart for carts kept in a non-database cart store.
+    """
+
+    def create(self, request):
+        cart_store = get_cart_store()
+        cart = load_stored_cart(cart_store, cart_store.create())
+        return Response(StoredCartSerializer(cart).data, status=status.HTTP_201_CREATED)
+
+    def retrieve(self, request, pk):
+        cart = load_stored_cart(get_cart_store(), get_stored_cart_id(pk))
+        if cart is None:
+            raise NotFound()
+        return Response(StoredCartSerializer(cart).data)
+
+    def destroy(self, request, pk):
+        if not get_cart_store().delete(get_stored_cart_id(pk)):
+            raise NotFound()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class StoredCartItemViewSet(ViewSet):
+    """
+    CartItemViewSet counterpart for carts kept in a non-database cart store.
+    Items are identified by their product id.
+    """
+    http_method_names = ['get', 'post', 'patch', 'delete', ]
+
+    def get_cart(self):
+        cart = load_stored_cart(get_cart_store(), get_stored_cart_id(self.kwargs['cart_pk']))
+        if cart is None:
+            raise NotFound()
+        return cart
+
+    def get_item(self, pk):
+        for item in self.get_cart().items:
+            if str(item.id) == str(pk):
+                return item
+        raise NotFound()
+
+    def list(self, request, cart_pk):
+        return Response(CartItemSerializer(self.get_cart().items, many=True).data)
+
+    def retrieve(self, request, cart_pk, pk):
+        return Response(CartItemSerializer(self.get_item(pk)).data)
+
+    def create(self, request, cart_pk):
+        many = isinstance(request.data, list)
+        serializer = AddCartItemSerializer(data=request.data, many=many)
+        serializer.is_valid(raise_exception=True)
+        items = []
+        try:
+            for item in serializer.validated_data if many else [serializer.validated_data]:
+                product = item['product']
+                quantity = get_cart_store().add_item(
+                    get_stored_cart_id(cart_pk), product.id, item['quantity']
+                )
+                items.append({'id': product.id, 'product': product.id, 'quantity': quantity})
+        except CartDoesNotExist:
+            raise NotFound()
+        return Response(items if many else items[0], status=status.HTTP_201_CREATED)
+
+    def partial_update(self, request, cart_pk, pk):
+        serializer = UpdateCartItemSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        item = self.get_item(pk)
+        if not get_cart_store().set_item(
+            get_stored_cart_id(cart_pk), item.id, serializer.validated_data['quantity']
+        ):
+            raise NotFound()
+        return Response(serializer.data)
+
+    def destroy(self, request, cart_pk, pk):
+        item = self.get_item(pk)
+        if not get_cart_store().remove_item(get_stored_cart_id(cart_pk), item.id):
+            raise NotFound()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 class OrderViewSet(ModelViewSet):
     http_method_names = ['get', 'post', 'patch', 'delete', 'options', 'head', ]
+    pagination_class = OptionalCursorPagination
+    filter_backends = [DjangoFilterBackend, OrderingFilter]
+    filterset_class = OrderFilter
+    ordering_fields = ['total_price', 'datetime_created', ]
 
     def get_permissions(self):
-        if self.request.method in ['PATCH', 'DELETE']:
+        if self.request.method in ['PATCH', 'DELETE'] or self.action == 'export':
             return [IsAdminUser()]
         return [IsAuthenticated()]
 
     def get_queryset(self):
         user = self.request.user
+        if self.action == 'export':
+            return Order.objects.with_total_price()
+
         queryset = Order.objects.prefetch_related(
             Prefetch(
                 'items',
-                queryset=OrderItem.objects.select_related('product').all()
+                queryset=OrderItem.objects.select_related('product').with_item_total()
             )
-        ).select_related('customer__user').all()
+        ).select_related('customer__user').with_total_price()
 
         if user.is_staff:
             return queryset
@@ -188,6 +400,7 @@ class OrderViewSet(ModelViewSet):
         )
         create_order_serializer.is_valid(raise_exception=True)
         order = create_order_serializer.save()
+        order = self.get_queryset().get(pk=order.pk)
         serializer = OrderSerializer(order)
         return Response(serializer.data)
 
@@ -213,16 +426,28 @@ class OrderViewSet(ModelViewSet):
     def callback(self, request):
         return payment_callback(request)
 
+    @action(detail=False, methods=['GET'])
+    def export(self, request):
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in EXPORT_FORMATS:
+            return Response(
+                {'file_format': [f'Choose one of {", ".join(EXPORT_FORMATS)}.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        lines = export_orders(self.filter_queryset(self.get_queryset()), file_format)
+        return streaming_download(lines, EXPORT_CONTENT_TYPES[file_format], f'orders.{file_format}')
+
 
 class CustomerViewSet(ModelViewSet):
-    queryset = Customer.objects.all()
+    queryset = Customer.objects.select_related('user').all()
     serializer_class = CustomerSerializer
     permission_classes = [IsAdminUser]
 
     @action(detail=False, methods=['GET', 'PUT'], permission_classes=[IsAuthenticated])
     def me(self, request):
         user_id = request.user.id
-        customer = Customer.objects.get(user_id=user_id)
+        customer = Customer.objects.select_related('user').get(user_id=user_id)
         if request.method == 'GET':
             serializer = CustomerSerializer(customer)
             return Response(serializer.data)
@@ -231,3 +456,49 @@ class CustomerViewSet(ModelViewSet):
             serializer.is_valid(raise_exception=True)
             serializer.save()
             return Response(serializer.data)
+
+
+class SalesAnalyticsViewSet(ViewSet):
+    """
+    Sales totals read from the DailySales rollup, filtered by
+    ``date_from``, ``date_to`` and order ``status`` (paid by default).
+    """
+    permission_classes = [IsAdminUser]
+
+    def get_query(self):
+        serializer = SalesQuerySerializer(data=self.request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
+
+    def get_sales(self, query):
+        return sales_between(query.get('date_from'), query.get('date_to'), query['status'])
+
+    @action(detail=False, methods=['GET'])
+    def daily(self, request):
+        return Response(sales_by_day(self.get_sales(self.get_query())))
+
+    @action(detail=False, methods=['GET'])
+    def categories(self, request):
+        return Response(sales_by_category(self.get_sales(self.get_query())))
+
+    @action(detail=False, methods=['GET'])
+    def products(self, request):
+        query = self.get_query()
+        return Response(sales_by_product(self.get_sales(query))[:query['limit']])
+
+
+class PerformanceStatsViewSet(ViewSet):
+    """
+    Per view histograms collected by the sampling PerformanceMiddleware.
+    Each worker process keeps its own, so the numbers cover the process
+    that answers the request.
+    """
+    permission_classes = [IsAdminUser]
+
+    def list(self, request):
+        return Response(view_stats.as_dict())
+
+    @action(detail=False, methods=['POST'])
+    def reset(self, request):
+        view_stats.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)